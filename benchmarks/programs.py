@@ -0,0 +1,140 @@
+"""
+Generators for synthetic programs of a given size.
+
+Each generator takes a size and returns the source of a program whose
+compiled shortcut grows roughly linearly with it, so the time spent per unit
+of size should stay flat as the size increases.
+"""
+
+from typing import Callable
+
+__all__ = ['PROGRAMS', 'DEFAULT_SIZES', 'MAX_SIZES']
+
+HEADER = 'from workflowpy.magic import *\n'
+
+
+def straight_line(size: int) -> str:
+    """
+    A long script of arithmetic, conversions and prints, with no control flow.
+    """
+    lines = [HEADER, 'x = float(input("x"))', 'n = int(input("n"))']
+    for i in range(size):
+        match i % 4:
+            case 0:
+                lines.append(f'v{i} = x * {i} + n')
+            case 1:
+                lines.append(f'v{i} = int(v{i - 1}) - {i}')
+            case 2:
+                lines.append(f'v{i} = -v{i - 1} / (n + 1)')
+            case _:
+                lines.append(f'print(v{i - 1}, str(v{i - 3}))')
+    return '\n'.join(lines)
+
+
+def nested(size: int) -> str:
+    """
+    `for` and `if` blocks nested `size` levels deep, with a `break` in the
+    innermost loop.
+    """
+    lines = [HEADER, 'n = int(input("n"))']
+    indent = ''
+    for i in range(size):
+        if i % 2 == 0:
+            lines.append(f'{indent}for i{i} in range(3):')
+        else:
+            lines.append(f'{indent}if i{i - 1} > n:')
+        indent += '    '
+    last_loop = (size - 1) // 2 * 2
+    lines.append(f'{indent}print(i{last_loop})')
+    lines.append(f'{indent}if i{last_loop} == 2:')
+    lines.append(f'{indent}    break')
+    return '\n'.join(lines)
+
+
+def dict_literal(size: int) -> str:
+    """
+    A dictionary literal with `size` keys, mixing literal and computed values,
+    followed by lookups and membership tests.
+    """
+    items = []
+    for i in range(size):
+        match i % 3:
+            case 0:
+                items.append(f'    "k{i}": {i},')
+            case 1:
+                items.append(f'    "k{i}": "value {i}",')
+            case _:
+                items.append(f'    "k{i}": f"{{name}} {i}",')
+    lines = [HEADER, 'name = input("name")', 'd = {', *items, '}']
+    for i in range(0, size, max(size // 10, 1)):
+        lines.append(f'if "k{i}" in d:')
+        lines.append(f'    print(d["k{i}"])')
+    return '\n'.join(lines)
+
+
+def list_literal(size: int) -> str:
+    """
+    A list literal with `size` items, iterated over and indexed.
+    """
+    items = [f'    "item {i}",' if i % 2 else f'    {i},' for i in range(size)]
+    lines = [HEADER, 'items = [', *items, ']']
+    lines.append('for item in items:')
+    lines.append('    print(item)')
+    for i in range(0, size, max(size // 10, 1)):
+        lines.append(f'print(items[{i}])')
+    return '\n'.join(lines)
+
+
+def fstrings(size: int) -> str:
+    """
+    Many f-strings, with nested expressions, repeated variables and format
+    strings built out of other f-strings.
+    """
+    lines = [HEADER, 'a = input("a")', 'b = float(input("b"))']
+    for i in range(size):
+        match i % 3:
+            case 0:
+                lines.append(f's{i} = f"{{a}} and {{b + {i}}} and {{a}}"')
+            case 1:
+                lines.append(f's{i} = f"[{{s{i - 1}}}] {{str(b)}} {i}"')
+            case _:
+                lines.append(f'print(f"{{s{i - 1}}}{{s{i - 2}}}")')
+    return '\n'.join(lines)
+
+
+def fetches(size: int) -> str:
+    """
+    Many `fetch` calls with URLs, headers and JSON bodies.
+    """
+    lines = [HEADER, 'token = input("token")']
+    for i in range(size):
+        match i % 3:
+            case 0:
+                lines.append(f'r{i} = fetch(f"https://example.com/{i}?t={{token}}")')
+            case 1:
+                lines.append(
+                    f'r{i} = fetch("https://example.com/post", method="POST", '
+                    f'json={{"id": {i}, "token": token}}, '
+                    f'headers={{"Authorization": f"Bearer {{token}}"}})'
+                )
+            case _:
+                lines.append(f'print(r{i - 1}, r{i - 2})')
+    return '\n'.join(lines)
+
+
+PROGRAMS: dict[str, Callable[[int], str]] = {
+    'straight_line': straight_line,
+    'nested': nested,
+    'dict_literal': dict_literal,
+    'list_literal': list_literal,
+    'fstrings': fstrings,
+    'fetches': fetches,
+}
+
+# python refuses to parse more than 100 levels of indentation, so deeper
+# programs are not generated
+MAX_SIZES: dict[str, int] = {'nested': 98}
+
+DEFAULT_SIZES: dict[str, list[int]] = {name: [100, 1000, 5000] for name in PROGRAMS} | {
+    'nested': [10, 40, 90]
+}
@@ -0,0 +1,178 @@
+"""
+Measures how long the compiler takes on the synthetic programs.
+
+    python -m benchmarks.run -o results.json
+    python -m benchmarks.run -o new.json --compare results.json
+
+For every program and size, this records the best compile time over a few
+runs, the peak memory allocated while compiling (measured in a separate run,
+since tracemalloc slows everything down) and the time it takes to serialize
+the shortcut to binary and XML property lists.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Sequence
+
+from benchmarks.programs import DEFAULT_SIZES, MAX_SIZES, PROGRAMS
+from workflowpy.cache import compiler_version
+from workflowpy.compiler import Compiler
+
+# metrics compared between runs; larger is worse for all of them
+METRICS = ['compile_ms', 'peak_kib', 'binary_ms', 'xml_ms']
+
+
+def _best_time(func: Callable[[], Any], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def _git_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).parent,
+        )
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def measure(source: str, repeat: int) -> dict[str, Any]:
+    shortcut = Compiler().compile(source)
+
+    gc.collect()
+    tracemalloc.start()
+    Compiler().compile(source)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'actions': len(shortcut.WFWorkflowActions),
+        'source_lines': source.count('\n') + 1,
+        'compile_ms': _best_time(lambda: Compiler().compile(source), repeat),
+        'peak_kib': peak / 1024,
+        'binary_ms': _best_time(lambda: shortcut.to_plist_bytes('binary'), repeat),
+        'xml_ms': _best_time(lambda: shortcut.to_plist_bytes('xml'), repeat),
+    }
+
+
+def run(
+    programs: Sequence[str], sizes: Sequence[int] | None, repeat: int
+) -> dict[str, Any]:
+    results = []
+    for name in programs:
+        limit = MAX_SIZES.get(name)
+        # a size given for all programs is capped for those that cannot be
+        # that large, so it might be run only once
+        program_sizes = [
+            size if limit is None else min(size, limit)
+            for size in sizes or DEFAULT_SIZES[name]
+        ]
+        for size in dict.fromkeys(program_sizes):
+            result = {'program': name, 'size': size}
+            result |= measure(PROGRAMS[name](size), repeat)
+            results.append(result)
+            print(
+                f'{name:>14} {size:>6}  {result["actions"]:>7} actions  '
+                f'{result["compile_ms"]:9.1f} ms  {result["peak_kib"]:9.0f} KiB  '
+                f'{result["binary_ms"]:8.1f} ms bin  {result["xml_ms"]:8.1f} ms xml',
+                flush=True,
+            )
+    return {
+        'commit': _git_commit(),
+        'compiler_version': compiler_version(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(old: dict[str, Any], new: dict[str, Any], threshold: float) -> int:
+    """
+    Prints how each metric changed between two runs, and returns the number
+    of regressions larger than `threshold` (a ratio, like 0.1 for 10%).
+    """
+    old_results = {(r['program'], r['size']): r for r in old['results']}
+    print(f'\n{old.get("commit")} -> {new.get("commit")}')
+    regressions = 0
+    for result in new['results']:
+        key = (result['program'], result['size'])
+        previous = old_results.get(key)
+        if previous is None:
+            continue
+        changes = []
+        for metric in METRICS:
+            if not previous.get(metric):
+                continue
+            ratio = result[metric] / previous[metric] - 1
+            flag = ''
+            if ratio > threshold:
+                flag = '!'
+                regressions += 1
+            changes.append(f'{metric} {ratio:+7.1%}{flag:1}')
+        print(f'{key[0]:>14} {key[1]:>6}  ' + '  '.join(changes))
+    print(f'{regressions} regression(s) over {threshold:.0%}')
+    return regressions
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.run', description='Benchmark the compiler.'
+    )
+    parser.add_argument(
+        '-p',
+        '--program',
+        action='append',
+        choices=list(PROGRAMS),
+        help='program to run (default: all of them)',
+    )
+    parser.add_argument(
+        '-s',
+        '--size',
+        type=int,
+        action='append',
+        help='program sizes to run, capped for programs that cannot be that large',
+    )
+    parser.add_argument(
+        '-r', '--repeat', type=int, default=3, help='runs to take the best of'
+    )
+    parser.add_argument('-o', '--output', help='JSON file to save the results to')
+    parser.add_argument('--compare', help='JSON file with results to compare to')
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=0.1,
+        help='slowdown reported as a regression (default: 0.1)',
+    )
+    args = parser.parse_args(argv)
+
+    data = run(args.program or list(PROGRAMS), args.size, args.repeat)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(data, f, indent=2)
+    if args.compare is not None:
+        with open(args.compare) as f:
+            old = json.load(f)
+        if compare(old, data, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
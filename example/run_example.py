@@ -1,5 +1,4 @@
 from pathlib import Path
-import plistlib
 
 from workflowpy.compiler import Compiler
 from workflowpy.utils import sign_shortcut
@@ -13,4 +12,4 @@ shortcut = Compiler().compile(code)
 # signed_shortcut = sign_shortcut(shortcut)
 
 with open(path / 'unsigned.shortcut', 'wb') as f:
-    plistlib.dump(shortcut.model_dump(mode='json'), f)
+    shortcut.write_to(f)
@@ -0,0 +1,6 @@
+import pytest
+
+
+@pytest.fixture(params=[False, True], ids=['plain', 'optimized'])
+def optimize(request) -> bool:
+    return request.param
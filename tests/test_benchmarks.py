@@ -0,0 +1,17 @@
+import ast
+
+import pytest
+
+from benchmarks.programs import MAX_SIZES, PROGRAMS
+from benchmarks.run import run
+
+
+@pytest.mark.parametrize('name', PROGRAMS)
+def test_programs_parse(name: str):
+    ast.parse(PROGRAMS[name](MAX_SIZES.get(name, 20)))
+
+
+def test_sizes_are_capped():
+    data = run(['nested'], [5, 100, 1000], repeat=1)
+    sizes = [result['size'] for result in data['results']]
+    assert sizes == [5, MAX_SIZES['nested']]
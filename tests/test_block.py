@@ -0,0 +1,74 @@
+from workflowpy.block import Block, BlockIndex
+from workflowpy.compiler import Compiler
+from workflowpy.models.internal import Action
+
+
+def _action(uuid: str) -> Action:
+    return Action('is.workflow.actions.gettext', {'UUID': uuid})
+
+
+def test_find_in_nested_blocks():
+    index = BlockIndex()
+    parent, child, sibling = Block(index), Block(index), Block(index)
+    outer, inner = _action('A'), _action('B')
+    parent.append(outer)
+    child.append(inner)
+    assert child.find('B') is inner
+    # an action of an enclosing block is not in the child
+    assert child.find('A') is None
+    assert parent.find('B') is None
+    parent.append_block(child)
+    # once the child is added, its actions are found from the parent
+    assert parent.find('B') is inner
+    assert sibling.find('B') is None
+    assert parent.find('C') is None
+
+
+def test_flatten():
+    index = BlockIndex()
+    parent, child = Block(index), Block(index)
+    actions = [_action(x) for x in 'ABCD']
+    parent.append(actions[0])
+    child.extend(actions[1:3])
+    parent.append_block(child)
+    parent.append(actions[3])
+    assert list(parent) == actions
+
+
+def _identifiers(source: str) -> list[str]:
+    shortcut = Compiler().compile(source)
+    return [
+        action.WFWorkflowActionIdentifier.rsplit('.', 1)[-1]
+        for action in shortcut.WFWorkflowActions
+    ]
+
+
+def test_int_of_input_in_the_same_loop():
+    source = '''
+xs = ["a", "b"]
+for q in xs:
+    x = input("a")
+    print(int(x))
+'''
+    shortcut = Compiler().compile(source)
+    (ask,) = [
+        action
+        for action in shortcut.WFWorkflowActions
+        if action.WFWorkflowActionIdentifier == 'is.workflow.actions.ask'
+    ]
+    assert ask.WFWorkflowActionParameters['WFInputType'] == 'Number'
+    assert _identifiers(source) == ['list', 'each', 'ask', 'showresult', 'each']
+
+
+def test_int_of_input_outside_the_loop():
+    # only actions in the scope of the call are looked at
+    source = '''
+x = input("a")
+xs = ["a", "b"]
+for q in xs:
+    print(int(x))
+print(x)
+'''
+    shortcut = Compiler().compile(source)
+    ask = shortcut.WFWorkflowActions[0]
+    assert 'WFInputType' not in ask.WFWorkflowActionParameters
@@ -0,0 +1,69 @@
+from collections import Counter
+
+from workflowpy.compiler import Compiler
+from workflowpy.emulator import emulate
+
+
+def _identifiers(shortcut) -> Counter[str]:
+    return Counter(
+        action.WFWorkflowActionIdentifier.rsplit('.', 1)[-1]
+        for action in shortcut.WFWorkflowActions
+    )
+
+
+def test_int_rounds_toward_zero(optimize: bool):
+    source = '''
+d = {"a": -2.5, "b": 2.5, "c": -2, "d": 0.7}
+print(f"{int(d['a'])} {int(d['b'])} {int(d['c'])} {int(d['d'])}")
+'''
+    shortcut = Compiler(optimize=optimize).compile(source)
+    assert emulate(shortcut).shown == ['-2 2 -2 0']
+
+
+def test_int_of_unknown_type_is_coerced(optimize: bool):
+    source = '''
+from workflowpy.magic import *
+d: dict = shortcut_input()
+print(f"{int(d['n'])}")
+'''
+    shortcut = Compiler(optimize=optimize).compile(source)
+    condition, *_ = [
+        x
+        for x in shortcut.WFWorkflowActions
+        if x.WFWorkflowActionIdentifier == 'is.workflow.actions.conditional'
+    ]
+    variable = condition.WFWorkflowActionParameters['WFInput']['Variable']
+    assert variable['Value']['Aggrandizements'] == [
+        {
+            'Type': 'WFCoercionVariableAggrandizement',
+            'CoercionItemClass': 'WFNumberContentItem',
+        }
+    ]
+    for value, expected in [('-2.5', '-2'), ('3.9', '3'), (7, '7')]:
+        execution = emulate(shortcut, shortcut_input={'n': value})
+        assert execution.shown == [expected]
+
+
+def test_int_of_text_is_one_action():
+    source = '''
+x = input("a")
+xs = ["a"]
+for q in xs:
+    print(int(x))
+print(x)
+'''
+    shortcut = Compiler().compile(source)
+    assert _identifiers(shortcut) == Counter(
+        {'ask': 1, 'list': 1, 'each': 2, 'number': 1, 'showresult': 2}
+    )
+    assert emulate(shortcut, ['-12']).shown == ['-12', '-12']
+
+
+def test_int_of_input_and_constants():
+    source = '''
+n = int(input("n"))
+print(n + int(2.5) + int(-2.5))
+'''
+    shortcut = Compiler().compile(source)
+    assert _identifiers(shortcut) == Counter({'ask': 1, 'math': 2, 'showresult': 1})
+    assert emulate(shortcut, ['5']).shown == ['5']
@@ -0,0 +1,109 @@
+import zlib
+from pathlib import Path
+
+import pytest
+
+from workflowpy.cache import CompileCache
+from workflowpy.compiler import Compiler
+from workflowpy.modules import modules
+from workflowpy.peephole import PeepholeRule, peephole_rules, register_peephole_rule
+
+SOURCE = 'x = input("x")\nprint(x)\n'
+
+
+@pytest.fixture
+def cache(tmp_path: Path):
+    cache = CompileCache(tmp_path / 'cache.db')
+    yield cache
+    cache.close()
+
+
+def _size(shortcut) -> int:
+    return len(zlib.compress(shortcut.model_dump_json().encode()))
+
+
+def test_round_trip(cache: CompileCache):
+    shortcut = Compiler().compile(SOURCE)
+    key = cache.key(SOURCE)
+    assert cache.get(key) is None
+    cache.put(key, shortcut)
+    assert cache.get(key) == shortcut
+
+
+def test_key(cache: CompileCache):
+    assert cache.key(SOURCE) == cache.key(SOURCE)
+    assert cache.key(SOURCE) != cache.key(SOURCE + '\n')
+    assert cache.key(SOURCE, {'optimize': True}) != cache.key(
+        SOURCE, {'optimize': False}
+    )
+
+
+def test_key_depends_on_modules(cache: CompileCache, monkeypatch):
+    before = cache.key(SOURCE)
+    monkeypatch.setitem(modules, 'extra', {})
+    assert cache.key(SOURCE) != before
+    monkeypatch.undo()
+    assert cache.key(SOURCE) == before
+
+
+class NoRule(PeepholeRule):
+    size = 1
+
+    def rewrite(self, window, context):
+        return None
+
+
+def test_key_depends_on_peephole_rules(cache: CompileCache):
+    before = cache.key(SOURCE)
+    register_peephole_rule(NoRule())
+    try:
+        assert cache.key(SOURCE) != before
+    finally:
+        peephole_rules.pop()
+    assert cache.key(SOURCE) == before
+
+
+def test_compiler_uses_cache(cache: CompileCache):
+    compiler = Compiler(cache=cache)
+    shortcut = compiler.compile(SOURCE)
+    assert compiler.source_map is not None
+    assert compiler.compile(SOURCE) == shortcut
+    # the shortcut came from the cache, so nothing was compiled
+    assert compiler.source_map is None
+    # other options give another shortcut
+    other = Compiler(cache=cache, optimize=False)
+    other.compile(SOURCE)
+    assert other.source_map is not None
+
+
+def test_least_recently_used_are_evicted(tmp_path: Path):
+    shortcuts = [Compiler().compile(f'print("{i}")\n') for i in range(3)]
+    cache = CompileCache(
+        tmp_path / 'cache.db', max_size=sum(_size(x) for x in shortcuts[:2])
+    )
+    cache.put('a', shortcuts[0])
+    cache.put('b', shortcuts[1])
+    assert cache.get('a') is not None
+    cache.put('c', shortcuts[2])
+    assert cache.get('b') is None
+    assert cache.get('a') == shortcuts[0]
+    assert cache.get('c') == shortcuts[2]
+    cache.close()
+
+
+def test_broken_entry_is_a_miss(cache: CompileCache):
+    cache.put('a', Compiler().compile(SOURCE))
+    cache.connection.execute("UPDATE entries SET value = x'00'")
+    assert cache.get('a') is None
+
+
+def test_shared_between_connections(tmp_path: Path):
+    first = CompileCache(tmp_path / 'cache.db')
+    second = CompileCache(tmp_path / 'cache.db')
+    shortcut = Compiler().compile(SOURCE)
+    first.put('a', shortcut)
+    assert second.get('a') == shortcut
+    second.clear()
+    assert first.get('a') is None
+    first.close()
+    second.close()
@@ -0,0 +1,86 @@
+from collections import Counter
+
+import pytest
+
+from workflowpy.compiler import Compiler
+from workflowpy.emulator import emulate
+
+
+def shown(source: str, optimize: bool, inputs: list[str] = []) -> list[str]:
+    shortcut = Compiler(optimize=optimize).compile(source)
+    return emulate(shortcut, inputs).shown
+
+
+LISTCOMPS = {
+    'map': (
+        '''
+xs = ["1", "2", "3"]
+ys = [int(x) * 2 for x in xs]
+print(f"{ys}")
+''',
+        ['2\n4\n6'],
+    ),
+    'filter': (
+        '''
+ws = [w for w in ["a", "b", "a", "c"] if w != "a"]
+print(f"{ws}")
+''',
+        ['b\nc'],
+    ),
+    'constant': (
+        '''
+k = int(input("k"))
+cs = [k + 1 for x in ["a", "b"]]
+ds = [5 for x in ["a", "b"]]
+print(f"{cs} {ds}")
+''',
+        ['4\n4 5\n5'],
+    ),
+    'enumerate': (
+        '''
+es = [f"{v}!" for i, v in enumerate(["p", "q"])]
+print(f"{es}")
+''',
+        ['p!\nq!'],
+    ),
+    'nested': (
+        '''
+xs = ["1", "2", "3"]
+rows = [[f"{x}{y}" for y in ["a", "b"]] for x in xs if x != "2"]
+print(f"{rows}")
+''',
+        ['1a\n1b\n3a\n3b'],
+    ),
+    'dict keys': (
+        '''
+d = {"a": 1, "b": 2}
+keys = [k for k in d]
+print(f"{keys}")
+''',
+        ['a\nb'],
+    ),
+}
+
+
+@pytest.mark.parametrize('name', LISTCOMPS)
+def test_list_comprehension(name: str, optimize: bool):
+    source, expected = LISTCOMPS[name]
+    assert shown(source, optimize, ['3']) == expected
+
+
+def test_one_loop_collects_the_results(optimize: bool):
+    source = LISTCOMPS['filter'][0]
+    actions = Compiler(optimize=optimize).compile(source).WFWorkflowActions
+    assert Counter(x.WFWorkflowActionIdentifier for x in actions) == {
+        'is.workflow.actions.list': 1,
+        'is.workflow.actions.repeat.each': 2,
+        'is.workflow.actions.conditional': 2,
+        'is.workflow.actions.getvariable': 1,
+        'is.workflow.actions.showresult': 1,
+    }
+    # the list is the Repeat Results of the loop
+    end = actions[-2]
+    text = actions[-1].WFWorkflowActionParameters['Text']['Value']
+    (ref,) = text['attachmentsByRange'].values()
+    assert ref['OutputUUID'] == end.uuid is not None
+    assert ref['OutputName'] == 'Repeat Results'
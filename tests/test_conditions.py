@@ -0,0 +1,37 @@
+from collections import Counter
+
+from workflowpy.compiler import Compiler
+from workflowpy.emulator import emulate
+
+SOURCE = '''
+d = {"a": 1, "b": "two"}
+x = input("x")
+if x in d:
+    print("in")
+if x not in d:
+    print("not in")
+'''
+
+
+def test_membership_is_a_lookup():
+    actions = Compiler(optimize=False).compile(SOURCE).WFWorkflowActions
+    assert Counter(x.WFWorkflowActionIdentifier for x in actions) == {
+        'is.workflow.actions.dictionary': 1,
+        'is.workflow.actions.ask': 1,
+        'is.workflow.actions.getvalueforkey': 2,
+        'is.workflow.actions.conditional': 4,
+        'is.workflow.actions.showresult': 2,
+    }
+    conditions = [
+        x.WFWorkflowActionParameters['WFCondition']
+        for x in actions
+        if 'WFCondition' in x.WFWorkflowActionParameters
+    ]
+    assert conditions == [100, 101]
+
+
+def test_membership(optimize: bool):
+    shortcut = Compiler(optimize=optimize).compile(SOURCE)
+    assert emulate(shortcut, ['a']).shown == ['in']
+    assert emulate(shortcut, ['b']).shown == ['in']
+    assert emulate(shortcut, ['c']).shown == ['not in']
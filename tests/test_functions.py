@@ -0,0 +1,98 @@
+import plistlib
+
+import pytest
+
+from workflowpy.cli import main
+from workflowpy.compiler import Compiler
+from workflowpy.emulator import emulate
+from workflowpy.incremental import IncrementalCompiler
+
+# big enough to be compiled once when it is called twice
+BODY = ''.join(f'    print(f"{{n}} {i}")\n' for i in range(12))
+
+PROGRAMS = {
+    'text and numbers': 'def f(s, n):\n    print(s)\n'
+    + BODY
+    + 'f(input("s"), 1)\nf("x", 2.5)\n',
+    'return value': 'def f(s, n) -> str:\n'
+    + BODY
+    + '    return f"<{s}>"\nprint(f(input("s"), 1))\nprint(f("x", 2))\n',
+    'untyped parameter': 'def f(s, n):\n    if s == "x":\n        print("is x")\n'
+    + BODY
+    + 'f(input("s"), 1)\nf("x", 2)\n',
+    'list': 'def f(xs, n):\n    for x in xs:\n        print(x)\n'
+    + BODY
+    + 'f(["a", "b"], 1)\nf(["c", input("s")], 2)\n',
+    'dictionary': 'def f(d, n):\n    print(d["k"])\n'
+    + BODY
+    + 'f({"k": "a"}, 1)\nf({"k": input("s")}, 2)\n',
+    'global in a callee': 'g = input("g")\ndef h():\n    print(g)\n'
+    + 'def f(n):\n    h()\n'
+    + BODY
+    + 'f(1)\nf(2)\n',
+    'function in a callee': 'def h(s):\n    print(f"[{s}]")\n'
+    + 'def f(s, n):\n    h(s)\n'
+    + BODY
+    + 'f(input("s"), 1)\nf("x", 2)\n',
+}
+
+
+def _runs(shortcut) -> int:
+    return sum(
+        x.WFWorkflowActionIdentifier == 'is.workflow.actions.runworkflow'
+        for x in shortcut.WFWorkflowActions
+    )
+
+
+@pytest.mark.parametrize('program', PROGRAMS)
+def test_outlined_matches_inlined(program: str, optimize: bool):
+    source = PROGRAMS[program]
+    inlined = Compiler(optimize=optimize, inline_threshold=10**6).compile(source)
+    outlined = Compiler(optimize=optimize, inline_threshold=2).compile(source)
+    assert _runs(inlined) == 0
+    expected = emulate(inlined, ['q', 'r'])
+    assert emulate(outlined, ['q', 'r']).shown == expected.shown
+
+
+def test_outlined_functions():
+    shortcut = Compiler(inline_threshold=2).compile(PROGRAMS['text and numbers'])
+    assert _runs(shortcut) == 2
+    # calls with lists or dictionaries are inlined, and so are functions
+    # that read the variables of the module through the functions they call
+    for program in ['list', 'dictionary', 'global in a callee']:
+        shortcut = Compiler(inline_threshold=2).compile(PROGRAMS[program])
+        assert _runs(shortcut) == 0
+        inlined = Compiler(inline_threshold=10**6).compile(PROGRAMS[program])
+        assert len(shortcut.WFWorkflowActions) == len(inlined.WFWorkflowActions)
+
+
+def test_small_functions_are_inlined():
+    source = 'def f(s):\n    print(s)\nf("a")\nf("b")\n'
+    shortcut = Compiler(inline_threshold=2).compile(source)
+    assert _runs(shortcut) == 0
+    assert emulate(shortcut).shown == ['a', 'b']
+
+
+def test_incremental_calls():
+    compiler = IncrementalCompiler(inline_threshold=2)
+    source = PROGRAMS['text and numbers']
+    assert _runs(compiler.compile(source)) == 2
+    # the second call is inlined now, and the first one is reused
+    edited = source.replace('f("x", 2.5)', 'f(["x"], 2.5)')
+    shortcut = compiler.compile(edited)
+    assert compiler.reused > 0
+    fresh = Compiler(inline_threshold=2).compile(edited)
+    assert len(shortcut.WFWorkflowActions) == len(fresh.WFWorkflowActions)
+    assert emulate(shortcut, ['q']).shown == emulate(fresh, ['q']).shown
+
+
+@pytest.mark.parametrize('threshold, runs', [('2', 2), ('1000', 0)])
+def test_cli_inline_threshold(tmp_path, threshold: str, runs: int):
+    source = tmp_path / 'a.py'
+    source.write_text(PROGRAMS['text and numbers'])
+    assert main(['build', '-j', '1', '--inline-threshold', threshold, str(source)]) == 0
+    with open(tmp_path / 'a.shortcut', 'rb') as f:
+        actions = plistlib.load(f)['WFWorkflowActions']
+    assert [x['WFWorkflowActionIdentifier'] for x in actions].count(
+        'is.workflow.actions.runworkflow'
+    ) == runs
@@ -0,0 +1,106 @@
+import json
+import re
+
+import pytest
+
+from workflowpy.compiler import Compiler
+from workflowpy.emulator import emulate
+from workflowpy.incremental import IncrementalCompiler
+
+UUID = re.compile(
+    r'[0-9A-Fa-f]{8}-[0-9A-Fa-f]{4}-[0-9A-Fa-f]{4}-[0-9A-Fa-f]{4}-[0-9A-Fa-f]{12}'
+)
+
+SOURCE = '''from workflowpy.magic import *
+x = input("a")
+y = int(x)
+d = {"a": 1, "b": f"hi {x}", "c": y}
+if "a" in d:
+    print(d["a"])
+for k in d:
+    print(f"{k} {y + 1}")
+for i in range(3):
+    print(i * 2)
+xs = [int(v) for v in ["1", "2"] if v != "1"]
+print(f"{xs}")
+def twice(s: str) -> str:
+    return f"{s}{s}"
+print(twice(x))
+print(twice("b"))
+'''
+
+EDITS = {
+    'unchanged': lambda lines: lines,
+    'blank line': lambda lines: lines[:1] + [''] + lines[1:],
+    'changed constant': lambda lines: [
+        l.replace('range(3)', 'range(4)') for l in lines
+    ],
+    'removed statement': lambda lines: [l for l in lines if 'twice("b")' not in l],
+    'changed type': lambda lines: [
+        l.replace('y = int(x)', 'y = float(x)') for l in lines
+    ],
+    'appended': lambda lines: lines + ['print(y)'],
+}
+
+
+def normalized(shortcut) -> str:
+    # the same actions may get different UUIDs, so only the way they refer
+    # to each other is compared
+    text = json.dumps([action.model_dump() for action in shortcut.WFWorkflowActions])
+    ids: dict[str, str] = {}
+    return UUID.sub(lambda m: ids.setdefault(m.group(), f'U{len(ids)}'), text)
+
+
+@pytest.mark.parametrize('edit', EDITS)
+def test_matches_fresh_compile(edit: str):
+    compiler = IncrementalCompiler()
+    compiler.compile(SOURCE)
+    source = '\n'.join(EDITS[edit](SOURCE.splitlines())) + '\n'
+    assert normalized(compiler.compile(source)) == normalized(
+        Compiler().compile(source)
+    )
+
+
+def test_reuses_statements():
+    compiler = IncrementalCompiler()
+    first = compiler.compile(SOURCE)
+    assert compiler.reused == 0
+    second = compiler.compile(SOURCE)
+    assert compiler.recompiled == 0
+    assert second.WFWorkflowActions == first.WFWorkflowActions
+
+
+def test_recompiles_changed_statements():
+    compiler = IncrementalCompiler()
+    compiler.compile(SOURCE)
+    compiler.compile(SOURCE.replace('range(3)', 'range(4)'))
+    assert compiler.recompiled == 1
+    assert compiler.reused > 0
+
+
+CALLS = {
+    'direct': '''g = input("g")
+def f():
+    print(g)
+g = "two"
+f()
+''',
+    'transitive': '''g = input("g")
+def h():
+    print(g)
+def f():
+    h()
+g = "two"
+f()
+''',
+}
+
+
+@pytest.mark.parametrize('calls', CALLS)
+def test_recompiles_calls_when_globals_change(calls: str):
+    compiler = IncrementalCompiler()
+    compiler.compile(CALLS[calls])
+    source = CALLS[calls].replace('"two"', '"three"')
+    shortcut = compiler.compile(source)
+    assert normalized(shortcut) == normalized(Compiler().compile(source))
+    assert emulate(shortcut, ['one']).shown == ['three']
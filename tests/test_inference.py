@@ -0,0 +1,78 @@
+import ast
+
+from workflowpy import value_type as T
+from workflowpy.compiler import Compiler
+from workflowpy.emulator import emulate
+from workflowpy.inference import infer_types
+
+
+def _types(source: str) -> dict[tuple[str, int], T.ValueType]:
+    return {
+        (ast.unparse(node), node.lineno): type
+        for node, type in infer_types(ast.parse(source)).items()
+    }
+
+
+def test_literal_dicts():
+    types = _types('''
+d = {"a": 1, "b": -2, "c": "x", "e": {"f": 2.5}, "g": input("g")}
+a = d["a"]
+b = d["b"]
+c = d["c"]
+f = d["e"]["f"]
+g = d["g"]
+h = d["h"]
+''')
+    assert types[('d', 2)] is T.dictionary
+    assert types[('a', 3)] is T.integer
+    assert types[('b', 4)] is T.integer
+    assert types[('c', 5)] is T.text
+    assert types[('f', 6)] is T.number
+    # anything but a literal number is stored as text
+    assert types[('g', 7)] is T.text
+    assert ('h', 8) not in types
+
+
+def test_branches_and_loops():
+    types = _types('''
+n = int(input("n"))
+if n > 1:
+    m = n
+else:
+    m = 2.5
+x = m
+s = 1
+for i in range(3):
+    s = "a"
+t = s
+for v in [1, 2]:
+    w = v
+''')
+    assert types[('n', 2)] is T.integer
+    assert types[('x', 7)] is T.number
+    assert types[('i', 9)] is T.integer
+    # the loop might not run, so s is either a number or text
+    assert ('t', 11) not in types
+    assert types[('w', 13)] is T.text
+
+
+def test_known_types_are_not_converted():
+    source = '''
+d = {"a": 1, "b": "x"}
+print(d["a"] + 1)
+print(d["b"])
+'''
+    shortcut = Compiler(optimize=False).compile(source)
+    identifiers = [x.WFWorkflowActionIdentifier for x in shortcut.WFWorkflowActions]
+    assert 'is.workflow.actions.number' not in identifiers
+    assert emulate(shortcut).shown == ['2', 'x']
+
+
+def test_negative_literals_are_numbers(optimize: bool):
+    source = '''
+d = {"c": -2}
+if d["c"] < 0:
+    print("negative")
+'''
+    shortcut = Compiler(optimize=optimize).compile(source)
+    assert emulate(shortcut).shown == ['negative']
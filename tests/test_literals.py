@@ -0,0 +1,110 @@
+from workflowpy.compiler import Compiler
+from workflowpy.emulator import emulate
+
+
+def _actions(source: str):
+    return Compiler(optimize=False).compile(source).WFWorkflowActions
+
+
+def test_fstring_literals_are_inline():
+    actions = _actions('x = input("a")\nprint(f"a {x} b")\n')
+    assert [x.WFWorkflowActionIdentifier for x in actions] == [
+        'is.workflow.actions.ask',
+        'is.workflow.actions.showresult',
+    ]
+    text = actions[1].WFWorkflowActionParameters['Text']
+    assert text['Value']['string'] == 'a \ufffc b'
+    assert list(text['Value']['attachmentsByRange']) == ['{2, 1}']
+
+
+def test_constants_are_inline():
+    actions = _actions('print(5)\nprint("hi")\n')
+    assert [x.WFWorkflowActionParameters for x in actions] == [
+        {'Text': '5'},
+        {'Text': 'hi'},
+    ]
+
+
+def test_numbers_in_conditions_and_math_are_inline():
+    source = '''
+n = int(input("a"))
+if n > 90:
+    print("big")
+print(n + 2)
+'''
+    actions = _actions(source)
+    identifiers = [x.WFWorkflowActionIdentifier for x in actions]
+    assert 'is.workflow.actions.number' not in identifiers
+    assert 'is.workflow.actions.gettext' not in identifiers
+    condition = actions[1].WFWorkflowActionParameters
+    assert condition['WFNumberValue'] == '90'
+    math = actions[4].WFWorkflowActionParameters
+    assert math['WFMathOperand'] == '2'
+    shortcut = Compiler(optimize=False).compile(source)
+    assert emulate(shortcut, ['95']).shown == ['big', '97']
+    assert emulate(shortcut, ['5']).shown == ['7']
+
+
+def test_dict_literal_is_one_action():
+    source = '''
+x = input("x")
+d = {"a": 1, "b": "two", "c": x, f"k{x}": 4}
+print(d["a"])
+print(d["b"])
+print(d["c"])
+print(d["kq"])
+'''
+    actions = _actions(source)
+    assert [x.WFWorkflowActionIdentifier for x in actions[:2]] == [
+        'is.workflow.actions.ask',
+        'is.workflow.actions.dictionary',
+    ]
+    items = actions[1].WFWorkflowActionParameters['WFItems']['Value'][
+        'WFDictionaryFieldValueItems'
+    ]
+    assert [(x['WFKey'], x['WFItemType']) for x in items[:3]] == [
+        ('a', 3),
+        ('b', 0),
+        ('c', 0),
+    ]
+    shortcut = Compiler(optimize=False).compile(source)
+    assert emulate(shortcut, ['q']).shown == ['1', 'two', 'q', '4']
+
+
+def test_dict_keys_that_cannot_be_inlined_are_set():
+    source = '''
+x = input("x")
+d = {"a": 1, x: 2}
+print(d["a"])
+print(d["q"])
+'''
+    actions = _actions(source)
+    assert [x.WFWorkflowActionIdentifier for x in actions[:3]] == [
+        'is.workflow.actions.ask',
+        'is.workflow.actions.dictionary',
+        'is.workflow.actions.setvalueforkey',
+    ]
+    shortcut = Compiler(optimize=False).compile(source)
+    assert emulate(shortcut, ['q']).shown == ['1', '2']
+
+
+def test_list_literal_is_one_action():
+    source = '''
+x = input("x")
+for v in [90, 80, "a", x, f"<{x}>"]:
+    print(v)
+'''
+    actions = _actions(source)
+    assert [x.WFWorkflowActionIdentifier for x in actions[:3]] == [
+        'is.workflow.actions.ask',
+        'is.workflow.actions.list',
+        'is.workflow.actions.repeat.each',
+    ]
+    items = actions[1].WFWorkflowActionParameters['WFItems']
+    assert items[:3] == [
+        {'WFItemType': 0, 'WFValue': '90'},
+        {'WFItemType': 0, 'WFValue': '80'},
+        {'WFItemType': 0, 'WFValue': 'a'},
+    ]
+    shortcut = Compiler(optimize=False).compile(source)
+    assert emulate(shortcut, ['q']).shown == ['90', '80', 'a', 'q', '<q>']
@@ -0,0 +1,101 @@
+import pytest
+
+from workflowpy.compiler import Compiler
+from workflowpy.emulator import emulate
+
+
+def shown(source: str, optimize: bool, inputs: list[str] = []) -> list[str]:
+    shortcut = Compiler(optimize=optimize).compile(source)
+    return emulate(shortcut, inputs).shown
+
+
+BREAKS = {
+    'first': (
+        '''
+xs = ["a", "b", "c", "d"]
+for x in xs:
+    print(x)
+    if x == "b":
+        break
+print("end")
+''',
+        ['a', 'b', 'end'],
+    ),
+    'never': (
+        '''
+xs = ["a", "b"]
+for x in xs:
+    print(x)
+    if x == "z":
+        break
+print("end")
+''',
+        ['a', 'b', 'end'],
+    ),
+    'nested': (
+        '''
+xs = ["a", "b", "c"]
+for x in xs:
+    for y in xs:
+        print(f"{x}{y}")
+        if y == "b":
+            break
+    if x == "b":
+        break
+print("end")
+''',
+        ['aa', 'ab', 'ba', 'bb', 'end'],
+    ),
+    'long': (
+        'xs = [' + ', '.join(f'"i{n}"' for n in range(60)) + ''']
+for x in xs:
+    print(x)
+    if x == "i2":
+        break
+print("end")
+''',
+        ['i0', 'i1', 'i2', 'end'],
+    ),
+    'tail': (
+        '''
+d = {"a": 1, "b": 2, "c": 3}
+for k in d:
+    print(k)
+    if k == "b":
+        break
+''',
+        ['a', 'b'],
+    ),
+}
+
+
+@pytest.mark.parametrize('name', BREAKS)
+def test_break(name: str, optimize: bool):
+    source, expected = BREAKS[name]
+    assert shown(source, optimize) == expected
+
+
+def test_break_skips_the_rest_of_a_long_list():
+    source, _ = BREAKS['long']
+    early = emulate(Compiler().compile(source))
+    late = emulate(Compiler().compile(source.replace('x == "i2"', 'x == "zz"')))
+    # the items after the break are not even looked at
+    assert early.actions * 4 < late.actions
+
+
+def _counts(source: str) -> int:
+    actions = Compiler().compile(source).WFWorkflowActions
+    return sum(
+        x.WFWorkflowActionIdentifier == 'is.workflow.actions.count' for x in actions
+    )
+
+
+def test_only_lists_of_known_length_are_chunked():
+    source, _ = BREAKS['long']
+    assert _counts(source) == 1
+    # the length of a list made by a loop is not known, and it might be short
+    unknown = source.replace('for x in xs:', 'ys = [x for x in xs]\nfor x in ys:')
+    assert _counts(unknown) == 0
+    assert shown(unknown, True) == ['i0', 'i1', 'i2', 'end']
+    # chunks cost more than they save on a short list
+    assert _counts(BREAKS['first'][0]) == 0
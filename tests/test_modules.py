@@ -0,0 +1,85 @@
+import importlib.metadata
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from workflowpy import modules as registry
+from workflowpy.compiler import Compiler
+from workflowpy.modules import ENTRY_POINT_GROUP, modules, register
+
+PACKAGE = '''from workflowpy.definitions.action import ActionHelper as H, action
+
+
+@action()
+def beep(h: H, /):
+    h.action('is.workflow.actions.vibrate')
+
+
+module = {'beep': beep}
+actions = module
+'''
+
+
+@pytest.fixture
+def package(tmp_path: Path, monkeypatch):
+    """
+    An importable Python package defining a module, with a fresh name for
+    each test, and a `packs` module path to register it under.
+    """
+    name = f'pack_{tmp_path.name}'.replace('-', '_')
+    (tmp_path / f'{name}.py').write_text(PACKAGE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setitem(modules, 'packs', {})
+    yield name
+    sys.modules.pop(name, None)
+
+
+def _identifiers(source: str) -> list[str]:
+    shortcut = Compiler().compile(source)
+    return [x.WFWorkflowActionIdentifier for x in shortcut.WFWorkflowActions]
+
+
+def test_modules_are_imported_when_used():
+    code = '''
+import sys
+from workflowpy.compiler import Compiler
+Compiler().compile('print("a")')
+print('workflowpy.modules._workflowpy.magic' in sys.modules)
+Compiler().compile('from workflowpy.magic import *\\nprint("a")')
+print('workflowpy.modules._workflowpy.magic' in sys.modules)
+'''
+    result = subprocess.run(
+        [sys.executable, '-c', code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.split() == ['False', 'True']
+
+
+def test_register_lazily(package: str):
+    register('packs.beeps', f'{package}:actions')
+    assert package not in sys.modules
+    assert _identifiers('from packs.beeps import beep\nbeep()\n') == [
+        'is.workflow.actions.vibrate'
+    ]
+    assert package in sys.modules
+    with pytest.raises(ValueError):
+        register('packs.beeps', package)
+
+
+def test_entry_points(package: str, monkeypatch):
+    entry_point = importlib.metadata.EntryPoint(
+        'packs.installed', package, ENTRY_POINT_GROUP
+    )
+
+    def entry_points(group: str):
+        return [entry_point] if group == ENTRY_POINT_GROUP else []
+
+    monkeypatch.setattr(importlib.metadata, 'entry_points', entry_points)
+    monkeypatch.setattr(registry, '_entry_points_loaded', False)
+    assert _identifiers('from packs.installed import beep\nbeep()\n') == [
+        'is.workflow.actions.vibrate'
+    ]
+    # modules that are not installed are still reported
+    with pytest.raises(NotImplementedError):
+        Compiler().compile('from packs.missing import beep\n')
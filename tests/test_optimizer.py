@@ -0,0 +1,180 @@
+from collections import Counter
+
+from workflowpy.block import Block, BlockIndex
+from workflowpy.compiler import Compiler
+from workflowpy.emulator import emulate
+from workflowpy.models.internal import Action
+from workflowpy.optimizer import collected_actions, hoist_loop_invariants
+
+INPUT = {'k': 'v', 'n': '4'}
+
+
+def _identifiers(shortcut) -> Counter[str]:
+    return Counter(
+        action.WFWorkflowActionIdentifier.rsplit('.', 1)[-1]
+        for action in shortcut.WFWorkflowActions
+    )
+
+
+def _compile_both(source: str):
+    plain = Compiler(optimize=False).compile(source)
+    optimized = Compiler().compile(source)
+    plain_run = emulate(plain, ['3'], shortcut_input=INPUT)
+    optimized_run = emulate(optimized, ['3'], shortcut_input=INPUT)
+    assert optimized_run.shown == plain_run.shown
+    assert optimized_run.actions <= plain_run.actions
+    return plain, optimized, optimized_run
+
+
+def test_common_subexpressions():
+    source = '''
+from workflowpy.magic import *
+d: dict = shortcut_input()
+print(f"{d['k']} {d['k']}")
+n = int(d['n'])
+print(f"{n + 1} {n + 1}")
+for k in d:
+    print(f"{d['k']} {n + 1} {d[k]} {d[k]}")
+'''
+    plain, optimized, execution = _compile_both(source)
+    # d['k'] and n + 1 are computed once and reused in the loop, but d[k]
+    # depends on the loop item
+    assert _identifiers(plain)['getvalueforkey'] == 6
+    assert _identifiers(optimized)['getvalueforkey'] == 3
+    assert _identifiers(optimized)['math'] == 1
+    assert execution.shown == ['v v', '5 5', 'v 5 v v', 'v 5 4 4']
+
+
+def test_common_subexpressions_in_branches():
+    source = '''
+from workflowpy.magic import *
+d: dict = shortcut_input()
+if input("p") == "3":
+    print(d['k'])
+else:
+    print(d['k'])
+print(d['k'])
+'''
+    _, optimized, execution = _compile_both(source)
+    # a lookup in a branch is not reused after it, as it might not have run
+    assert _identifiers(optimized)['getvalueforkey'] == 3
+    assert execution.shown == ['v', 'v']
+
+
+def test_dead_actions():
+    source = '''
+from workflowpy.magic import *
+d: dict = shortcut_input()
+d['unused']
+x = [1, 2, 3]
+y = d['k']
+z = y
+print(f"{d['n']}")
+'''
+    _, optimized, execution = _compile_both(source)
+    assert _identifiers(optimized) == Counter({'getvalueforkey': 1, 'showresult': 1})
+    assert execution.shown == ['4']
+
+
+def test_actions_with_effects_are_kept():
+    source = '''
+from workflowpy.magic import *
+x = input("a")
+fetch("https://example.com")
+print("done")
+'''
+    _, optimized, _ = _compile_both(source)
+    assert _identifiers(optimized) == Counter(
+        {'ask': 1, 'downloadurl': 1, 'showresult': 1}
+    )
+
+
+def _flow(shortcut) -> list[str]:
+    # identifiers, with the control flow mode of loops and conditions
+    return [
+        action.WFWorkflowActionIdentifier.rsplit('.', 1)[-1]
+        + str(action.WFWorkflowActionParameters.get('WFControlFlowMode', ''))
+        for action in shortcut.WFWorkflowActions
+    ]
+
+
+def test_loop_invariants_are_hoisted():
+    source = '''
+from workflowpy.magic import *
+d: dict = shortcut_input()
+p = input("p")
+for i in range(2):
+    for j in range(2):
+        s = f"{p}!"
+        t = [s, "u"]
+        for x in t:
+            print(f"{x}{d['k']}")
+'''
+    plain, optimized, execution = _compile_both(source)
+    assert _flow(plain).index('list') > _flow(plain).index('count0')
+    # the list is made once, before both loops; looking up a key might fail,
+    # so it stays in the loop in case the loop does not run
+    flow = _flow(optimized)
+    assert flow.index('list') < flow.index('count0')
+    assert flow.index('getvalueforkey') > flow.index('each0')
+    assert execution.shown == ['3!v', 'uv'] * 4
+
+
+def test_actions_that_might_fail_are_not_hoisted():
+    source = '''
+from workflowpy.magic import *
+d: dict = shortcut_input()
+xs = [x for x in ["a"] if x == "b"]
+for x in xs:
+    print(d["k"])
+    n = int(d["n"])
+    print(n + 1)
+print("done")
+'''
+    plain = Compiler(optimize=False).compile(source)
+    optimized = Compiler().compile(source)
+    assert _flow(optimized) == _flow(plain)
+    # the shortcut input is not a dictionary, but the loop does not run
+    assert emulate(optimized, shortcut_input='text').shown == ['done']
+
+
+def _text(uuid: str, text) -> Action:
+    return Action(
+        'is.workflow.actions.gettext', {'WFTextActionText': text, 'UUID': uuid}
+    )
+
+
+def test_blocks_in_the_loop_body():
+    index = BlockIndex()
+    body, inner = Block(index), Block(index)
+    inner.append(Action('is.workflow.actions.setvariable', {'WFVariableName': 'v'}))
+    inner.append(_text('I', 'i'))
+    reads_variable = _text('A', {'Value': {'Type': 'Variable', 'VariableName': 'v'}})
+    reads_output = _text('B', {'Value': {'OutputUUID': 'I', 'Type': 'ActionOutput'}})
+    constant = _text('C', 'c')
+    body.append(reads_variable)
+    body.append_block(inner)
+    body.extend([reads_output, constant])
+    # variables written and outputs made in blocks of the body are seen
+    assert hoist_loop_invariants(body, 1) == [constant]
+    assert body.items == [reads_variable, inner, reads_output]
+    assert body.effects == ({'v'}, {'A', 'I', 'B'})
+
+
+def test_collected_actions():
+    source = '''
+xs = ["1", "2"]
+rows = [[f"{x}{y}" for y in ["a", "b"] if y != "a"] for x in xs]
+print(f"{rows}")
+'''
+    actions = Compiler().compile(source).WFWorkflowActions
+    collected = collected_actions(actions)
+    # the inner loop is the last thing in the outer one, and the If the last
+    # thing in the inner loop, so the results of each come from the action
+    # before the end of the If
+    assert [
+        action.WFWorkflowActionIdentifier.rsplit('.', 1)[-1]
+        for action in actions
+        if id(action) in collected
+    ] == ['gettext']
+    assert emulate(Compiler().compile(source)).shown == ['1b\n2b']
@@ -0,0 +1,102 @@
+from workflowpy import value_type as T
+from workflowpy.compiler import Compiler
+from workflowpy.emulator import emulate
+from workflowpy.models.internal import Action
+from workflowpy.peephole import (
+    NumberInputRule,
+    PeepholeRule,
+    RedundantCoercionRule,
+    Rewrite,
+    optimize_peephole,
+    peephole_rules,
+    register_peephole_rule,
+)
+
+
+def _ref(action: Action, name: str) -> dict:
+    return {
+        'Value': {
+            'OutputName': name,
+            'OutputUUID': action.uuid,
+            'Type': 'ActionOutput',
+        },
+        'WFSerializationType': 'WFTextTokenAttachment',
+    }
+
+
+def _number(value) -> Action:
+    return Action(
+        'is.workflow.actions.number', {'WFNumberActionNumber': value, 'UUID': 'N'}
+    )
+
+
+def _round(number: Action) -> Action:
+    return Action(
+        'is.workflow.actions.round', {'WFInput': _ref(number, 'Number'), 'UUID': 'R'}
+    )
+
+
+def test_number_input_rule():
+    variable = {'Type': 'Variable', 'VariableName': 'v'}
+    attachment = {'Value': variable, 'WFSerializationType': 'WFTextTokenAttachment'}
+    number = _number(attachment)
+    (result,) = optimize_peephole([number, _round(number)], [NumberInputRule()])
+    assert result.WFWorkflowActionParameters['WFInput'] == attachment
+
+
+def test_number_input_rule_keeps_text():
+    text = {
+        'Value': {'attachmentsByRange': {}, 'string': '1.5'},
+        'WFSerializationType': 'WFTextTokenString',
+    }
+    number = _number(text)
+    actions = [number, _round(number)]
+    assert optimize_peephole(actions, [NumberInputRule()]) == actions
+
+
+def test_number_input_rule_keeps_used_numbers():
+    variable = {'Type': 'Variable', 'VariableName': 'v'}
+    number = _number(
+        {'Value': variable, 'WFSerializationType': 'WFTextTokenAttachment'}
+    )
+    show = Action('is.workflow.actions.showresult', {'Text': _ref(number, 'Number')})
+    actions = [number, _round(number), show]
+    assert optimize_peephole(actions, [NumberInputRule()]) == actions
+
+
+def test_redundant_coercion_rule():
+    math = Action(
+        'is.workflow.actions.math',
+        {'WFInput': '1', 'WFMathOperand': '2', 'WFMathOperation': '+'},
+    ).with_output('Calculation Result', T.number)
+    number = Action(
+        'is.workflow.actions.number',
+        {'WFNumberActionNumber': _ref(math, 'Calculation Result'), 'UUID': 'N'},
+    )
+    show = Action('is.workflow.actions.showresult', {'Text': _ref(number, 'Number')})
+    result = optimize_peephole([math, number, show], [RedundantCoercionRule()])
+    assert result == [math, show]
+    assert show.WFWorkflowActionParameters['Text']['Value']['OutputUUID'] == math.uuid
+
+
+class ByeRule(PeepholeRule):
+    def rewrite(self, window, context):
+        (action,) = window
+        params = action.WFWorkflowActionParameters
+        if params.get('Text') != 'hi':
+            return None
+        replacement = action.copy()
+        replacement.WFWorkflowActionParameters = {'Text': 'bye'}
+        return Rewrite([replacement])
+
+
+def test_registered_rules_are_run():
+    register_peephole_rule(ByeRule())
+    try:
+        shortcut = Compiler().compile('print("hi")\nprint("hello")\n')
+        plain = Compiler(optimize=False).compile('print("hi")\n')
+    finally:
+        peephole_rules.pop()
+    assert emulate(shortcut).shown == ['bye', 'hello']
+    # rules only run when optimizing
+    assert emulate(plain).shown == ['hi']
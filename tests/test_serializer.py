@@ -0,0 +1,31 @@
+import plistlib
+from pathlib import Path
+
+import pytest
+
+from workflowpy.compiler import Compiler
+from workflowpy.models.shortcuts import Shortcut
+
+EXAMPLE = Path(__file__).parent.parent / 'example' / 'example.py'
+
+
+@pytest.fixture(scope='module')
+def shortcut() -> Shortcut:
+    return Compiler().compile(EXAMPLE.read_text())
+
+
+def test_xml_matches_plistlib(shortcut: Shortcut):
+    data = shortcut.model_dump(mode='json', exclude_none=True)
+    expected = plistlib.dumps(data, fmt=plistlib.FMT_XML, sort_keys=False)
+    assert shortcut.to_plist_bytes('xml') == expected
+
+
+def test_binary_matches_plistlib(shortcut: Shortcut):
+    data = shortcut.model_dump(mode='json', exclude_none=True)
+    expected = plistlib.dumps(data, fmt=plistlib.FMT_BINARY, sort_keys=False)
+    assert shortcut.to_plist_bytes() == expected
+
+
+def test_unknown_format(shortcut: Shortcut):
+    with pytest.raises(ValueError):
+        shortcut.to_plist_bytes('json')  # type: ignore
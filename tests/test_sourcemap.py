@@ -0,0 +1,48 @@
+from workflowpy.cli import main
+from workflowpy.compiler import Compiler
+
+SOURCE = '''x = input("x")
+for i in range(3):
+    print(f"{x} {i}")
+print("done")
+'''
+
+
+def test_source_map():
+    compiler = Compiler(optimize=False)
+    shortcut = compiler.compile(SOURCE)
+    source_map = compiler.source_map
+    assert source_map is not None
+    assert len(source_map.locations) == len(shortcut.WFWorkflowActions)
+    assert [x and x.lineno for x in source_map.locations] == [1, 2, 2, 3, 2, 4]
+    assert source_map.depths == [0, 0, 0, 1, 0, 0]
+    assert source_map.by_line() == {1: 1, 2: 3, 3: 1, 4: 1}
+    assert source_map.by_depth() == {0: 5, 1: 1}
+    # the locations are kept out of the shortcut
+    assert 'lineno' not in shortcut.model_dump_json()
+
+
+def test_report():
+    compiler = Compiler(optimize=False)
+    compiler.compile(SOURCE)
+    assert compiler.source_map is not None
+    assert compiler.source_map.report(SOURCE).splitlines() == [
+        '  line  actions  depth  source',
+        '     1        1      0  x = input("x")',
+        '     2        3      0  for i in range(3):',
+        '     3        1      1  print(f"{x} {i}")',
+        '     4        1      0  print("done")',
+        '',
+        ' depth  actions',
+        '     0        5',
+        '     1        1',
+    ]
+
+
+def test_cli_report(tmp_path, capsys):
+    source = tmp_path / 'a.py'
+    source.write_text(SOURCE)
+    assert main(['build', '--report', '-j', '1', str(source)]) == 0
+    out = capsys.readouterr().out
+    assert '     3        1      1  print(f"{x} {i}")' in out
+    assert (tmp_path / 'a.shortcut').exists()
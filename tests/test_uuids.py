@@ -0,0 +1,46 @@
+import io
+import re
+import uuid
+
+from workflowpy.compiler import Compiler
+from workflowpy.uuids import UUIDAllocator, current_uuids, new_uuid
+
+SOURCE = '''
+x = input("x")
+d = {"a": x}
+if x in d:
+    print(x)
+for i in range(3):
+    print(i)
+'''
+
+
+def _bytes(source: str) -> bytes:
+    f = io.BytesIO()
+    Compiler().compile(source).write_to(f)
+    return f.getvalue()
+
+
+def test_allocator():
+    a, b = UUIDAllocator('seed'), UUIDAllocator(b'seed')
+    first = [a.new() for _ in range(100)]
+    assert first == [b.new() for _ in range(100)]
+    assert len(set(first)) == 100
+    assert UUIDAllocator('other').new() != first[0]
+    for x in first:
+        parsed = uuid.UUID(x)
+        assert str(parsed).upper() == x
+        assert parsed.version == 4
+        assert parsed.variant == uuid.RFC_4122
+
+
+def test_compiles_are_reproducible():
+    assert _bytes(SOURCE) == _bytes(SOURCE)
+    assert _bytes(SOURCE) != _bytes(SOURCE.replace('range(3)', 'range(4)'))
+
+
+def test_random_outside_of_compiles():
+    Compiler().compile(SOURCE)
+    assert current_uuids.get() is None
+    assert new_uuid() != new_uuid()
+    assert re.fullmatch(r'[0-9A-F-]{36}', new_uuid())
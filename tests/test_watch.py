@@ -0,0 +1,30 @@
+import plistlib
+import time
+
+from workflowpy.cli import main
+
+
+def test_watch(tmp_path, capsys, monkeypatch):
+    source = tmp_path / 'a.py'
+    source.write_text('x = input("x")\nprint(x)\n')
+    edits = [
+        # a broken edit is reported, and the next one is built again
+        'x = input("x")\nprint(x\n',
+        'x = input("x")\nprint(x)\nprint("more")\n',
+    ]
+
+    def sleep(seconds: float):
+        if not edits:
+            raise KeyboardInterrupt
+        source.write_text(edits.pop(0))
+
+    monkeypatch.setattr(time, 'sleep', sleep)
+    assert main(['watch', str(source)]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith('Watching')
+    assert lines[1].endswith('(2 statements compiled, 0 reused)')
+    assert 'FAILED' in lines[2]
+    assert lines[3].endswith('(1 statements compiled, 2 reused)')
+    assert ' 3 actions ' in lines[3]
+    with open(tmp_path / 'a.shortcut', 'rb') as f:
+        assert len(plistlib.load(f)['WFWorkflowActions']) == 3
@@ -0,0 +1,5 @@
+import sys
+
+from workflowpy.cli import main
+
+sys.exit(main())
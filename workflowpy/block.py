@@ -0,0 +1,88 @@
+from typing import Iterable, Iterator
+
+from workflowpy.models.internal import Action
+
+__all__ = ['ActionList', 'Block', 'BlockIndex']
+
+
+class BlockIndex:
+    """
+    Maps UUIDs to actions, and the blocks they were added to, for a whole
+    compilation.
+    """
+
+    def __init__(self):
+        self._entries: dict[str, tuple[Action, Block]] = {}
+
+    def add(self, action: Action, block: 'Block'):
+        uuid = action.uuid
+        if uuid is not None:
+            self._entries[uuid] = (action, block)
+
+    def find(self, uuid: str, within: 'Block') -> Action | None:
+        """
+        Returns the action with this UUID if it is in `within`, or in a block
+        that was added to it.
+        """
+        entry = self._entries.get(uuid)
+        if entry is None:
+            return None
+        action, block = entry
+        parent: Block | None = block
+        while parent is not None:
+            if parent is within:
+                return action
+            parent = parent.parent
+        return None
+
+
+class Block:
+    """
+    A sequence of actions and nested blocks.
+
+    When a scope ends, its block is added to the enclosing block instead of
+    copying its actions, so every action is only copied once, when the tree
+    is flattened by iterating over it. Actions are indexed by UUID as they
+    are added.
+
+    `effects` is where the optimizer keeps the variables written and the
+    outputs made in the block once it has looked at it, so that enclosing
+    loops do not go through its actions again.
+    """
+
+    __slots__ = ('items', 'parent', 'index', 'effects')
+
+    def __init__(self, index: BlockIndex):
+        self.items: list[Action | Block] = []
+        self.parent: Block | None = None
+        self.index = index
+        self.effects: tuple[set[str], set[str]] | None = None
+
+    def append(self, action: Action):
+        self.items.append(action)
+        self.index.add(action, self)
+
+    def extend(self, actions: Iterable[Action]):
+        for action in actions:
+            self.append(action)
+
+    def append_block(self, block: 'Block'):
+        block.parent = self
+        self.items.append(block)
+
+    def find(self, uuid: str) -> Action | None:
+        return self.index.find(uuid, self)
+
+    def __iter__(self) -> Iterator[Action]:
+        stack = [iter(self.items)]
+        while stack:
+            for item in stack[-1]:
+                if isinstance(item, Block):
+                    stack.append(iter(item.items))
+                    break
+                yield item
+            else:
+                stack.pop()
+
+
+type ActionList = list[Action] | Block
@@ -0,0 +1,238 @@
+import hashlib
+import importlib.metadata
+import importlib.util
+import os
+import sqlite3
+import sys
+import time
+import types
+import zlib
+from functools import cache, lru_cache
+from pathlib import Path
+from typing import Any
+
+from workflowpy.models.shortcuts import Shortcut
+from workflowpy.value import LazyModule, PythonFunctionValue, PythonTypeValue
+
+__all__ = [
+    'CompileCache',
+    'compiler_version',
+    'fingerprint_modules',
+    'fingerprint_rules',
+]
+
+
+@cache
+def compiler_version() -> str:
+    """
+    Returns a string identifying this version of the compiler.
+
+    Besides the package version, this includes a hash of the package sources,
+    so a cache is never shared between two different checkouts.
+    """
+    try:
+        version = importlib.metadata.version('workflowpy-shortcuts')
+    except importlib.metadata.PackageNotFoundError:
+        version = 'unknown'
+    digest = hashlib.sha256()
+    root = Path(__file__).parent
+    for path in sorted(root.rglob('*.py')):
+        digest.update(str(path.relative_to(root)).encode())
+        digest.update(path.read_bytes())
+    return f'{version}+{digest.hexdigest()[:16]}'
+
+
+def _hash_code(digest: 'hashlib._Hash', code: types.CodeType):
+    digest.update(code.co_code)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _hash_code(digest, const)
+        else:
+            digest.update(repr(const).encode())
+    digest.update(repr(code.co_names).encode())
+
+
+@lru_cache(maxsize=256)
+def _file_digest(path: str, mtime_ns: int, size: int) -> bytes:
+    return hashlib.sha256(Path(path).read_bytes()).digest()
+
+
+def _hash_file(digest: 'hashlib._Hash', path: str | None) -> bool:
+    """
+    Hashes the contents of a file, if it exists.
+    """
+    if path is None:
+        return False
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    digest.update(_file_digest(path, stat.st_mtime_ns, stat.st_size))
+    return True
+
+
+def _hash_object(digest: 'hashlib._Hash', obj: Any):
+    # hash the source file of the module that defines a function or class,
+    # so the helpers it calls are covered too
+    digest.update(f'{obj.__module__}.{obj.__qualname__}'.encode())
+    module = sys.modules.get(obj.__module__)
+    if _hash_file(digest, getattr(module, '__file__', None)):
+        return
+    # defined somewhere without a file, like an interactive session
+    if isinstance(obj, type):
+        functions = [x for x in vars(obj).values() if isinstance(x, types.FunctionType)]
+    else:
+        functions = [obj]
+    for function in functions:
+        code = getattr(function, '__code__', None)
+        if code is not None:
+            _hash_code(digest, code)
+
+
+def _hash_module(digest: 'hashlib._Hash', module: dict[str, Any]):
+    for key in sorted(module):
+        value = module[key]
+        digest.update(key.encode() + b'\0')
+        if isinstance(value, dict):
+            digest.update(b'{')
+            _hash_module(digest, value)
+            digest.update(b'}')
+        elif isinstance(value, PythonFunctionValue):
+            _hash_object(digest, value.func)
+            digest.update(repr(value.raw_params).encode())
+        elif isinstance(value, PythonTypeValue):
+            type = value.value_type
+            digest.update(f'{type.name}:{type.content_item_class}'.encode())
+        elif isinstance(value, LazyModule):
+            # hash the source instead of importing the module
+            digest.update(value.target.encode() + b'\0')
+            spec = importlib.util.find_spec(value.target.partition(':')[0])
+            if spec is not None:
+                _hash_file(digest, spec.origin)
+        else:
+            digest.update(value.__class__.__qualname__.encode())
+
+
+def fingerprint_modules(modules: dict[str, Any]) -> str:
+    """
+    Returns a hash of a module tree, including the source file of every
+    action. Modules that are not imported yet are hashed by their source
+    file too.
+    """
+    digest = hashlib.sha256()
+    _hash_module(digest, modules)
+    return digest.hexdigest()
+
+
+def fingerprint_rules(rules: list[Any]) -> str:
+    """
+    Returns a hash of a list of peephole rules, from the source of each
+    rule's class.
+    """
+    digest = hashlib.sha256()
+    for rule in rules:
+        _hash_object(digest, type(rule))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class CompileCache:
+    """
+    A content-addressed on-disk cache of compiled shortcuts.
+
+    Entries are keyed by the source text, the registered module tree, the
+    registered peephole rules and the compiler version, and are evicted in
+    least-recently-used order once the total size exceeds `max_size` bytes.
+    The cache is a SQLite database, so it can safely be shared by several
+    processes.
+    """
+
+    def __init__(self, path: str | os.PathLike[str], max_size: int = 256 * 2**20):
+        self.path = Path(path)
+        self.max_size = max_size
+        self._connection: sqlite3.Connection | None = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+                'size INTEGER NOT NULL, last_used REAL NOT NULL)'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)'
+            )
+            self._connection = connection
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def key(self, source: str, options: dict[str, Any] | None = None) -> str:
+        from workflowpy.modules import load_entry_points, modules
+        from workflowpy.peephole import peephole_rules
+
+        # a source might import a module from an installed package
+        load_entry_points()
+        digest = hashlib.sha256()
+        digest.update(compiler_version().encode() + b'\0')
+        digest.update(fingerprint_modules(modules).encode() + b'\0')
+        digest.update(fingerprint_rules(peephole_rules).encode() + b'\0')
+        digest.update(repr(sorted((options or {}).items())).encode() + b'\0')
+        digest.update(source.encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Shortcut | None:
+        row = self.connection.execute(
+            'SELECT value FROM entries WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        self.connection.execute(
+            'UPDATE entries SET last_used = ? WHERE key = ?', (time.time(), key)
+        )
+        try:
+            return Shortcut.model_validate_json(zlib.decompress(row[0]))
+        except (zlib.error, ValueError):
+            # a broken entry is just a miss
+            self.connection.execute('DELETE FROM entries WHERE key = ?', (key,))
+            return None
+
+    def put(self, key: str, shortcut: Shortcut):
+        value = zlib.compress(shortcut.model_dump_json().encode())
+        if len(value) > self.max_size:
+            return
+        connection = self.connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)',
+                (key, value, len(value), time.time()),
+            )
+            (total,) = connection.execute('SELECT SUM(size) FROM entries').fetchone()
+            if total > self.max_size:
+                rows = connection.execute(
+                    'SELECT key, size FROM entries ORDER BY last_used'
+                ).fetchall()
+                evicted = []
+                for old_key, size in rows:
+                    if total <= self.max_size:
+                        break
+                    if old_key == key:
+                        continue
+                    evicted.append((old_key,))
+                    total -= size
+                connection.executemany('DELETE FROM entries WHERE key = ?', evicted)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def clear(self):
+        self.connection.execute('DELETE FROM entries')
@@ -0,0 +1,315 @@
+import argparse
+import os
+import sys
+import time
+import tomllib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple, Sequence
+
+if TYPE_CHECKING:
+    from workflowpy.compiler import Compiler
+    from workflowpy.serializer import PlistFormat
+
+__all__ = ['main']
+
+
+class Config(NamedTuple):
+    python_path: list[str]
+    modules: dict[str, str]
+
+
+class BuildResult(NamedTuple):
+    source: str
+    output: str
+    seconds: float
+    actions: int
+    error: str | None
+    report: str | None = None
+
+
+def load_config(path: str | None) -> Config:
+    """
+    Loads a build configuration file.
+
+    The file is TOML, with an optional `python_path` list (relative to the
+    config file) and a `modules` table that maps the module path used in
+    `from ... import` to the Python module defining it. The Python module is
+    expected to have a `module` dict, like the builtin ones; use
+    `package.module:name` to point at a differently named dict.
+    """
+    if path is None:
+        return Config([], {})
+    with open(path, 'rb') as f:
+        data = tomllib.load(f)
+    base = Path(path).resolve().parent
+    python_path = [str(base / p) for p in data.get('python_path', [])]
+    modules = data.get('modules', {})
+    if not all(isinstance(v, str) for v in modules.values()):
+        raise ValueError('Values in the [modules] table must be strings')
+    return Config(python_path, modules)
+
+
+def register_modules(config: Config):
+    from workflowpy.modules import register
+
+    for path in config.python_path:
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    # the modules are imported when a source first imports them
+    for module_path, target in config.modules.items():
+        register(module_path, target)
+
+
+def find_sources(paths: Sequence[str], output: str | None) -> list[tuple[Path, Path]]:
+    """
+    Expands the given files and directories into (source, output) pairs.
+    """
+    sources = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            for source in sorted(path.rglob('*.py')):
+                relative = source.relative_to(path)
+                base = Path(output) if output is not None else path
+                sources.append((source, base / relative.with_suffix('.shortcut')))
+        else:
+            base = Path(output) if output is not None else path.parent
+            sources.append((path, base / path.with_suffix('.shortcut').name))
+    return sources
+
+
+_worker_cache: Any = None
+
+
+def _init_worker(config: Config, cache_path: str | None):
+    global _worker_cache
+    register_modules(config)
+    if cache_path is not None:
+        from workflowpy.cache import CompileCache
+
+        _worker_cache = CompileCache(cache_path)
+
+
+def _build_one(
+    source: Path,
+    output: Path,
+    fmt: 'PlistFormat' = 'binary',
+    report: bool = False,
+    inline_threshold: int = 15,
+    compiler: 'Compiler | None' = None,
+) -> BuildResult:
+    from workflowpy.compiler import Compiler
+
+    start = time.perf_counter()
+    report_text = None
+    try:
+        code = source.read_text()
+        if compiler is None:
+            # cached shortcuts have no source map
+            compiler = Compiler(
+                cache=None if report else _worker_cache,
+                inline_threshold=inline_threshold,
+            )
+        shortcut = compiler.compile(code)
+        if report:
+            assert compiler.source_map is not None
+            report_text = compiler.source_map.report(code)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'wb') as f:
+            shortcut.write_to(f, fmt)
+    except Exception as exc:
+        return BuildResult(
+            str(source),
+            str(output),
+            time.perf_counter() - start,
+            0,
+            f'{exc.__class__.__name__}: {exc}',
+        )
+    return BuildResult(
+        str(source),
+        str(output),
+        time.perf_counter() - start,
+        len(shortcut.WFWorkflowActions),
+        None,
+        report_text,
+    )
+
+
+def build(args: argparse.Namespace) -> int:
+    config = load_config(args.config)
+    sources = find_sources(args.sources, args.output)
+    if not sources:
+        print('No sources found', file=sys.stderr)
+        return 1
+    start = time.perf_counter()
+    jobs = args.jobs or os.cpu_count() or 1
+    if jobs == 1 or len(sources) == 1:
+        _init_worker(config, args.cache)
+        results = [
+            _build_one(source, output, args.format, args.report, args.inline_threshold)
+            for source, output in sources
+        ]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_worker, initargs=(config, args.cache)
+        ) as executor:
+            results = list(
+                executor.map(
+                    _build_one,
+                    *zip(*sources),
+                    repeat(args.format),
+                    repeat(args.report),
+                    repeat(args.inline_threshold),
+                    chunksize=4,
+                )
+            )
+    elapsed = time.perf_counter() - start
+
+    failed = 0
+    for result in results:
+        if result.error is not None:
+            failed += 1
+        _print_result(result)
+    total = sum(result.seconds for result in results)
+    print(
+        f'Built {len(results) - failed}/{len(results)} shortcuts in {elapsed:.2f}s '
+        f'({total:.2f}s of compile time, {jobs} jobs)'
+    )
+    return 1 if failed else 0
+
+
+def _print_result(result: BuildResult, note: str = ''):
+    if result.error is not None:
+        line = (
+            f'{result.seconds * 1000:9.1f} ms  FAILED  {result.source}: {result.error}'
+        )
+    else:
+        line = f'{result.seconds * 1000:9.1f} ms  {result.actions:6} actions  {result.source}'
+    print(line + note, flush=True)
+    if result.report is not None:
+        print(result.report, end='\n\n', flush=True)
+
+
+def watch(args: argparse.Namespace) -> int:
+    from workflowpy.incremental import IncrementalCompiler
+
+    register_modules(load_config(args.config))
+    # one compiler per source, so unchanged statements are not compiled again
+    compilers: dict[Path, IncrementalCompiler] = {}
+    stamps: dict[Path, tuple[int, int]] = {}
+    print(f'Watching {", ".join(args.sources)} (press Ctrl+C to stop)', flush=True)
+    try:
+        while True:
+            sources = find_sources(args.sources, args.output)
+            for source, output in sources:
+                try:
+                    stat = source.stat()
+                except FileNotFoundError:
+                    continue
+                stamp = (stat.st_mtime_ns, stat.st_size)
+                if stamps.get(source) == stamp:
+                    continue
+                stamps[source] = stamp
+                compiler = compilers.get(source)
+                if compiler is None:
+                    compiler = compilers[source] = IncrementalCompiler(
+                        inline_threshold=args.inline_threshold
+                    )
+                result = _build_one(
+                    source, output, args.format, args.report, compiler=compiler
+                )
+                note = ''
+                if result.error is None:
+                    note = (
+                        f'  ({compiler.recompiled} statements compiled, '
+                        f'{compiler.reused} reused)'
+                    )
+                _print_result(result, note)
+            # forget deleted sources, so they are built again if they come back
+            for source in stamps.keys() - {source for source, _ in sources}:
+                del stamps[source]
+                compilers.pop(source, None)
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        return 0
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='workflowpy', description='Compile Python code to iOS Shortcuts.'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser(
+        'build', help='compile Python files or directories into .shortcut files'
+    )
+    build_parser.add_argument('sources', nargs='+', help='files or directories')
+    build_parser.add_argument(
+        '-o', '--output', help='output directory (default: next to each source)'
+    )
+    build_parser.add_argument(
+        '-j', '--jobs', type=int, help='number of processes (default: CPU count)'
+    )
+    build_parser.add_argument(
+        '-c', '--config', help='TOML file listing custom modules to register'
+    )
+    build_parser.add_argument('--cache', help='path of a compile cache database')
+    build_parser.add_argument(
+        '--format',
+        choices=['binary', 'xml'],
+        default='binary',
+        help='property list format of the output (default: binary)',
+    )
+    build_parser.add_argument(
+        '--report',
+        action='store_true',
+        help='print the number of actions emitted by each source line',
+    )
+    build_parser.add_argument(
+        '--inline-threshold',
+        type=int,
+        default=15,
+        help='size in actions above which functions called from several places '
+        'are compiled once instead of inlined (default: 15)',
+    )
+    build_parser.set_defaults(func=build)
+
+    watch_parser = subparsers.add_parser(
+        'watch', help='rebuild Python files or directories whenever they change'
+    )
+    watch_parser.add_argument('sources', nargs='+', help='files or directories')
+    watch_parser.add_argument(
+        '-o', '--output', help='output directory (default: next to each source)'
+    )
+    watch_parser.add_argument(
+        '-c', '--config', help='TOML file listing custom modules to register'
+    )
+    watch_parser.add_argument(
+        '--format',
+        choices=['binary', 'xml'],
+        default='binary',
+        help='property list format of the output (default: binary)',
+    )
+    watch_parser.add_argument(
+        '--report',
+        action='store_true',
+        help='print the number of actions emitted by each source line',
+    )
+    watch_parser.add_argument(
+        '--inline-threshold',
+        type=int,
+        default=15,
+        help='size in actions above which functions called from several places '
+        'are compiled once instead of inlined (default: 15)',
+    )
+    watch_parser.add_argument(
+        '--interval',
+        type=float,
+        default=0.2,
+        help='seconds between checks for changes (default: 0.2)',
+    )
+    watch_parser.set_defaults(func=watch)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
@@ -1,23 +1,30 @@
 import ast as a
-import uuid
+import math
 from enum import IntEnum
-from typing import Any, NoReturn, cast, overload
-
-from pydantic import BaseModel, ConfigDict, Field
+from typing import TYPE_CHECKING, Any, NoReturn, Sequence, cast, overload
 
 from workflowpy import value_type as T
+from workflowpy.block import Block, BlockIndex
 from workflowpy.definitions.action import ActionHelper
-from workflowpy.models.shortcuts import Action
-from workflowpy.modules import modules
-from workflowpy.synthesizer import Synthesizer
+from workflowpy.inference import infer_types
+from workflowpy.models.internal import Action, SourceLocation, current_source
+from workflowpy.modules import load_entry_points, modules
+from workflowpy.optimizer import hoist_loop_invariants
+from workflowpy.sourcemap import SourceMap
+from workflowpy.synthesizer import FUNCTION_KEY, Synthesizer
 from workflowpy.utils import convert_property_to_name
+from workflowpy.uuids import UUIDAllocator, current_uuids, new_uuid
 from workflowpy.value import (
     ConstantValue,
+    DictionaryFieldValue,
+    FunctionValue,
     ItemValue,
     MagicVariableValue,
     PythonFunctionValue,
     PythonModuleValue,
     PythonTypeValue,
+    PythonValue,
+    ShortcutInputValue,
     ShortcutValue,
     TokenAttachmentValue,
     TokenStringValue,
@@ -27,6 +34,85 @@ from workflowpy.value import (
     token_string,
 )
 
+if TYPE_CHECKING:
+    from workflowpy.cache import CompileCache
+
+
+# the types that annotations coerce values to
+OVERRIDE_TYPES: dict[str, T.ValueType] = {
+    'int': T.number,
+    'float': T.number,
+    'dict': T.dictionary,
+    'str': T.text,
+    'bool': T.boolean,
+}
+
+
+# about how many actions each kind of node compiles to, to tell whether a
+# function is worth compiling as a subroutine before compiling it
+ACTION_COSTS: dict[type[a.AST], int] = {
+    a.BinOp: 1,
+    a.Break: 1,
+    a.Call: 1,
+    a.Dict: 1,
+    a.For: 3,
+    a.If: 2,
+    a.List: 1,
+    a.ListComp: 2,
+    a.Subscript: 1,
+}
+
+
+def _estimate_size(nodes: list[a.stmt]) -> int:
+    size = 0
+    for root in nodes:
+        for node in a.walk(root):
+            size += ACTION_COSTS.get(type(node), 0)
+            if isinstance(node, a.If) and node.orelse:
+                # the Otherwise
+                size += 1
+    return size
+
+
+def _free_names(nodes: list[a.AST]) -> set[str]:
+    """
+    Returns the names read by some nodes that they do not assign.
+    """
+    loaded: set[str] = set()
+    stored: set[str] = set()
+    for root in nodes:
+        for node in a.walk(root):
+            if isinstance(node, a.Name):
+                if isinstance(node.ctx, a.Load):
+                    loaded.add(node.id)
+                else:
+                    stored.add(node.id)
+    return loaded - stored
+
+
+def _function_free_names(node: a.FunctionDef) -> set[str]:
+    """
+    Returns the names a function reads from the module.
+    """
+    params = node.args.posonlyargs + node.args.args
+    annotations = [x.annotation for x in params if x.annotation is not None]
+    if node.returns is not None:
+        annotations.append(node.returns)
+    return _free_names([*node.body, *annotations]) - {x.arg for x in params}
+
+
+def _can_pass(value: Any) -> bool:
+    """
+    Returns whether a value can be an argument of a subroutine. Arguments
+    are put in a dictionary, which only keeps text and numbers as they are.
+    """
+    if not isinstance(value, ShortcutValue):
+        return False
+    try:
+        return value.type in (T.text, T.number)
+    except TypeError:
+        return False
+
 
 class ScopeType(IntEnum):
     GLOBAL = 1
@@ -35,15 +121,25 @@ class ScopeType(IntEnum):
     FORCOUNTER = 4
 
 
-class Scope(BaseModel):
-    model_config = ConfigDict(arbitrary_types_allowed=True)
+class Scope:
+    __slots__ = ('name', 'type', 'actions', 'variables', 'wrappers', 'meta')
 
-    name: str | None
-    type: ScopeType
-    actions: list[Action] = Field(default_factory=list)
-    variables: dict[str, Value] = Field(default_factory=dict)
-    wrappers: list[tuple[list[Action], list[Action]]] = Field(default_factory=list)
-    meta: dict[str, Any] = Field(default_factory=dict)
+    def __init__(
+        self,
+        name: str | None,
+        type: ScopeType,
+        index: BlockIndex,
+        variables: dict[str, Value] | None = None,
+    ):
+        self.name = name
+        self.type = type
+        self.actions = Block(index)
+        self.variables: dict[str, Value] = variables if variables is not None else {}
+        self.wrappers: list[tuple[list[Action], list[Action]]] = []
+        self.meta: dict[str, Any] = {}
+
+    def find_action(self, uuid: str) -> Action | None:
+        return self.actions.find(uuid)
 
     def add_action(self, identifier: str, parameters: dict[str, Any]):
         action = Action(
@@ -56,25 +152,60 @@ class Scope(BaseModel):
 class Compiler(a.NodeVisitor):
     """
     This class is responsible for compiling Python code to actions.
+
+    If a `CompileCache` is given, compiled sources are looked up in and saved
+    to the cache, so unchanged sources are not parsed or compiled again.
+    Optimization passes over the emitted actions can be turned off with
+    `optimize=False`.
+
+    After compiling, `source_map` tells which line each action came from,
+    unless the shortcut was found in the cache.
+
+    Functions defined with `def` are inlined where they are called. A function
+    of more than `inline_threshold` actions that is called from several places
+    is compiled once instead, as a subroutine at the start of the shortcut
+    that calls run with Run Shortcut, if that makes the shortcut smaller.
+    Calls in loops are always inlined, as running a shortcut is slow.
     """
 
+    def __init__(
+        self,
+        cache: 'CompileCache | None' = None,
+        optimize: bool = True,
+        inline_threshold: int = 15,
+    ):
+        super().__init__()
+        self.cache = cache
+        self.optimize = optimize
+        self.inline_threshold = inline_threshold
+        self.source_map: SourceMap | None = None
+
+    @property
+    def options(self) -> dict[str, Any]:
+        """
+        The options that change the compiled output.
+        """
+        return {'optimize': self.optimize, 'inline_threshold': self.inline_threshold}
+
     def _push_scope(self, name: str | None, type: ScopeType):
-        self.scopes.append(Scope(name=name, type=type))
+        self.scopes.append(Scope(name=name, type=type, index=self.index))
 
     def _pop_scope(self):
         scope = self.scopes.pop()
         assert scope.type != ScopeType.GLOBAL
-        if scope.type == ScopeType.FUNCTION:
-            assert scope.name
-            self.functions[scope.name] = scope
-        else:
-            pre = []
-            post = []
-            for a, b in scope.wrappers:
-                pre.extend(a)
-                post.extend(b)
-            post = post[::-1]
-            self.actions.extend(pre + scope.actions + post)
+        if self.optimize and scope.type in (ScopeType.FOREACH, ScopeType.FORCOUNTER):
+            depth = self._count_scopes(ScopeType.FOREACH, ScopeType.FORCOUNTER) + 1
+            hoisted = hoist_loop_invariants(
+                scope.actions, depth, scope.meta.get('results', False)
+            )
+            if hoisted:
+                scope.wrappers.insert(0, (hoisted, []))
+        # wrappers added later go inside the earlier ones
+        for pre, _ in scope.wrappers:
+            self.actions.extend(pre)
+        self.actions.append_block(scope.actions)
+        for _, post in reversed(scope.wrappers):
+            self.actions.extend(reversed(post))
 
     def _count_scopes(self, *types: ScopeType):
         count = 0
@@ -83,6 +214,9 @@ class Compiler(a.NodeVisitor):
                 count += 1
         return count
 
+    def find_action(self, uuid: str) -> Action | None:
+        return self.scopes[-1].find_action(uuid)
+
     def _add_scope_wrapper(self, pre: list[Action], post: list[Action]):
         self.scopes[-1].wrappers.append((pre, post))
 
@@ -94,39 +228,89 @@ class Compiler(a.NodeVisitor):
     def actions(self):
         return self.scopes[-1].actions
 
+    def visit(self, node: a.AST) -> Any:
+        # nodes made up by actions, like the headers of fetch(), have no location
+        lineno = getattr(node, 'lineno', None)
+        if lineno is None:
+            return super().visit(node)
+        location = SourceLocation(lineno, getattr(node, 'col_offset', 0))
+        token = current_source.set(location)
+        try:
+            return super().visit(node)
+        finally:
+            current_source.reset(token)
+
     def compile(self, module: a.Module | str):
-        self.scopes: list[Scope] = [
-            Scope(name=None, type=ScopeType.GLOBAL, variables={})
-        ]
-        mod = PythonModuleValue(**modules[''])
-        for key in mod.children:
-            self.variables[key] = mod.getattr(key)
-        self.functions: dict[str, Scope] = {}
-        if isinstance(module, str):
-            module = a.parse(module)
-
-        self.visit(module)
-
-        synthesizer = Synthesizer()
-        if self.functions:
-            raise NotImplementedError("Functions are not implemented yet!")
-        synthesizer.actions.extend(self.scopes[0].actions)
-        synthesizer.functions.update({k: v.actions for k, v in self.functions.items()})
-        return synthesizer.synthesize()
+        self.source_map = None
+        cache_key = None
+        if self.cache is not None and isinstance(module, str):
+            cache_key = self.cache.key(module, self.options)
+            shortcut = self.cache.get(cache_key)
+            if shortcut is not None:
+                return shortcut
+        shortcut = self._compile(module)
+        if cache_key is not None:
+            assert self.cache is not None
+            self.cache.put(cache_key, shortcut)
+        return shortcut
+
+    def _compile(self, module: a.Module | str):
+        # UUIDs are derived from the source, so the output is reproducible
+        seed = module if isinstance(module, str) else a.dump(module)
+        token = current_uuids.set(UUIDAllocator(seed))
+        try:
+            self.index = BlockIndex()
+            self.scopes: list[Scope] = [
+                Scope(name=None, type=ScopeType.GLOBAL, index=self.index, variables={})
+            ]
+            mod = PythonModuleValue(**modules[''])
+            for key in mod.children:
+                self.variables[key] = mod.getattr(key)
+            self.functions: dict[str, list[Action]] = {}
+            self._inlining: set[a.FunctionDef] = set()
+            self._calls: dict[str, int] | None = None
+            self._reads: dict[a.FunctionDef, list[str]] = {}
+            # the subroutines that are called; the others are left out
+            self._called: set[str] = set()
+            self._tails: set[a.For] | None = None
+            if isinstance(module, str):
+                module = a.parse(module)
+            self.module = module
+            self.types = infer_types(module)
+
+            self.visit(module)
+
+            synthesizer = Synthesizer(optimize=self.optimize)
+            synthesizer.actions.extend(self.scopes[0].actions)
+            synthesizer.functions.update(
+                (k, v) for k, v in self.functions.items() if k in self._called
+            )
+            shortcut = synthesizer.synthesize()
+            self.source_map = synthesizer.source_map
+            return shortcut
+        finally:
+            current_uuids.reset(token)
 
     visit_Module = visit_Expr = a.NodeVisitor.generic_visit
 
-    def visit_ImportFrom(self, node: a.ImportFrom) -> Any:
-        assert node.level == 0, "Relative imports are not supported"
-        parts = cast(str, node.module).split('.')
-        mod = PythonModuleValue(**modules)
+    def _find_module(self, parts: list[str]) -> Value | None:
+        mod: Value = PythonModuleValue(**modules)
         for part in parts:
             try:
                 mod = mod.getattr(part)
             except KeyError:
-                raise NotImplementedError(
-                    f"Module {node.module!r} is not supported"
-                ) from None
+                return None
+        return mod
+
+    def visit_ImportFrom(self, node: a.ImportFrom) -> Any:
+        assert node.level == 0, "Relative imports are not supported"
+        parts = cast(str, node.module).split('.')
+        # installed packages are only looked at for modules that are not found
+        mod = self._find_module(parts)
+        if mod is None and load_entry_points():
+            mod = self._find_module(parts)
+        if mod is None:
+            raise NotImplementedError(f"Module {node.module!r} is not supported")
         assert isinstance(mod, PythonModuleValue), "{node.module} is not a module"
         for name in node.names:
             if name.name == '*':
@@ -141,31 +325,33 @@ class Compiler(a.NodeVisitor):
         if isinstance(var, a.Name):
             name = var.id
             val = self.visit(value)
-            if override_type is not None and hasattr(val, '_type'):
-                val._type = override_type
-                val = val.aggrandized(
-                    'WFCoercionVariableAggrandizement',
-                    {'CoercionItemClass': override_type.content_item_class},
-                )
-            self.variables[name] = val
+            self.variables[name] = self._coerce(val, override_type)
         else:
             raise NotImplementedError(f"Assign with target {var} is not supported")
 
+    def _coerce(self, val: Any, override_type: T.ValueType | None) -> Any:
+        if (
+            override_type is not None
+            and hasattr(val, '_type')
+            and val.type != override_type
+        ):
+            # the value might be another variable's, so change a copy
+            val = val.copy()
+            val._type = override_type
+            val = val.aggrandized(
+                'WFCoercionVariableAggrandizement',
+                {'CoercionItemClass': override_type.content_item_class},
+            )
+        return val
+
     def visit_AnnAssign(self, node: a.AnnAssign) -> Any:
         assert node.value is not None, "Plain annotations are not supported"
-        override_type_map = {
-            'int': T.number,
-            'float': T.number,
-            'dict': T.dictionary,
-            'str': T.text,
-            'bool': T.boolean,
-        }
         override_type = None
         annot = None
         if isinstance(node.annotation, a.Name):
             annot = node.annotation.id
             assert annot != 'list', 'List annotation must have a single type argument'
-            if annot not in override_type_map:
+            if annot not in OVERRIDE_TYPES:
                 annot_val = self.visit(node.annotation)
                 if isinstance(annot_val, PythonTypeValue):
                     override_type = annot_val.value_type
@@ -189,7 +375,7 @@ class Compiler(a.NodeVisitor):
             else:
                 raise ValueError(f'Unknown type annotation {node.annotation}')
         if annot is not None:
-            override_type = override_type_map.get(annot)
+            override_type = OVERRIDE_TYPES.get(annot)
         self._assign(node.target, node.value, override_type=override_type)
 
     def visit_Assign(self, node: a.Assign) -> Any:
@@ -218,27 +404,58 @@ class Compiler(a.NodeVisitor):
         if isinstance(func, PythonFunctionValue):
             result = func(ActionHelper(self), *args, **kws)
             return result
+        elif isinstance(func, FunctionValue):
+            return self._call_function(func, args, kws)
         else:
             raise NotImplementedError(f"Call with func {func} is not supported")
 
     def visit_For(self, node: a.For) -> Any:
         if node.orelse:
             raise NotImplementedError("else: is not supported in For statements")
+        tail = node in self._tail_loops()
+        chunk_size = self._start_loop(
+            node.target, node.iter, self._breaks(node.body) and not tail
+        )
+        if tail:
+            # nothing runs after the loop, so breaking out of it can stop
+            # the shortcut
+            self.scopes[-1].meta['exit'] = True
+        elif chunk_size is not None:
+            self._add_break_check(self.scopes[-1], self.scopes[-2].meta['break'])
+
+        for stmt in node.body:
+            self.visit(stmt)
+
+        self._pop_scope()
+        if chunk_size is not None:
+            self._pop_scope()
+
+    def _start_loop(
+        self, target: a.expr, iter: a.expr, chunk: bool = False
+    ) -> int | None:
+        """
+        Starts the scope of a loop over `iter`, binding `target`.
+
+        If `chunk` is set, a loop over a list may go over it in chunks, so a
+        `break` can skip the rest; then the size of the chunks is returned,
+        and there are two scopes to pop.
+        """
         count_of_for = self._count_scopes(ScopeType.FORCOUNTER, ScopeType.FOREACH)
+        chunk_size = None
         suffix = '' if count_of_for == 0 else f' {count_of_for+1}'
-        grouping_uuid = str(uuid.uuid4()).upper()
+        grouping_uuid = new_uuid()
         if (
-            isinstance(node.iter, a.Call)
-            and isinstance(node.iter.func, a.Name)
-            and node.iter.func.id == 'range'
+            isinstance(iter, a.Call)
+            and isinstance(iter.func, a.Name)
+            and iter.func.id == 'range'
         ):
             assert isinstance(
-                node.target, a.Name
+                target, a.Name
             ), "Only simple loop variables are supported"
             assert (
-                not node.iter.keywords
+                not iter.keywords
             ), "for...range constructs cannot have keyword arguments"
-            range_args = node.iter.args
+            range_args = iter.args
             if len(range_args) == 1:
                 range_start = ConstantValue(0)
                 range_end = self.visit(range_args[0])
@@ -265,7 +482,7 @@ class Compiler(a.NodeVisitor):
                 WFWorkflowActionParameters={
                     'GroupingIdentifier': grouping_uuid,
                     'WFControlFlowMode': 0,
-                    'WFRepeatCount': TokenAttachmentValue(count_value).synthesize(
+                    'WFRepeatCount': TokenAttachmentValue(count_value, True).synthesize(
                         self.actions
                     ),
                 },
@@ -278,24 +495,24 @@ class Compiler(a.NodeVisitor):
                 },
             )
             self._push_scope(None, ScopeType.FORCOUNTER)
-            self.variables[node.target.id] = VariableValue(
-                f'Repeat Index{suffix}', T.number
+            self.variables[target.id] = VariableValue(
+                f'Repeat Index{suffix}', T.integer
             )
         elif (
-            isinstance(node.iter, a.Call)
-            and isinstance(node.iter.func, a.Name)
-            and node.iter.func.id == 'enumerate'
+            isinstance(iter, a.Call)
+            and isinstance(iter.func, a.Name)
+            and iter.func.id == 'enumerate'
         ):
             assert (
-                not node.iter.keywords and len(node.iter.args) == 1
+                not iter.keywords and len(iter.args) == 1
             ), "for...enumerate has incorrect arguments"
             assert (
-                isinstance(node.target, a.Tuple)
-                and len(node.target.elts) == 2
-                and isinstance(node.target.elts[0], a.Name)
-                and isinstance(node.target.elts[1], a.Name)
+                isinstance(target, a.Tuple)
+                and len(target.elts) == 2
+                and isinstance(target.elts[0], a.Name)
+                and isinstance(target.elts[1], a.Name)
             ), "Only two loop variables in a tuple is supported"
-            iterable = self.visit(node.iter.args[0])
+            iterable = self.visit(iter.args[0])
             start_action = Action(
                 WFWorkflowActionIdentifier='is.workflow.actions.repeat.each',
                 WFWorkflowActionParameters={
@@ -312,21 +529,29 @@ class Compiler(a.NodeVisitor):
                 },
             )
             self._push_scope(None, ScopeType.FOREACH)
-            self.variables[node.target.elts[0].id] = VariableValue(
-                f'Repeat Index{suffix}', T.number
+            self.variables[target.elts[0].id] = VariableValue(
+                f'Repeat Index{suffix}', T.integer
             )
-            self.variables[node.target.elts[1].id] = VariableValue(
-                f'Repeat Item{suffix}', iterable.type
+            item_type = self.types.get(target.elts[1])
+            if item_type is None:
+                item_type = iterable.type
+            self.variables[target.elts[1].id] = VariableValue(
+                f'Repeat Item{suffix}', item_type
             )
         else:
             assert isinstance(
-                node.target, a.Name
+                target, a.Name
             ), "Only simple loop variables are supported"
-            iterable = self.visit(node.iter)
+            iterable = self.visit(iter)
             if iterable.type == T.dictionary:
                 iterable = iterable.aggrandized(
                     'WFPropertyVariableAggrandizement', {'PropertyName': 'Keys'}
                 )
+            if chunk:
+                chunk_size = self._chunk_size(iterable)
+                if chunk_size is not None:
+                    iterable = self._add_chunk_loop(iterable, chunk_size, suffix)
+                    suffix = f' {count_of_for + 2}'
             start_action = Action(
                 WFWorkflowActionIdentifier='is.workflow.actions.repeat.each',
                 WFWorkflowActionParameters={
@@ -343,25 +568,182 @@ class Compiler(a.NodeVisitor):
                 },
             )
             self._push_scope(None, ScopeType.FOREACH)
-            self.variables[node.target.id] = VariableValue(
-                f'Repeat Item{suffix}', iterable.type
+            self.variables[target.id] = VariableValue(
+                f'Repeat Item{suffix}', self.types.get(target, iterable.type)
             )
 
         self._add_scope_wrapper([start_action], [end_action])
+        return chunk_size
 
-        for stmt in node.body:
-            self.visit(stmt)
+    def _breaks(self, body: list[a.stmt]) -> bool:
+        """
+        Returns whether there is a `break` for the loop with this body.
+        """
+        stack: list[a.AST] = list(body)
+        while stack:
+            node = stack.pop()
+            if isinstance(node, a.Break):
+                return True
+            if not isinstance(node, (a.For, a.FunctionDef)):
+                stack.extend(a.iter_child_nodes(node))
+        return False
 
-        self._pop_scope()
+    def _tail_loops(self) -> set[a.For]:
+        """
+        Returns the loops that are the last statement of the shortcut, and not
+        inside another loop.
+        """
+        if self._tails is None:
+            self._tails = set()
+            stack = [self.module.body]
+            while stack:
+                body = stack.pop()
+                if not body:
+                    continue
+                last = body[-1]
+                if isinstance(last, a.For):
+                    self._tails.add(last)
+                elif isinstance(last, a.If):
+                    stack += [last.body, last.orelse]
+        return self._tails
 
-    def _parse_if_values(self, node: a.If):
-        if isinstance(node.test, a.Compare):
-            assert (
-                len(node.test.ops) == 1
-            ), "Only a single compare operator are supported"
-            op = node.test.ops[0]
+    def _chunk_size(self, iterable: ShortcutValue) -> int | None:
+        """
+        Returns how many items a loop with a `break` should go through between
+        checks of whether it broke, or None if checking every item is cheaper
+        or the length of the list is not known.
+        """
+        length = None
+        action = None
+        if isinstance(iterable, MagicVariableValue):
+            # the list might have been made outside of the enclosing loops
+            for scope in reversed(self.scopes):
+                action = scope.find_action(iterable.uuid)
+                if action is not None:
+                    break
+        if action is not None:
+            identifier = action.WFWorkflowActionIdentifier
+            params = action.WFWorkflowActionParameters
+            keys = [
+                {'Type': 'WFPropertyVariableAggrandizement', 'PropertyName': 'Keys'}
+            ]
+            if (
+                identifier == 'is.workflow.actions.list'
+                and not iterable.aggrandizements
+            ):
+                length = len(params.get('WFItems', []))
+            elif (
+                identifier == 'is.workflow.actions.dictionary'
+                and iterable.aggrandizements == keys
+            ):
+                items = params.get('WFItems', {})
+                length = len(
+                    items.get('Value', {}).get('WFDictionaryFieldValueItems', [])
+                )
+        if length is None:
+            # chunks cost more than checking every item of a short list
+            return None
+        # if the loop breaks halfway through, checking every item costs a
+        # Repeat step and an If for each item left. Chunks cost 4 actions to
+        # set up, 7 for each chunk gone through, 2 for each chunk left, and 2
+        # for each item left in the chunk that broke
+        size = max(1, round(math.sqrt(4.5 * length)))
+        if 4 + 4.5 * length / size + size >= length:
+            return None
+        return size
 
-            lhs: ShortcutValue = self.visit(node.test.left)
+    def _add_chunk_loop(self, iterable: ShortcutValue, size: int, suffix: str):
+        """
+        Starts a loop over the chunks of `size` items of a list, so a `break`
+        skips the rest of the list with one check per chunk. Returns the items
+        of the current chunk.
+        """
+        count_action = Action(
+            WFWorkflowActionIdentifier='is.workflow.actions.count',
+            WFWorkflowActionParameters={
+                'Input': token_attachment(self.actions, iterable),
+                'WFCountType': 'Items',
+            },
+        ).with_output('Count', T.integer)
+        self.actions.append(count_action)
+        assert count_action.output
+        chunks_action = Action(
+            WFWorkflowActionIdentifier='is.workflow.actions.calculateexpression',
+            WFWorkflowActionParameters={
+                'Input': token_string(self.actions, count_action.output, f' / {size}')
+            },
+        ).with_output('Calculation Result', T.number)
+        self.actions.append(chunks_action)
+        assert chunks_action.output
+        round_action = Action(
+            WFWorkflowActionIdentifier='is.workflow.actions.round',
+            WFWorkflowActionParameters={
+                'WFInput': token_attachment(self.actions, chunks_action.output),
+                'WFRoundMode': 'Always Round Up',
+                'WFRoundTo': 'Ones Place',
+            },
+        ).with_output('Rounded Number', T.integer)
+        self.actions.append(round_action)
+        assert round_action.output
+        grouping_uuid = new_uuid()
+        start_action = Action(
+            WFWorkflowActionIdentifier='is.workflow.actions.repeat.count',
+            WFWorkflowActionParameters={
+                'GroupingIdentifier': grouping_uuid,
+                'WFControlFlowMode': 0,
+                'WFRepeatCount': token_attachment(self.actions, round_action.output),
+            },
+        )
+        end_action = Action(
+            WFWorkflowActionIdentifier='is.workflow.actions.repeat.count',
+            WFWorkflowActionParameters={
+                'GroupingIdentifier': grouping_uuid,
+                'WFControlFlowMode': 2,
+            },
+        )
+        self._push_scope(None, ScopeType.FORCOUNTER)
+        self._add_scope_wrapper([start_action], [end_action])
+        self._add_break_wrapper(self.scopes[-1])
+        index = VariableValue(f'Repeat Index{suffix}', T.integer)
+        first_action = Action(
+            WFWorkflowActionIdentifier='is.workflow.actions.calculateexpression',
+            WFWorkflowActionParameters={
+                'Input': token_string(self.actions, index, f' * {size} - {size - 1}')
+            },
+        ).with_output('Calculation Result', T.integer)
+        self.actions.append(first_action)
+        assert first_action.output
+        last_action = Action(
+            WFWorkflowActionIdentifier='is.workflow.actions.math',
+            WFWorkflowActionParameters={
+                'WFInput': token_attachment(self.actions, index, True),
+                'WFMathOperand': str(size),
+                'WFMathOperation': '*',
+            },
+        ).with_output('Calculation Result', T.integer)
+        self.actions.append(last_action)
+        assert last_action.output
+        items_action = Action(
+            WFWorkflowActionIdentifier='is.workflow.actions.getitemfromlist',
+            WFWorkflowActionParameters={
+                'WFInput': token_attachment(self.actions, iterable),
+                'WFItemRangeEnd': token_attachment(self.actions, last_action.output),
+                'WFItemRangeStart': token_attachment(self.actions, first_action.output),
+                'WFItemSpecifier': 'Items in Range',
+            },
+        ).with_output('Items in Range', iterable.type)
+        self.actions.append(items_action)
+        assert items_action.output
+        return items_action.output
+
+    def _parse_if_values(self, test: a.expr):
+        if isinstance(test, a.Compare):
+            assert len(test.ops) == 1, "Only a single compare operator are supported"
+            op = test.ops[0]
+
+            lhs: ShortcutValue = self.visit(test.left)
+            if isinstance(op, (a.In, a.NotIn)):
+                return self._parse_membership(lhs, op, test.comparators[0])
 
             bp = {
                 'WFInput': {
@@ -370,7 +752,7 @@ class Compiler(a.NodeVisitor):
                 }
             }
 
-            rhs_raw = node.test.comparators[0]
+            rhs_raw = test.comparators[0]
             rhs_is_none = isinstance(rhs_raw, a.Constant) and rhs_raw.value is None
             if rhs_is_none:
                 # special: need to un-cast LHS for certain types to compare correctly
@@ -388,17 +770,29 @@ class Compiler(a.NodeVisitor):
 
             rhs: ShortcutValue = self.visit(rhs_raw)
             if lhs.type == T.number and isinstance(op, a.Eq):
-                return 4, bp | {'WFNumberValue': token_attachment(self.actions, rhs)}
+                return 4, bp | {
+                    'WFNumberValue': token_attachment(self.actions, rhs, True)
+                }
             elif lhs.type == T.number and isinstance(op, a.NotEq):
-                return 5, bp | {'WFNumberValue': token_attachment(self.actions, rhs)}
+                return 5, bp | {
+                    'WFNumberValue': token_attachment(self.actions, rhs, True)
+                }
             elif lhs.type == T.number and isinstance(op, a.Gt):
-                return 2, bp | {'WFNumberValue': token_attachment(self.actions, rhs)}
+                return 2, bp | {
+                    'WFNumberValue': token_attachment(self.actions, rhs, True)
+                }
             elif lhs.type == T.number and isinstance(op, a.Lt):
-                return 0, bp | {'WFNumberValue': token_attachment(self.actions, rhs)}
+                return 0, bp | {
+                    'WFNumberValue': token_attachment(self.actions, rhs, True)
+                }
             elif lhs.type == T.number and isinstance(op, a.LtE):
-                return 1, bp | {'WFNumberValue': token_attachment(self.actions, rhs)}
+                return 1, bp | {
+                    'WFNumberValue': token_attachment(self.actions, rhs, True)
+                }
             elif lhs.type == T.number and isinstance(op, a.GtE):
-                return 3, bp | {'WFNumberValue': token_attachment(self.actions, rhs)}
+                return 3, bp | {
+                    'WFNumberValue': token_attachment(self.actions, rhs, True)
+                }
 
             elif lhs.type == T.text and isinstance(op, a.Eq):
                 return 4, bp | {
@@ -409,59 +803,47 @@ class Compiler(a.NodeVisitor):
                     'WFConditionalActionString': token_string(self.actions, rhs)
                 }
 
-            elif rhs.type == T.dictionary and isinstance(op, a.In):
-                sep = str(uuid.uuid4())
-                combine_action = Action(
-                    WFWorkflowActionIdentifier='is.workflow.actions.text.combine',
-                    WFWorkflowActionParameters={
-                        'WFTextCustomSeparator': sep,
-                        'WFTextSeparator': 'Custom',
-                        'text': token_attachment(
-                            self.actions,
-                            rhs.aggrandized(
-                                'WFPropertyVariableAggrandizement',
-                                {'PropertyName': 'Keys'},
-                            ),
-                        ),
-                    },
-                ).with_output('Combined Text', T.text)
-                self.actions.append(combine_action)
-                combine_output = combine_action.output
-                assert combine_output
-                text_action = Action(
-                    WFWorkflowActionIdentifier='is.workflow.actions.gettext',
-                    WFWorkflowActionParameters={
-                        'WFTextActionText': token_string(
-                            self.actions, sep, combine_output, sep
-                        )
-                    },
-                ).with_output('Text', T.text)
-                self.actions.append(text_action)
-                text_output = text_action.output
-                assert text_output
-                return 99, bp | {
-                    'WFInput': {
-                        'Type': 'Variable',
-                        'Variable': token_attachment(self.actions, text_output),
-                    },
-                    'WFConditionalActionString': token_string(
-                        self.actions, sep, lhs, sep
-                    ),
-                }
-
             else:
                 raise NotImplementedError(
                     f"If operator {op.__class__.__name__} is not supported"
                 )
         else:
             raise NotImplementedError(
-                f"If expression {node.test.__class__.__name__} is not supported"
+                f"If expression {test.__class__.__name__} is not supported"
+            )
+
+    def _parse_membership(
+        self, lhs: ShortcutValue, op: a.In | a.NotIn, rhs_raw: a.expr
+    ):
+        # looking the key up is constant time, unlike searching the keys; a
+        # key holding an empty value counts as missing, though
+        rhs: ShortcutValue = self.visit(rhs_raw)
+        if rhs.type != T.dictionary:
+            raise NotImplementedError(
+                f"If operator {op.__class__.__name__} is only supported for dictionaries"
             )
+        action = Action(
+            WFWorkflowActionIdentifier='is.workflow.actions.getvalueforkey',
+            WFWorkflowActionParameters={
+                'WFDictionaryKey': token_string(self.actions, lhs),
+                'WFInput': token_attachment(self.actions, rhs),
+            },
+        ).with_output('Dictionary Value', T.any)
+        self.actions.append(action)
+        output = action.output
+        assert output
+        condition = 100 if isinstance(op, a.In) else 101
+        return condition, {
+            'WFInput': {
+                'Type': 'Variable',
+                'Variable': token_attachment(self.actions, output),
+            }
+        }
 
     def visit_If(self, node: a.If) -> Any:
-        group_uuid = str(uuid.uuid4()).upper()
+        group_uuid = new_uuid()
 
-        condition, params = self._parse_if_values(node)
+        condition, params = self._parse_if_values(node.test)
 
         base_params = {'GroupingIdentifier': group_uuid}
         start_params = (
@@ -499,8 +881,15 @@ class Compiler(a.NodeVisitor):
         for scope in self.scopes[::-1]:
             if scope.type in [ScopeType.FORCOUNTER, ScopeType.FOREACH]:
                 break
+            if scope.type == ScopeType.FUNCTION:
+                raise ValueError("Cannot break outside a for loop")
         else:
             raise ValueError("Cannot break outside a for loop")
+        if scope.meta.get('exit'):
+            self.actions.append(
+                Action(WFWorkflowActionIdentifier='is.workflow.actions.exit')
+            )
+            return
         if 'break' not in scope.meta:
             self._add_break_wrapper(scope)
         action = Action(
@@ -515,7 +904,7 @@ class Compiler(a.NodeVisitor):
         self.actions.append(action)
 
     def _add_break_wrapper(self, scope: Scope):
-        break_var_name = f'__break_{uuid.uuid4()}__'
+        break_var_name = f'__break_{new_uuid().lower()}__'
         pre = []
         set_var_0 = Action(
             WFWorkflowActionIdentifier='is.workflow.actions.setvariable',
@@ -526,8 +915,11 @@ class Compiler(a.NodeVisitor):
         )
         pre.append(set_var_0)
         scope.wrappers.insert(0, (pre, []))
+        self._add_break_check(scope, break_var_name)
+
+    def _add_break_check(self, scope: Scope, break_var_name: str):
         pre = []
-        group_uuid = str(uuid.uuid4()).upper()
+        group_uuid = new_uuid()
         if_start = Action(
             WFWorkflowActionIdentifier='is.workflow.actions.conditional',
             WFWorkflowActionParameters={
@@ -557,12 +949,276 @@ class Compiler(a.NodeVisitor):
     def visit_Pass(self, node: a.Pass) -> Any:
         pass  # lol
 
+    def visit_FunctionDef(self, node: a.FunctionDef) -> Any:
+        if len(self.scopes) > 1:
+            raise NotImplementedError("Functions can only be defined at the top level")
+        if node.decorator_list:
+            raise NotImplementedError("Decorators are not supported")
+        args = node.args
+        if args.vararg or args.kwarg or args.kwonlyargs:
+            raise NotImplementedError(
+                "*args, **kwargs and keyword-only parameters are not supported"
+            )
+        defaults = [self.visit(x) for x in args.defaults]
+        function = FunctionValue(node, defaults)
+        self.variables[node.name] = function
+        if self._call_counts().get(node.name, 0) > 1:
+            self._outline(function)
+
+    def visit_Return(self, node: a.Return) -> Any:
+        raise NotImplementedError(
+            "return is only supported as the last statement of a function"
+        )
+
+    def _call_counts(self) -> dict[str, int]:
+        """
+        Counts the calls to each name outside of loops.
+        """
+        if self._calls is None:
+            calls: dict[str, int] = {}
+            stack: list[tuple[a.AST, bool]] = [(self.module, False)]
+            while stack:
+                node, in_loop = stack.pop()
+                if isinstance(node, a.Call) and isinstance(node.func, a.Name):
+                    if not in_loop:
+                        calls[node.func.id] = calls.get(node.func.id, 0) + 1
+                if isinstance(node, a.For):
+                    stack.append((node.iter, in_loop))
+                    stack.extend((stmt, True) for stmt in node.body)
+                else:
+                    stack.extend((x, in_loop) for x in a.iter_child_nodes(node))
+            self._calls = calls
+        return self._calls
+
+    def _names_read(self, names: Sequence[str]) -> list[str]:
+        """
+        Returns some names of the module, followed by the names read by the
+        functions they name, and by the functions those call, since calls
+        compile the body of a function where they are.
+        """
+        result = dict.fromkeys(names)
+        module = self.scopes[0].variables
+        pending = list(names)
+        while pending:
+            value = module.get(pending.pop())
+            if not isinstance(value, FunctionValue):
+                continue
+            reads = self._reads.get(value.node)
+            if reads is None:
+                reads = self._reads[value.node] = sorted(
+                    _function_free_names(value.node)
+                )
+            for name in reads:
+                if name not in result:
+                    result[name] = None
+                    pending.append(name)
+        return list(result)
+
+    def _annotation_type(self, annotation: a.expr | None) -> T.ValueType | None:
+        if annotation is None:
+            return None
+        if isinstance(annotation, a.Name) and annotation.id in OVERRIDE_TYPES:
+            return OVERRIDE_TYPES[annotation.id]
+        value = self.visit(annotation)
+        if isinstance(value, PythonTypeValue):
+            return value.value_type
+        raise ValueError(f'Unknown type annotation {a.unparse(annotation)}')
+
+    def _visit_body(self, node: a.FunctionDef) -> Any:
+        for stmt in node.body[:-1]:
+            self.visit(stmt)
+        last = node.body[-1]
+        if not isinstance(last, a.Return):
+            self.visit(last)
+            return None
+        if last.value is None:
+            return None
+        return self.visit(last.value)
+
+    def _outline(self, function: FunctionValue):
+        """
+        Compiles a function as a subroutine, if it can run on its own and it
+        looks big enough to be worth the cost of calling it.
+
+        The size is estimated from the body, so that the body is compiled
+        only if it is outlined.
+        """
+        node = function.node
+        params = node.args.posonlyargs + node.args.args
+        # the subroutine runs on its own, so it can use the imports and the
+        # functions of the module, but not the values of its variables; the
+        # functions it calls are compiled into it, so neither can they
+        names: dict[str, Value] = {
+            k: v
+            for k, v in self.scopes[0].variables.items()
+            if isinstance(v, PythonValue)
+        }
+        for name in self._names_read(sorted(_function_free_names(node))):
+            value = names.get(name)
+            if value is None:
+                return
+            if isinstance(value, PythonFunctionValue) and value.reads_input:
+                # the input of a subroutine is the call's arguments
+                return
+        # the Output or Stop at the end
+        size = _estimate_size(node.body) + 1
+        calls = self._call_counts()[node.name]
+        # the If around the subroutine and the Dictionary and Run Shortcut
+        # actions of each call, against a copy of the body for each call
+        outlined = size + len(params) + 3 + 2 * calls
+        if size <= self.inline_threshold or outlined >= size * calls:
+            return
+
+        scopes = self.scopes
+        self.scopes = [Scope(None, ScopeType.GLOBAL, self.index, names)]
+        self._push_scope(node.name, ScopeType.FUNCTION)
+        try:
+            for param in params:
+                action = Action(
+                    WFWorkflowActionIdentifier='is.workflow.actions.getvalueforkey',
+                    WFWorkflowActionParameters={
+                        'WFDictionaryKey': param.arg,
+                        'WFInput': token_attachment(self.actions, ShortcutInputValue()),
+                    },
+                ).with_output('Dictionary Value', T.any)
+                self.actions.append(action)
+                self.variables[param.arg] = self._coerce(
+                    action.output, self._annotation_type(param.annotation)
+                )
+            result = self._visit_body(node)
+            actions = self.actions
+            return_type = None
+            if result is not None:
+                return_type = self._annotation_type(node.returns)
+                if return_type is None:
+                    try:
+                        return_type = result.type
+                    except TypeError:
+                        return_type = T.any
+                actions.append(
+                    Action(
+                        WFWorkflowActionIdentifier='is.workflow.actions.output',
+                        WFWorkflowActionParameters={
+                            'WFOutput': token_string(actions, result)
+                        },
+                    )
+                )
+            else:
+                actions.append(
+                    Action(WFWorkflowActionIdentifier='is.workflow.actions.exit')
+                )
+        except NotImplementedError:
+            # the parameters have no known type in the subroutine, which some
+            # code needs; calls compile the body with the types of arguments
+            return
+        finally:
+            self.scopes = scopes
+        key = self._function_key(node.name)
+        self.functions[key] = list(actions)
+        function.key = key
+        function.return_type = return_type
+
+    def _function_key(self, name: str) -> str:
+        key = name
+        while key in self.functions:
+            key += '_'
+        return key
+
+    def _call_function(
+        self, function: FunctionValue, args: list[Any], kws: dict[str, Any]
+    ) -> Any:
+        node = function.node
+        params = [x.arg for x in node.args.posonlyargs + node.args.args]
+        if len(args) > len(params):
+            raise TypeError(
+                f"{node.name}() takes {len(params)} positional arguments "
+                f"but {len(args)} were given"
+            )
+        bound = dict(zip(params, args))
+        for key, value in kws.items():
+            if key not in params:
+                raise TypeError(
+                    f"{node.name}() got an unexpected keyword argument {key!r}"
+                )
+            if key in bound:
+                raise TypeError(f"{node.name}() got multiple values for {key!r}")
+            bound[key] = value
+        defaults = dict(
+            zip(params[len(params) - len(function.defaults) :], function.defaults)
+        )
+        for param in node.args.posonlyargs + node.args.args:
+            if param.arg not in bound:
+                if param.arg not in defaults:
+                    raise TypeError(
+                        f"{node.name}() missing required argument {param.arg!r}"
+                    )
+                bound[param.arg] = defaults[param.arg]
+            bound[param.arg] = self._coerce(
+                bound[param.arg], self._annotation_type(param.annotation)
+            )
+        if (
+            function.key is not None
+            and not self._count_scopes(ScopeType.FORCOUNTER, ScopeType.FOREACH)
+            and all(_can_pass(x) for x in bound.values())
+        ):
+            return self._call_outlined(function, bound)
+        if node in self._inlining:
+            raise NotImplementedError(
+                f"Recursive function {node.name!r} cannot be inlined"
+            )
+        self._inlining.add(node)
+        try:
+            self._push_scope(node.name, ScopeType.FUNCTION)
+            self.variables.update(bound)
+            result = self._visit_body(node)
+            self._pop_scope()
+        finally:
+            self._inlining.discard(node)
+        return result
+
+    def _call_outlined(self, function: FunctionValue, args: dict[str, Any]) -> Any:
+        assert function.key is not None
+        self._called.add(function.key)
+        items = []
+        for key, value in [(FUNCTION_KEY, ConstantValue(function.key)), *args.items()]:
+            item = self._dict_item(ConstantValue(key), value)
+            assert item is not None
+            items.append(item)
+        action = Action(
+            WFWorkflowActionIdentifier='is.workflow.actions.dictionary',
+            WFWorkflowActionParameters={
+                'WFItems': DictionaryFieldValue(*items).synthesize(self.actions)
+            },
+        ).with_output('Dictionary', T.dictionary)
+        self.actions.append(action)
+        assert action.output
+        run = Action(
+            WFWorkflowActionIdentifier='is.workflow.actions.runworkflow',
+            WFWorkflowActionParameters={
+                'WFInput': token_attachment(self.actions, action.output),
+                'WFShowWorkflow': False,
+                'WFWorkflow': {'isSelf': True},
+            },
+        ).with_output('Shortcut Result', T.any)
+        self.actions.append(run)
+        if function.return_type is None:
+            return None
+        return self._coerce(run.output, function.return_type)
+
     # expressions; all should return a Value
 
     def visit_Name(self, node: a.Name) -> Any:
-        for scope in self.scopes[::-1]:
+        scopes = self.scopes
+        i = len(scopes) - 1
+        while i >= 0:
+            scope = scopes[i]
             if node.id in scope.variables:
                 return scope.variables[node.id]
+            if scope.type == ScopeType.FUNCTION:
+                # functions see their own variables and the module's, not
+                # those of where they are called from
+                i = min(j for j, x in enumerate(scopes) if x.type == ScopeType.FUNCTION)
+            i -= 1
         raise NameError(f"Name {node.id!r} is not found")
 
     def visit_Constant(self, node: a.Constant) -> Any:
@@ -582,10 +1238,16 @@ class Compiler(a.NodeVisitor):
         return self.visit(node.value)
 
     def visit_List(self, node: a.List) -> Any:
-        values = [
-            ItemValue(0, TokenStringValue(self.visit(x))).synthesize(self.actions)
-            for x in node.elts
-        ]
+        # the List action only has text items; literals are written straight
+        # into them, so a list of literals is a single action
+        values = []
+        for x in node.elts:
+            value = self.visit(x)
+            if isinstance(value, TokenAttachmentValue):
+                value = value.value
+            values.append(
+                ItemValue(0, TokenStringValue(value)).synthesize(self.actions)
+            )
         action = Action(
             WFWorkflowActionIdentifier='is.workflow.actions.list',
             WFWorkflowActionParameters={'WFItems': values},
@@ -593,6 +1255,88 @@ class Compiler(a.NodeVisitor):
         self.actions.append(action)
         return action.output
 
+    def visit_ListComp(self, node: a.ListComp) -> Any:
+        # a loop collects the output of the last action of each iteration
+        # into its Repeat Results, so that is made the element
+        if len(node.generators) != 1:
+            raise NotImplementedError(
+                "Only one for clause is supported in list comprehensions"
+            )
+        (generator,) = node.generators
+        if generator.is_async:
+            raise NotImplementedError("async for is not supported")
+        self._start_loop(generator.target, generator.iter)
+        scope = self.scopes[-1]
+        _, (end_action,) = scope.wrappers[-1]
+        end_action.with_output('Repeat Results', T.any)
+        scope.meta['results'] = True
+
+        ends: list[Action] = []
+        for test in generator.ifs:
+            # an If that ran no branch has no output, so nothing is collected
+            group_uuid = new_uuid()
+            condition, params = self._parse_if_values(test)
+            self.actions.append(
+                Action(
+                    WFWorkflowActionIdentifier='is.workflow.actions.conditional',
+                    WFWorkflowActionParameters={
+                        'GroupingIdentifier': group_uuid,
+                        'WFCondition': condition,
+                        'WFControlFlowMode': 0,
+                    }
+                    | params,
+                )
+            )
+            ends.append(
+                Action(
+                    WFWorkflowActionIdentifier='is.workflow.actions.conditional',
+                    WFWorkflowActionParameters={
+                        'GroupingIdentifier': group_uuid,
+                        'WFControlFlowMode': 2,
+                    },
+                )
+            )
+
+        value = self.visit(node.elt)
+        if isinstance(value, TokenAttachmentValue):
+            value = value.value
+        if isinstance(value, TokenStringValue):
+            action = Action(
+                WFWorkflowActionIdentifier='is.workflow.actions.gettext',
+                WFWorkflowActionParameters={
+                    'WFTextActionText': value.synthesize(self.actions)
+                },
+            ).with_output('Text', T.text)
+            self.actions.append(action)
+        elif isinstance(value, ConstantValue) and value.is_literal:
+            # makes a Text or Number action
+            value.synthesize(self.actions)
+        elif not self._is_last_output(value):
+            self.actions.append(
+                Action(
+                    WFWorkflowActionIdentifier='is.workflow.actions.getvariable',
+                    WFWorkflowActionParameters={
+                        'WFVariable': token_attachment(self.actions, value)
+                    },
+                )
+            )
+        self.actions.extend(reversed(ends))
+        self._pop_scope()
+        return end_action.output
+
+    def _is_last_output(self, value: Any) -> bool:
+        """
+        Returns whether a value is the output of the last action so far.
+        """
+        items = self.actions.items
+        return (
+            isinstance(value, MagicVariableValue)
+            and not value.aggrandizements
+            and bool(items)
+            and isinstance(items[-1], Action)
+            and items[-1].uuid == value.uuid
+        )
+
     def visit_Subscript(self, node: a.Subscript) -> Any:
         value = self.visit(node.value)
         slice = self.visit(node.slice)
@@ -603,16 +1347,22 @@ class Compiler(a.NodeVisitor):
                     'WFDictionaryKey': token_string(self.actions, slice),
                     'WFInput': token_attachment(self.actions, value),
                 },
-            ).with_output('Dictionary Value', T.any)
+            ).with_output('Dictionary Value', self.types.get(node, T.any))
         else:
+            # items of a list of unknown type take the type of the list
+            item_type = self.types.get(node)
+            if item_type is None:
+                item_type = value.type
             action = Action(
                 WFWorkflowActionIdentifier='is.workflow.actions.getitemfromlist',
                 WFWorkflowActionParameters={
                     'WFInput': TokenAttachmentValue(value).synthesize(self.actions),
-                    'WFItemIndex': TokenAttachmentValue(slice).synthesize(self.actions),
+                    'WFItemIndex': TokenAttachmentValue(slice, True).synthesize(
+                        self.actions
+                    ),
                     'WFItemSpecifier': 'Item At Index',
                 },
-            ).with_output('Item from List', value.type)
+            ).with_output('Item from List', item_type)
         self.actions.append(action)
         return action.output
 
@@ -625,14 +1375,19 @@ class Compiler(a.NodeVisitor):
             and rhs.type == T.number
         ):
             operation_map = {'Add': '+', 'Sub': '-', 'Mult': '*', 'Div': '/'}
+            is_integer = (
+                lhs.type is T.integer
+                and rhs.type is T.integer
+                and not isinstance(node.op, a.Div)
+            )
             action = Action(
                 WFWorkflowActionIdentifier='is.workflow.actions.math',
                 WFWorkflowActionParameters={
-                    'WFInput': token_attachment(self.actions, lhs),
-                    'WFMathOperand': token_attachment(self.actions, rhs),
+                    'WFInput': token_attachment(self.actions, lhs, True),
+                    'WFMathOperand': token_attachment(self.actions, rhs, True),
                     'WFMathOperation': operation_map[node.op.__class__.__name__],
                 },
-            ).with_output('Calculation Result', T.number)
+            ).with_output('Calculation Result', T.integer if is_integer else T.number)
             self.actions.append(action)
             return action.output
         raise NotImplementedError(
@@ -641,33 +1396,66 @@ class Compiler(a.NodeVisitor):
 
     def visit_UnaryOp(self, node: a.UnaryOp) -> Any:
         lhs = self.visit(node.operand)
+        if (
+            isinstance(node.op, a.USub)
+            and isinstance(lhs, ConstantValue)
+            and lhs.is_literal
+            and isinstance(lhs.value, (int, float))
+        ):
+            return ConstantValue(-lhs.value)
         if isinstance(node.op, (a.USub)) and lhs.type == T.number:
             action = Action(
                 WFWorkflowActionIdentifier='is.workflow.actions.math',
                 WFWorkflowActionParameters={
                     'WFInput': '0',
-                    'WFMathOperand': token_attachment(self.actions, lhs),
+                    'WFMathOperand': token_attachment(self.actions, lhs, True),
                     'WFMathOperation': '-',
                 },
-            ).with_output('Calculation Result', T.number)
+            ).with_output('Calculation Result', lhs.type)
             self.actions.append(action)
             return action.output
         raise NotImplementedError(
             f"UnaryOp does not support {node.op.__class__.__name__} or the operand type"
         )
 
+    def _dict_item(self, key: Value, value: Value) -> ItemValue | None:
+        """
+        Returns the item for a key and value in a Dictionary action, or None
+        if the key has to be set with a separate action.
+        """
+        if not isinstance(key, (ConstantValue, TokenStringValue)):
+            return None
+        if isinstance(value, TokenAttachmentValue):
+            value = value.value
+        assert isinstance(value, ShortcutValue), f"Value {value} cannot be a dict value"
+        item_type = (
+            3 if isinstance(value, ConstantValue) and value.type == T.number else 0
+        )
+        return ItemValue(item_type, TokenStringValue(value), TokenStringValue(key))
+
     def visit_Dict(self, node: a.Dict) -> Any:
+        items = []
+        rest = []
+        for key, val in zip(node.keys, node.values):
+            assert key is not None, "{**dict} expression is not supported"
+            key = self.visit(key)
+            val = self.visit(val)
+            item = self._dict_item(key, val)
+            if item is not None:
+                items.append(item)
+            else:
+                rest.append((key, val))
+        params = {}
+        if items:
+            params['WFItems'] = DictionaryFieldValue(*items).synthesize(self.actions)
         action = Action(
             WFWorkflowActionIdentifier='is.workflow.actions.dictionary',
-            WFWorkflowActionParameters={},
+            WFWorkflowActionParameters=params,
         ).with_output('Dictionary', T.dictionary)
         self.actions.append(action)
         last_variable = action.output
         assert last_variable
-        for key, val in zip(node.keys, node.values):
-            assert key is not None, "{**dict} expression is not supported"
-            key = self.visit(key)
-            val = self.visit(val)
+        for key, val in rest:
             action = Action(
                 WFWorkflowActionIdentifier='is.workflow.actions.setvalueforkey',
                 WFWorkflowActionParameters={
@@ -1,8 +1,9 @@
 import ast
 from typing import TYPE_CHECKING, Any, Callable, ParamSpec, overload
 
-from workflowpy.models.shortcuts import Action
-from workflowpy.utils import find_action_with_uuid
+from workflowpy.block import Block
+from workflowpy.models.internal import Action
+from workflowpy.uuids import new_uuid
 from workflowpy.value import (
     ItemValue,
     MagicVariableValue,
@@ -26,11 +27,14 @@ class ActionHelper:
         self.compiler = compiler
 
     @property
-    def actions(self) -> list[Action]:
+    def actions(self) -> Block:
         return self.compiler.actions
 
     def find_action(self, uuid: str):
-        return find_action_with_uuid(self.actions, uuid)
+        return self.compiler.find_action(uuid)
+
+    def new_uuid(self) -> str:
+        return new_uuid()
 
     def visit(self, node: ast.AST) -> Any:
         return self.compiler.visit(node)
@@ -63,16 +67,18 @@ class ActionHelper:
     def token_string(self, *parts: str | ShortcutValue):
         return token_string(self.actions, *parts)
 
-    def token_attachment(self, value: ShortcutValue):
-        return token_attachment(self.actions, value)
+    def token_attachment(self, value: ShortcutValue, allow_literal: bool = False):
+        return token_attachment(self.actions, value, allow_literal)
 
     def item_value(self, item_type: int, value: ShortcutValue):
         return item_value(self.actions, item_type, value)
 
 
-def action(raw_params: list[str | int] | None = None):
+def action(raw_params: list[str | int] | None = None, reads_input: bool = False):
     def decorator(func: Callable[..., Value | None]) -> PythonFunctionValue:
-        builder = PythonFunctionValue(func, raw_params=raw_params)
+        builder = PythonFunctionValue(
+            func, raw_params=raw_params, reads_input=reads_input
+        )
         return builder
 
     return decorator
@@ -0,0 +1,762 @@
+import ast
+import json
+import math
+from collections import Counter
+from typing import Any, Callable, Iterable, NamedTuple
+
+from workflowpy.models.shortcuts import Shortcut
+
+__all__ = [
+    'Emulator',
+    'EmulatorError',
+    'Execution',
+    'Request',
+    'emulate',
+    'emulated_actions',
+    'register_emulated_action',
+]
+
+
+class EmulatorError(Exception):
+    pass
+
+
+class _Exit(Exception):
+    pass
+
+
+class Request(NamedTuple):
+    url: str
+    method: str
+    headers: dict[str, Any]
+    body: Any
+
+
+class Execution(NamedTuple):
+    """
+    What happened when a shortcut was emulated.
+
+    `loop_iterations` maps the index of each loop's first action to the
+    number of actions executed in each of its iterations, nested loops
+    included, in the order they ran. `output` is what Stop and Output
+    returned. Actions run by the shortcut running itself are counted too.
+    """
+
+    actions: int
+    by_identifier: Counter[str]
+    loop_iterations: dict[int, list[int]]
+    shown: list[str]
+    requests: list[Request]
+    variables: dict[str, Any]
+    output: Any = None
+
+    def report(self) -> str:
+        lines = [f'{self.actions} actions executed']
+        for identifier, count in self.by_identifier.most_common():
+            lines.append(f'{count:>10}  {identifier}')
+        for index, iterations in self.loop_iterations.items():
+            lines.append(
+                f'loop at action {index}: {len(iterations)} iterations, '
+                f'{sum(iterations)} actions, at most {max(iterations)} per iteration'
+            )
+        return '\n'.join(lines)
+
+
+type Handler = Callable[['Emulator', dict[str, Any]], Any]
+
+emulated_actions: dict[str, Handler] = {}
+
+
+def register_emulated_action(identifier: str):
+    """
+    Registers a function that emulates an action. It is called with the
+    emulator and the action's parameters, and returns the action's output.
+    """
+
+    def decorator(func: Handler) -> Handler:
+        emulated_actions[identifier] = func
+        return func
+
+    return decorator
+
+
+class _Loop:
+    __slots__ = ('start', 'items', 'index', 'results', 'executed')
+
+    def __init__(self, start: int, items: list[Any], executed: int):
+        self.start = start
+        self.items = items
+        self.index = 0
+        self.results: list[Any] = []
+        self.executed = executed
+
+
+class Emulator:
+    """
+    Runs a shortcut on the host, to count the actions it executes.
+
+    Values are plain Python objects: text is `str`, numbers are `int` or
+    `float`, and dictionaries and lists are `dict` and `list`. Ask for Input
+    takes its answers from `inputs`, in order, and Get Contents of URL calls
+    `fetch` with a `Request` instead of accessing the network.
+    """
+
+    def __init__(
+        self,
+        shortcut: Shortcut,
+        inputs: Iterable[Any] = (),
+        *,
+        shortcut_input: Any = None,
+        fetch: Callable[[Request], Any] | None = None,
+        max_actions: int = 1_000_000,
+    ):
+        self.shortcut = shortcut
+        self.actions = shortcut.WFWorkflowActions
+        self.inputs = iter(inputs)
+        self.shortcut_input = shortcut_input
+        self.fetch = fetch or (lambda request: '')
+        self.max_actions = max_actions
+        self.outputs: dict[str, Any] = {}
+        self.variables: dict[str, Any] = {}
+        self.shown: list[str] = []
+        self.requests: list[Request] = []
+        self.output: Any = None
+        self.runs: list[Execution] = []
+        self._partners = self._match_control_flow()
+
+    def _match_control_flow(self) -> dict[int, tuple[int | None, int]]:
+        """
+        Maps the index of every action that starts or continues a block to
+        the indices of its Otherwise action (if any) and its end action.
+        """
+        partners: dict[int, tuple[int | None, int]] = {}
+        stack: list[tuple[str, int, int | None]] = []
+        for i, action in enumerate(self.actions):
+            params = action.WFWorkflowActionParameters
+            group = params.get('GroupingIdentifier')
+            if group is None:
+                continue
+            mode = params.get('WFControlFlowMode')
+            if mode == 0:
+                stack.append((group, i, None))
+                continue
+            if not stack or stack[-1][0] != group:
+                raise EmulatorError(f'Unbalanced control flow at action {i}')
+            if mode == 1:
+                stack[-1] = (group, stack[-1][1], i)
+            elif mode == 2:
+                _, start, otherwise = stack.pop()
+                partners[start] = (otherwise, i)
+                if otherwise is not None:
+                    partners[otherwise] = (otherwise, i)
+                partners[i] = (otherwise, start)
+        if stack:
+            raise EmulatorError('Unbalanced control flow at the end of the shortcut')
+        return partners
+
+    # values
+
+    def resolve(self, value: Any) -> Any:
+        """
+        Returns the value of a parameter.
+        """
+        if not isinstance(value, dict):
+            return value
+        serialization = value.get('WFSerializationType')
+        if serialization == 'WFTextTokenString':
+            inner = value['Value']
+            attachments = inner.get('attachmentsByRange', {})
+            if inner['string'] == '\ufffc' and len(attachments) == 1:
+                (ref,) = attachments.values()
+                return self.variable(ref)
+            return self.text(value)
+        if serialization == 'WFTextTokenAttachment':
+            return self.variable(value['Value'])
+        if serialization == 'WFDictionaryFieldValue':
+            return self._items(value['Value']['WFDictionaryFieldValueItems'])
+        if 'Variable' in value and value.get('Type') == 'Variable':
+            # the input of a condition
+            return self.resolve(value['Variable'])
+        return value
+
+    def text(self, value: Any) -> str:
+        """
+        Returns a parameter as text, filling in its variables.
+        """
+        if isinstance(value, dict) and value.get('WFSerializationType') == (
+            'WFTextTokenString'
+        ):
+            inner = value['Value']
+            string: str = inner['string']
+            parts = []
+            last = 0
+            ranges = []
+            for key, ref in inner.get('attachmentsByRange', {}).items():
+                start, length = map(int, key.strip('{}').split(','))
+                ranges.append((start, length, ref))
+            for start, length, ref in sorted(ranges, key=lambda x: x[0]):
+                parts.append(string[last:start])
+                parts.append(to_text(self.variable(ref)))
+                last = start + length
+            parts.append(string[last:])
+            return ''.join(parts)
+        return to_text(self.resolve(value))
+
+    def variable(self, ref: dict[str, Any]) -> Any:
+        """
+        Returns the value of a variable reference, with its aggrandizements.
+        """
+        type = ref.get('Type')
+        if type == 'ActionOutput':
+            uuid = ref['OutputUUID']
+            if uuid not in self.outputs:
+                raise EmulatorError(f'Output {ref.get("OutputName")!r} was never set')
+            value = self.outputs[uuid]
+        elif type == 'Variable':
+            name = ref['VariableName']
+            if name not in self.variables:
+                raise EmulatorError(f'Variable {name!r} was never set')
+            value = self.variables[name]
+        elif type == 'ExtensionInput':
+            value = self.shortcut_input
+        else:
+            raise EmulatorError(f'Variables of type {type!r} are not supported')
+        for aggrandizement in ref.get('Aggrandizements', []):
+            value = self._aggrandize(value, aggrandizement)
+        return value
+
+    def _aggrandize(self, value: Any, aggrandizement: dict[str, Any]) -> Any:
+        type = aggrandizement['Type']
+        if type == 'WFCoercionVariableAggrandizement':
+            item_class = aggrandizement['CoercionItemClass']
+            if item_class == 'WFNumberContentItem':
+                return to_number(value)
+            if item_class == 'WFStringContentItem':
+                return to_text(value)
+            if item_class == 'WFDictionaryContentItem':
+                return to_dictionary(value)
+            return value
+        if type == 'WFPropertyVariableAggrandizement':
+            name = aggrandizement['PropertyName']
+            if isinstance(value, dict) and name == 'Keys':
+                return list(value)
+            if isinstance(value, dict) and name == 'Values':
+                return list(value.values())
+            if isinstance(value, dict) and name in value:
+                return value[name]
+            raise EmulatorError(f'Property {name!r} is not supported')
+        if type == 'WFDictionaryValueVariableAggrandizement':
+            return to_dictionary(value).get(aggrandizement['DictionaryKey'])
+        raise EmulatorError(f'Aggrandizement {type!r} is not supported')
+
+    def _items(self, items: list[Any]) -> Any:
+        result = {}
+        for item in items:
+            result[self.text(item['WFKey'])] = self._item(item)
+        return result
+
+    def _item(self, item: Any) -> Any:
+        if not isinstance(item, dict) or 'WFItemType' not in item:
+            return self.resolve(item)
+        item_type = item['WFItemType']
+        value = item['WFValue']
+        if item_type == 0:
+            return self.text(value)
+        if item_type == 1:
+            return self._items(value['Value']['WFDictionaryFieldValueItems'])
+        if item_type == 2:
+            return [self._item(x) for x in value['Value']]
+        if item_type == 3:
+            return to_number(self.resolve(value))
+        if item_type == 4:
+            return bool(self.resolve(value))
+        raise EmulatorError(f'Item type {item_type} is not supported')
+
+    # execution
+
+    def run(self) -> Execution:
+        actions = self.actions
+        by_identifier: Counter[str] = Counter()
+        loop_iterations: dict[int, list[int]] = {}
+        loops: list[_Loop] = []
+        executed = 0
+        last = None
+        pc = 0
+        try:
+            while pc < len(actions):
+                action = actions[pc]
+                identifier = action.WFWorkflowActionIdentifier
+                params = action.WFWorkflowActionParameters
+                executed += 1
+                by_identifier[identifier] += 1
+                if executed > self.max_actions:
+                    raise EmulatorError(
+                        f'More than {self.max_actions} actions executed'
+                    )
+
+                mode = (
+                    params.get('WFControlFlowMode')
+                    if 'GroupingIdentifier' in params
+                    else None
+                )
+                if mode is None:
+                    handler = emulated_actions.get(identifier)
+                    if handler is None:
+                        raise EmulatorError(f'Action {identifier} is not supported')
+                    last = handler(self, params)
+                    if 'UUID' in params:
+                        self.outputs[params['UUID']] = last
+                    pc += 1
+                    continue
+
+                otherwise, partner = self._partners[pc]
+                if identifier == 'is.workflow.actions.conditional':
+                    if mode == 0:
+                        # the output of an If is that of the last action in
+                        # the branch that ran
+                        last = None
+                        if self.condition(params):
+                            pc += 1
+                        elif otherwise is not None:
+                            pc = otherwise + 1
+                        else:
+                            pc = partner
+                    elif mode == 1:
+                        # the end of the If branch
+                        pc = partner
+                    else:
+                        if 'UUID' in params:
+                            self.outputs[params['UUID']] = last
+                        pc += 1
+                    continue
+
+                # a repeat
+                if mode == 0:
+                    if identifier == 'is.workflow.actions.repeat.count':
+                        count = to_number(self.resolve(params.get('WFRepeatCount')))
+                        items = list(range(1, int(count or 0) + 1))
+                    else:
+                        items = to_list(self.resolve(params.get('WFInput')))
+                    if not items:
+                        last = []
+                        end_params = actions[partner].WFWorkflowActionParameters
+                        if 'UUID' in end_params:
+                            self.outputs[end_params['UUID']] = last
+                        pc = partner + 1
+                        continue
+                    loop = _Loop(pc, items, executed)
+                    loops.append(loop)
+                    loop_iterations.setdefault(pc, [])
+                    self._start_iteration(loop, len(loops))
+                    pc += 1
+                    continue
+                loop = loops[-1]
+                # like any content, the items of a list are added one by one
+                if isinstance(last, list):
+                    loop.results.extend(last)
+                elif last is not None:
+                    loop.results.append(last)
+                loop_iterations[loop.start].append(executed - loop.executed)
+                loop.index += 1
+                if loop.index < len(loop.items):
+                    loop.executed = executed
+                    self._start_iteration(loop, len(loops))
+                    pc = loop.start + 1
+                    continue
+                loops.pop()
+                last = loop.results
+                if 'UUID' in params:
+                    self.outputs[params['UUID']] = last
+                pc += 1
+        except _Exit:
+            pass
+        for run in self.runs:
+            executed += run.actions
+            by_identifier += run.by_identifier
+        return Execution(
+            executed,
+            by_identifier,
+            loop_iterations,
+            self.shown,
+            self.requests,
+            self.variables,
+            self.output,
+        )
+
+    def _start_iteration(self, loop: _Loop, depth: int):
+        suffix = '' if depth == 1 else f' {depth}'
+        self.variables[f'Repeat Index{suffix}'] = loop.index + 1
+        self.variables[f'Repeat Item{suffix}'] = loop.items[loop.index]
+
+    def condition(self, params: dict[str, Any]) -> bool:
+        condition = params['WFCondition']
+        value = self.resolve(params.get('WFInput'))
+        if condition == 100:
+            return has_value(value)
+        if condition == 101:
+            return not has_value(value)
+        if 'WFNumberValue' in params:
+            lhs = to_number(value) or 0
+            rhs = to_number(self.resolve(params['WFNumberValue'])) or 0
+            comparisons = {
+                0: lhs < rhs,
+                1: lhs <= rhs,
+                2: lhs > rhs,
+                3: lhs >= rhs,
+                4: lhs == rhs,
+                5: lhs != rhs,
+            }
+        else:
+            lhs = to_text(value)
+            rhs = self.text(params.get('WFConditionalActionString', ''))
+            comparisons = {
+                4: lhs == rhs,
+                5: lhs != rhs,
+                8: lhs.startswith(rhs),
+                9: lhs.endswith(rhs),
+                99: rhs in lhs,
+                999: rhs not in lhs,
+            }
+        if condition not in comparisons:
+            raise EmulatorError(f'Condition {condition} is not supported')
+        return comparisons[condition]
+
+
+def emulate(shortcut: Shortcut, inputs: Iterable[Any] = (), **kwargs: Any):
+    """
+    Runs a shortcut with the given answers to Ask for Input, and returns what
+    happened. See `Emulator` for the other arguments.
+    """
+    return Emulator(shortcut, inputs, **kwargs).run()
+
+
+# conversions
+
+
+def to_text(value: Any) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'Yes' if value else 'No'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, list):
+        return '\n'.join(to_text(item) for item in value)
+    return str(value)
+
+
+def to_number(value: Any) -> int | float | None:
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, list):
+        return to_number(value[0]) if value else None
+    try:
+        number = float(to_text(value).strip())
+    except ValueError:
+        return None
+    return int(number) if number.is_integer() else number
+
+
+def to_dictionary(value: Any) -> dict[str, Any]:
+    if isinstance(value, dict):
+        return value
+    try:
+        result = json.loads(to_text(value))
+    except ValueError:
+        return {}
+    return result if isinstance(result, dict) else {}
+
+
+def to_list(value: Any) -> list[Any]:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def has_value(value: Any) -> bool:
+    return value is not None and value != '' and value != []
+
+
+def _separator(params: dict[str, Any]) -> str | None:
+    separator = params.get('WFTextSeparator', 'New Lines')
+    if separator == 'Custom':
+        return params.get('WFTextCustomSeparator', '')
+    return {'New Lines': '\n', 'Spaces': ' ', 'Every Character': None}[separator]
+
+
+_OPERATORS: dict[type, Callable[[Any, Any], Any]] = {
+    ast.Add: lambda a, b: a + b,
+    ast.Sub: lambda a, b: a - b,
+    ast.Mult: lambda a, b: a * b,
+    ast.Div: lambda a, b: a / b,
+    ast.Mod: lambda a, b: a % b,
+    ast.Pow: lambda a, b: a**b,
+}
+
+
+def _calculate(node: ast.expr) -> Any:
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return node.value
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        operand = _calculate(node.operand)
+        return -operand if isinstance(node.op, ast.USub) else operand
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        return _OPERATORS[type(node.op)](_calculate(node.left), _calculate(node.right))
+    raise EmulatorError(f'Cannot calculate {ast.unparse(node)!r}')
+
+
+# actions
+
+
+@register_emulated_action('is.workflow.actions.comment')
+def _comment(emulator: Emulator, params: dict[str, Any]):
+    return None
+
+
+@register_emulated_action('is.workflow.actions.exit')
+def _exit(emulator: Emulator, params: dict[str, Any]):
+    raise _Exit
+
+
+@register_emulated_action('is.workflow.actions.output')
+def _output(emulator: Emulator, params: dict[str, Any]):
+    emulator.output = emulator.resolve(params.get('WFOutput'))
+    raise _Exit
+
+
+@register_emulated_action('is.workflow.actions.runworkflow')
+def _runworkflow(emulator: Emulator, params: dict[str, Any]):
+    if not params.get('WFWorkflow', {}).get('isSelf'):
+        raise EmulatorError('Only running the shortcut itself is supported')
+    child = Emulator(
+        emulator.shortcut,
+        shortcut_input=emulator.resolve(params.get('WFInput')),
+        fetch=emulator.fetch,
+        max_actions=emulator.max_actions,
+    )
+    # the run shares the answers to Ask for Input and what is shown
+    child.inputs = emulator.inputs
+    child.shown = emulator.shown
+    child.requests = emulator.requests
+    execution = child.run()
+    emulator.runs.append(execution)
+    return execution.output
+
+
+@register_emulated_action('is.workflow.actions.ask')
+def _ask(emulator: Emulator, params: dict[str, Any]):
+    try:
+        answer = next(emulator.inputs)
+    except StopIteration:
+        prompt = emulator.text(params.get('WFAskActionPrompt', ''))
+        raise EmulatorError(f'No input left to answer {prompt!r}') from None
+    if params.get('WFInputType') == 'Number':
+        return to_number(answer)
+    return to_text(answer)
+
+
+@register_emulated_action('is.workflow.actions.showresult')
+def _showresult(emulator: Emulator, params: dict[str, Any]):
+    text = emulator.text(params.get('Text', ''))
+    emulator.shown.append(text)
+    return text
+
+
+@register_emulated_action('is.workflow.actions.gettext')
+def _gettext(emulator: Emulator, params: dict[str, Any]):
+    return emulator.text(params.get('WFTextActionText', ''))
+
+
+@register_emulated_action('is.workflow.actions.number')
+def _number(emulator: Emulator, params: dict[str, Any]):
+    return to_number(emulator.resolve(params.get('WFNumberActionNumber')))
+
+
+@register_emulated_action('is.workflow.actions.math')
+def _math(emulator: Emulator, params: dict[str, Any]):
+    lhs = to_number(emulator.resolve(params.get('WFInput'))) or 0
+    rhs = to_number(emulator.resolve(params.get('WFMathOperand'))) or 0
+    operation = params.get('WFMathOperation', '+')
+    if operation in ('*', '×'):
+        return lhs * rhs
+    if operation in ('/', '÷'):
+        if rhs == 0:
+            raise EmulatorError('Division by zero')
+        return to_number(lhs / rhs)
+    if operation == '-':
+        return lhs - rhs
+    if operation == '+':
+        return lhs + rhs
+    raise EmulatorError(f'Math operation {operation!r} is not supported')
+
+
+@register_emulated_action('is.workflow.actions.calculateexpression')
+def _calculateexpression(emulator: Emulator, params: dict[str, Any]):
+    expression = emulator.text(params.get('Input', ''))
+    try:
+        tree = ast.parse(expression.replace('×', '*').replace('÷', '/'), mode='eval')
+    except SyntaxError:
+        raise EmulatorError(f'Cannot calculate {expression!r}') from None
+    return to_number(_calculate(tree.body))
+
+
+@register_emulated_action('is.workflow.actions.round')
+def _round(emulator: Emulator, params: dict[str, Any]):
+    value = to_number(emulator.resolve(params.get('WFInput'))) or 0
+    if params.get('WFRoundTo', 'Ones Place') != 'Ones Place':
+        raise EmulatorError('Only rounding to the ones place is supported')
+    mode = params.get('WFRoundMode', 'Normal')
+    if mode == 'Always Round Down':
+        return math.floor(value)
+    if mode == 'Always Round Up':
+        return math.ceil(value)
+    return math.floor(value + 0.5) if value >= 0 else -math.floor(-value + 0.5)
+
+
+@register_emulated_action('is.workflow.actions.detect.number')
+def _detect_number(emulator: Emulator, params: dict[str, Any]):
+    return to_number(emulator.resolve(params.get('WFInput')))
+
+
+@register_emulated_action('is.workflow.actions.detect.text')
+def _detect_text(emulator: Emulator, params: dict[str, Any]):
+    return emulator.text(params.get('WFInput'))
+
+
+@register_emulated_action('is.workflow.actions.detect.dictionary')
+def _detect_dictionary(emulator: Emulator, params: dict[str, Any]):
+    return to_dictionary(emulator.resolve(params.get('WFInput')))
+
+
+@register_emulated_action('is.workflow.actions.setvariable')
+def _setvariable(emulator: Emulator, params: dict[str, Any]):
+    value = emulator.resolve(params.get('WFInput'))
+    emulator.variables[params['WFVariableName']] = value
+    return value
+
+
+@register_emulated_action('is.workflow.actions.appendvariable')
+def _appendvariable(emulator: Emulator, params: dict[str, Any]):
+    name = params['WFVariableName']
+    value = to_list(emulator.variables.get(name)) + to_list(
+        emulator.resolve(params.get('WFInput'))
+    )
+    emulator.variables[name] = value
+    return value
+
+
+@register_emulated_action('is.workflow.actions.getvariable')
+def _getvariable(emulator: Emulator, params: dict[str, Any]):
+    return emulator.resolve(params.get('WFVariable'))
+
+
+@register_emulated_action('is.workflow.actions.dictionary')
+def _dictionary(emulator: Emulator, params: dict[str, Any]):
+    items = params.get('WFItems')
+    return emulator.resolve(items) if items is not None else {}
+
+
+@register_emulated_action('is.workflow.actions.getvalueforkey')
+def _getvalueforkey(emulator: Emulator, params: dict[str, Any]):
+    dictionary = to_dictionary(emulator.resolve(params.get('WFInput')))
+    kind = params.get('WFGetDictionaryValueType', 'Value')
+    if kind == 'All Keys':
+        return list(dictionary)
+    if kind == 'All Values':
+        return list(dictionary.values())
+    return dictionary.get(emulator.text(params.get('WFDictionaryKey', '')))
+
+
+@register_emulated_action('is.workflow.actions.setvalueforkey')
+def _setvalueforkey(emulator: Emulator, params: dict[str, Any]):
+    dictionary = dict(to_dictionary(emulator.resolve(params.get('WFDictionary'))))
+    key = emulator.text(params.get('WFDictionaryKey', ''))
+    dictionary[key] = emulator.resolve(params.get('WFDictionaryValue'))
+    return dictionary
+
+
+@register_emulated_action('is.workflow.actions.list')
+def _list(emulator: Emulator, params: dict[str, Any]):
+    return [emulator._item(item) for item in params.get('WFItems', [])]
+
+
+@register_emulated_action('is.workflow.actions.getitemfromlist')
+def _getitemfromlist(emulator: Emulator, params: dict[str, Any]):
+    items = to_list(emulator.resolve(params.get('WFInput')))
+    specifier = params.get('WFItemSpecifier', 'First Item')
+    if specifier == 'First Item':
+        return items[0] if items else None
+    if specifier == 'Last Item':
+        return items[-1] if items else None
+    if specifier == 'Item At Index':
+        index = int(to_number(emulator.resolve(params.get('WFItemIndex'))) or 0)
+        if not 1 <= index <= len(items):
+            raise EmulatorError(f'Item index {index} is out of range')
+        return items[index - 1]
+    if specifier == 'Items in Range':
+        start = int(to_number(emulator.resolve(params.get('WFItemRangeStart'))) or 1)
+        end = int(to_number(emulator.resolve(params.get('WFItemRangeEnd'))) or 0)
+        return items[max(start, 1) - 1 : end]
+    raise EmulatorError(f'Item specifier {specifier!r} is not supported')
+
+
+@register_emulated_action('is.workflow.actions.count')
+def _count(emulator: Emulator, params: dict[str, Any]):
+    value = emulator.resolve(params.get('Input'))
+    kind = params.get('WFCountType', 'Items')
+    if kind == 'Items':
+        return len(to_list(value))
+    text = to_text(value)
+    if kind == 'Characters':
+        return len(text)
+    if kind == 'Words':
+        return len(text.split())
+    if kind == 'Lines':
+        return len(text.splitlines())
+    raise EmulatorError(f'Count type {kind!r} is not supported')
+
+
+@register_emulated_action('is.workflow.actions.text.split')
+def _text_split(emulator: Emulator, params: dict[str, Any]):
+    text = emulator.text(params.get('text', ''))
+    separator = _separator(params)
+    if separator is None:
+        return list(text)
+    return text.split(separator) if separator else [text]
+
+
+@register_emulated_action('is.workflow.actions.text.combine')
+def _text_combine(emulator: Emulator, params: dict[str, Any]):
+    items = to_list(emulator.resolve(params.get('text')))
+    separator = _separator(params)
+    return (separator or '').join(to_text(item) for item in items)
+
+
+@register_emulated_action('is.workflow.actions.gettypeaction')
+def _gettypeaction(emulator: Emulator, params: dict[str, Any]):
+    value = emulator.resolve(params.get('WFInput'))
+    if params.get('WFFileType') == 'public.json' and not isinstance(value, str):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+@register_emulated_action('is.workflow.actions.downloadurl')
+def _downloadurl(emulator: Emulator, params: dict[str, Any]):
+    headers = params.get('WFHTTPHeaders')
+    body = params.get('WFRequestVariable')
+    request = Request(
+        emulator.text(params.get('WFURL', '')),
+        params.get('WFHTTPMethod', 'GET'),
+        emulator.resolve(headers) if headers is not None else {},
+        emulator.resolve(body) if body is not None else None,
+    )
+    emulator.requests.append(request)
+    return emulator.fetch(request)
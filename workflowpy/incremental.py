@@ -0,0 +1,249 @@
+import ast as a
+import bisect
+import itertools
+from typing import Any, NamedTuple
+
+from workflowpy import value_type as T
+from workflowpy.block import Block
+from workflowpy.cache import fingerprint_modules
+from workflowpy.compiler import Compiler
+from workflowpy.models.internal import Action, SourceLocation
+from workflowpy.modules import modules
+from workflowpy.uuids import UUIDAllocator, current_uuids
+from workflowpy.value import FunctionValue, Value
+from workflowpy.value_type import ValueType
+
+__all__ = ['IncrementalCompiler']
+
+
+class _Statement(NamedTuple):
+    actions: list[Action]
+    variables: dict[str, Value]
+    # changes made to the parameters of actions emitted by earlier statements
+    patches: dict[str, dict[str, Any]]
+    # the subroutines of the functions compiled by this statement
+    functions: dict[str, list[Action]]
+    # the subroutines called by this statement
+    calls: set[str]
+    lineno: int
+    # identifies the variables assigned by this statement
+    version: int
+
+
+def _copy_params(value: Any) -> Any:
+    # the optimizer rewrites references inside the parameters in place
+    if type(value) is dict:
+        return {
+            k: _copy_params(v) if type(v) in (dict, list) else v
+            for k, v in value.items()
+        }
+    if type(value) is list:
+        return [_copy_params(v) if type(v) in (dict, list) else v for v in value]
+    return value
+
+
+def _copy_action(action: Action, line_delta: int = 0) -> Action:
+    new = action.copy()
+    new.WFWorkflowActionParameters = _copy_params(action.WFWorkflowActionParameters)
+    if line_delta and action.source is not None:
+        new.source = SourceLocation(
+            action.source.lineno + line_delta, action.source.col_offset
+        )
+    return new
+
+
+def _type_key(type: ValueType) -> tuple[str, bool]:
+    # T.integer is equal to T.number, but compiles differently
+    return (type.content_item_class, type is T.integer)
+
+
+def _flatten(items: list[Action | Block]) -> list[Action]:
+    actions: list[Action] = []
+    for item in items:
+        if isinstance(item, Block):
+            actions.extend(item)
+        else:
+            actions.append(item)
+    return actions
+
+
+class IncrementalCompiler(Compiler):
+    """
+    A compiler that remembers the actions emitted for each top-level
+    statement, to compile a changing source again quickly.
+
+    A statement is compiled again only if its code, the variables it reads or
+    the types inferred for it changed since the last compile; otherwise
+    copies of its old actions are used, with the same UUIDs. If a statement
+    changed actions emitted by earlier statements, like `int(x)` turning the
+    `input()` that made `x` into a number input, the changes are made again
+    when it is reused.
+
+    After compiling, `reused` and `recompiled` count the statements that were
+    reused and compiled again.
+    """
+
+    def __init__(self, optimize: bool = True, inline_threshold: int = 15):
+        super().__init__(optimize=optimize, inline_threshold=inline_threshold)
+        self.reused = 0
+        self.recompiled = 0
+        self._statements: dict[tuple[Any, ...], _Statement] = {}
+        self._versions = itertools.count(1)
+        self._modules_fingerprint: str | None = None
+        # the dumps of statements and the names they read, by source text
+        self._dumps: dict[Any, tuple[str, tuple[str, ...]]] = {}
+        self._lines: list[str] | None = None
+
+    def compile(self, module: a.Module | str):
+        self._lines = module.splitlines() if isinstance(module, str) else None
+        return super().compile(module)
+
+    def _dump(self, stmt: a.stmt) -> tuple[str, tuple[str, ...]]:
+        source = None
+        if self._lines is not None and stmt.end_lineno is not None:
+            text = '\n'.join(self._lines[stmt.lineno - 1 : stmt.end_lineno])
+            source = (text, stmt.col_offset, stmt.end_col_offset)
+            dump = self._dumps.get(source)
+            if dump is not None:
+                self._used_dumps[source] = dump
+                return dump
+        names = {
+            node.id: None
+            for node in a.walk(stmt)
+            if isinstance(node, a.Name) and isinstance(node.ctx, a.Load)
+        }
+        dump = (a.dump(stmt), tuple(names))
+        if source is not None:
+            self._used_dumps[source] = dump
+        return dump
+
+    def _statement_types(self, body: list[a.stmt]) -> list[list[tuple[str, bool]]]:
+        # finds the statement each typed node is in by its position
+        starts = [(stmt.lineno, stmt.col_offset) for stmt in body]
+        types: list[list[tuple[str, bool]]] = [[] for _ in body]
+        for node, type in self.types.items():
+            position = (getattr(node, 'lineno', 0), getattr(node, 'col_offset', 0))
+            i = bisect.bisect_right(starts, position) - 1
+            if i >= 0:
+                types[i].append(_type_key(type))
+        return types
+
+    def find_action(self, uuid: str) -> Action | None:
+        action = super().find_action(uuid)
+        if action is not None and uuid in self._owners and uuid not in self._found:
+            self._found[uuid] = (action, action.WFWorkflowActionParameters.copy())
+        return action
+
+    def _patches(self) -> dict[str, dict[str, Any]]:
+        patches: dict[str, dict[str, Any]] = {}
+        for uuid, (action, before) in self._found.items():
+            params = action.WFWorkflowActionParameters
+            patch = {k: v for k, v in params.items() if before.get(k) != v}
+            if patch:
+                patches[uuid] = _copy_params(patch)
+        return patches
+
+    def visit_Module(self, node: a.Module) -> Any:
+        fingerprint = fingerprint_modules(modules)
+        if fingerprint != self._modules_fingerprint:
+            self._statements.clear()
+            self._modules_fingerprint = fingerprint
+        previous = self._statements
+        self._statements = {}
+        self._used_dumps: dict[Any, tuple[str, tuple[str, ...]]] = {}
+        # the version of each variable, and the UUIDs of the actions emitted
+        # by the statements so far
+        self._bindings: dict[str, int] = {}
+        self._owners: set[str] = set()
+        self._found: dict[str, tuple[Action, dict[str, Any]]] = {}
+        self.reused = self.recompiled = 0
+        block = self.actions
+        seen: dict[str, int] = {}
+        statement_types = self._statement_types(node.body)
+        try:
+            for stmt, types in zip(node.body, statement_types):
+                dump, names = self._dump(stmt)
+                # identical statements still need their own UUIDs
+                count = seen.get(dump, 0)
+                seen[dump] = count + 1
+                # a variable's version stands for everything that went into
+                # its value; a call also reads what the function reads
+                env = tuple(
+                    self._bindings.get(name, 0) for name in self._names_read(names)
+                )
+                key = (dump, count, env, tuple(types))
+                if isinstance(stmt, (a.For, a.If)):
+                    # a `break` in the last loop of the shortcut stops it
+                    key += (stmt is node.body[-1],)
+                elif isinstance(stmt, a.FunctionDef):
+                    # whether it is inlined depends on how often it is called
+                    calls = self._call_counts().get(stmt.name, 0)
+                    key += (calls, self._function_key(stmt.name))
+                entry = previous.get(key)
+                if entry is not None:
+                    self.reused += 1
+                    delta = stmt.lineno - entry.lineno
+                    actions = [_copy_action(x, delta) for x in entry.actions]
+                    block.extend(actions)
+                    for name, value in entry.variables.items():
+                        self.variables[name] = value.copy()
+                    if isinstance(stmt, a.FunctionDef):
+                        # calls compile the body, so give them this module's
+                        function = self.variables[stmt.name]
+                        assert isinstance(function, FunctionValue)
+                        function.node = stmt
+                    for name, actions in entry.functions.items():
+                        self.functions[name] = [_copy_action(x, delta) for x in actions]
+                    self._called.update(entry.calls)
+                    for uuid, patch in entry.patches.items():
+                        action = block.find(uuid)
+                        if action is not None:
+                            action.WFWorkflowActionParameters.update(
+                                _copy_params(patch)
+                            )
+                else:
+                    self.recompiled += 1
+                    start = len(block.items)
+                    before = dict(self.variables)
+                    functions = set(self.functions)
+                    called = self._called
+                    self._called = set()
+                    self._found.clear()
+                    # the UUIDs only depend on the statement, so they stay the
+                    # same when it is compiled again because a variable changed
+                    token = current_uuids.set(UUIDAllocator(f'{dump}\0{count}'))
+                    try:
+                        self.visit(stmt)
+                    finally:
+                        current_uuids.reset(token)
+                        calls = self._called
+                        self._called = called | calls
+                    actions = _flatten(block.items[start:])
+                    variables = {
+                        k: v.copy()
+                        for k, v in self.variables.items()
+                        if before.get(k) is not v
+                    }
+                    entry = _Statement(
+                        [_copy_action(x) for x in actions],
+                        variables,
+                        self._patches(),
+                        {
+                            k: [_copy_action(x) for x in v]
+                            for k, v in self.functions.items()
+                            if k not in functions
+                        },
+                        calls,
+                        stmt.lineno,
+                        next(self._versions),
+                    )
+                for name in entry.variables:
+                    self._bindings[name] = entry.version
+                self._owners.update(x.uuid for x in actions if x.uuid is not None)
+                self._statements[key] = entry
+        except BaseException:
+            # keep what was compiled before, for when the error is fixed
+            self._statements = previous | self._statements
+            self._dumps |= self._used_dumps
+            raise
+        self._dumps = self._used_dumps
@@ -0,0 +1,341 @@
+import ast
+
+from workflowpy import value_type as T
+from workflowpy.value_type import ValueType
+
+__all__ = ['infer_types']
+
+
+class DictShape:
+    """
+    A dictionary built from a literal, with the types of its known keys.
+    """
+
+    def __init__(self, keys: dict[str, 'Abstract']):
+        self.keys = keys
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, DictShape) and _same_keys(self.keys, other.keys)
+
+    __hash__ = object.__hash__
+
+
+class ListShape:
+    """
+    A list built from a literal, with the type of its items.
+    """
+
+    def __init__(self, item: 'Abstract'):
+        self.item = item
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, ListShape) and _same(self.item, other.item)
+
+    __hash__ = object.__hash__
+
+
+type Abstract = ValueType | DictShape | ListShape
+
+# what the builtin functions return, no matter the arguments
+RETURN_TYPES: dict[str, ValueType] = {
+    'input': T.text,
+    'int': T.integer,
+    'float': T.number,
+    'str': T.text,
+    'dict': T.dictionary,
+    'fetch': T.file,
+}
+
+# the types that annotations coerce values to
+ANNOTATION_TYPES: dict[str, ValueType] = {
+    'int': T.number,
+    'float': T.number,
+    'str': T.text,
+    'dict': T.dictionary,
+}
+
+
+def _same(a: Abstract, b: Abstract) -> bool:
+    # T.integer compares equal to T.number, so compare those by identity
+    if isinstance(a, ValueType) and isinstance(b, ValueType):
+        return a is b
+    return a == b
+
+
+def _same_keys(a: dict[str, Abstract], b: dict[str, Abstract]) -> bool:
+    return a.keys() == b.keys() and all(_same(a[k], b[k]) for k in a)
+
+
+def _type(value: Abstract) -> ValueType:
+    if isinstance(value, DictShape):
+        return T.dictionary
+    if isinstance(value, ListShape):
+        return T.any
+    return value
+
+
+def _is_literal(node: ast.expr) -> bool:
+    # the compiler folds negated number literals into constants
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return _is_literal(node.operand)
+    return isinstance(node, ast.Constant)
+
+
+def join(a: Abstract, b: Abstract) -> Abstract:
+    """
+    Returns the type of a value that is either of type `a` or `b`.
+    """
+    if _same(a, b):
+        return a
+    if isinstance(a, DictShape) and isinstance(b, DictShape):
+        return DictShape(
+            {k: join(v, b.keys[k]) for k, v in a.keys.items() if k in b.keys}
+        )
+    if isinstance(a, ListShape) and isinstance(b, ListShape):
+        return ListShape(join(a.item, b.item))
+    type_a, type_b = _type(a), _type(b)
+    if type_a == type_b:
+        # a number that is not always an integer, or a dictionary of unknown keys
+        return T.number if type_a == T.number else type_a
+    return T.any
+
+
+def _join_env(a: dict[str, Abstract], b: dict[str, Abstract]) -> dict[str, Abstract]:
+    return {k: join(v, b[k]) if k in b else T.any for k, v in a.items()} | {
+        k: T.any for k in b if k not in a
+    }
+
+
+class TypeInference(ast.NodeVisitor):
+    """
+    Works out the types of subscripts and loop variables before compiling.
+
+    Types flow through assignments in program order; after an `if`, a
+    variable has a type both branches agree on, and loop bodies are checked
+    until the types of the variables they assign stop changing.
+    """
+
+    def __init__(self):
+        self.env: dict[str, Abstract] = {}
+        self.types: dict[ast.AST, ValueType] = {}
+
+    # statements
+
+    def visit_Assign(self, node: ast.Assign):
+        value = self.expr(node.value)
+        for target in node.targets:
+            self._bind(target, value)
+
+    def visit_AnnAssign(self, node: ast.AnnAssign):
+        if node.value is None:
+            return
+        value = self.expr(node.value)
+        annotation = node.annotation
+        if isinstance(annotation, ast.Name) and annotation.id in ANNOTATION_TYPES:
+            coerced = ANNOTATION_TYPES[annotation.id]
+            if _type(value) != coerced:
+                value = coerced
+        else:
+            value = T.any
+        self._bind(node.target, value)
+
+    def visit_Expr(self, node: ast.Expr):
+        self.expr(node.value)
+
+    def visit_If(self, node: ast.If):
+        self.expr(node.test)
+        before = self.env
+        self.env = dict(before)
+        for stmt in node.body:
+            self.visit(stmt)
+        after_body = self.env
+        self.env = dict(before)
+        for stmt in node.orelse:
+            self.visit(stmt)
+        self.env = _join_env(after_body, self.env)
+
+    def visit_For(self, node: ast.For):
+        targets = self._loop_targets(node)
+        before = self.env
+        env = joined = dict(before)
+        # the body might not run at all, so its types are joined with the
+        # types before the loop until nothing changes
+        for _ in range(10):
+            self.env = dict(env)
+            for target, type in targets:
+                self._bind(target, type)
+            for stmt in node.body:
+                self.visit(stmt)
+            joined = _join_env(env, self.env)
+            if joined.keys() == env.keys() and _same_keys(joined, env):
+                break
+            env = joined
+        self.env = joined
+
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        # a function's body is compiled where it is called, with the types of
+        # the arguments, so neither it nor its result has a known type
+        self.env[node.name] = T.any
+
+    def generic_visit(self, node: ast.AST):
+        # statements that do not assign anything, like imports and `break`
+        if isinstance(node, ast.Module):
+            for stmt in node.body:
+                self.visit(stmt)
+
+    def _bind(self, target: ast.expr, value: Abstract):
+        if isinstance(target, ast.Name):
+            self.env[target.id] = value
+            self.types[target] = _type(value)
+
+    def _loop_targets(
+        self, node: ast.For | ast.comprehension
+    ) -> list[tuple[ast.expr, Abstract]]:
+        iter = node.iter
+        if isinstance(iter, ast.Call) and isinstance(iter.func, ast.Name):
+            for arg in iter.args:
+                self.expr(arg)
+            if iter.func.id == 'range':
+                return [(node.target, T.integer)]
+            if (
+                iter.func.id == 'enumerate'
+                and iter.args
+                and isinstance(node.target, ast.Tuple)
+                and len(node.target.elts) == 2
+            ):
+                item = self._item(self.expr(iter.args[0]))
+                return [(node.target.elts[0], T.integer), (node.target.elts[1], item)]
+        return [(node.target, self._item(self.expr(iter)))]
+
+    def _item(self, iterable: Abstract) -> Abstract:
+        if isinstance(iterable, ListShape):
+            return iterable.item
+        if _type(iterable) == T.dictionary:
+            # looping over a dictionary goes over its keys
+            return T.text
+        return T.any
+
+    # expressions
+
+    def expr(self, node: ast.expr) -> Abstract:
+        method = getattr(self, f'expr_{node.__class__.__name__}', None)
+        if method is not None:
+            return method(node)
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.expr):
+                self.expr(child)
+        return T.any
+
+    def expr_Constant(self, node: ast.Constant) -> Abstract:
+        if isinstance(node.value, bool):
+            return T.any
+        if isinstance(node.value, int):
+            return T.integer
+        if isinstance(node.value, float):
+            return T.number
+        if isinstance(node.value, str):
+            return T.text
+        return T.any
+
+    def expr_Name(self, node: ast.Name) -> Abstract:
+        return self.env.get(node.id, T.any)
+
+    def expr_JoinedStr(self, node: ast.JoinedStr) -> Abstract:
+        for value in node.values:
+            self.expr(value)
+        return T.text
+
+    def expr_Dict(self, node: ast.Dict) -> Abstract:
+        keys: dict[str, Abstract] = {}
+        for key, value in zip(node.keys, node.values):
+            value_type = self.expr(value)
+            if key is None:
+                continue
+            self.expr(key)
+            if isinstance(key, ast.Constant) and isinstance(key.value, (str, int)):
+                keys[str(key.value)] = self._stored(value, value_type)
+        return DictShape(keys)
+
+    def _stored(self, node: ast.expr, value: Abstract) -> Abstract:
+        # only literal numbers are stored as numbers by the Dictionary action;
+        # everything else is stored as text, and dictionaries as JSON text,
+        # which is read back as a dictionary
+        if _is_literal(node) and _type(value) == T.number:
+            return value
+        if isinstance(value, DictShape) or _type(value) == T.dictionary:
+            return value
+        return T.text
+
+    def expr_List(self, node: ast.List) -> Abstract:
+        for elt in node.elts:
+            self.expr(elt)
+        # the List action only has text items
+        return ListShape(T.text)
+
+    def expr_ListComp(self, node: ast.ListComp) -> Abstract:
+        # the loop variables are only seen inside the comprehension
+        before = self.env
+        self.env = dict(before)
+        for generator in node.generators:
+            for target, type in self._loop_targets(generator):
+                self._bind(target, type)
+            for test in generator.ifs:
+                self.expr(test)
+        item = self.expr(node.elt)
+        self.env = before
+        # Repeat Results adds the items of a list one by one
+        if isinstance(item, ListShape):
+            return item
+        return ListShape(item)
+
+    def expr_Subscript(self, node: ast.Subscript) -> Abstract:
+        value = self.expr(node.value)
+        self.expr(node.slice)
+        result: Abstract = T.any
+        if isinstance(value, DictShape):
+            key = node.slice
+            if isinstance(key, ast.Constant) and isinstance(key.value, (str, int)):
+                result = value.keys.get(str(key.value), T.any)
+        elif isinstance(value, ListShape):
+            result = value.item
+        self.types[node] = _type(result)
+        return result
+
+    def expr_Call(self, node: ast.Call) -> Abstract:
+        for arg in node.args:
+            self.expr(arg)
+        for keyword in node.keywords:
+            self.expr(keyword.value)
+        func = node.func
+        if isinstance(func, ast.Name) and func.id not in self.env:
+            return RETURN_TYPES.get(func.id, T.any)
+        return T.any
+
+    def expr_BinOp(self, node: ast.BinOp) -> Abstract:
+        lhs = self.expr(node.left)
+        rhs = self.expr(node.right)
+        if _type(lhs) == T.number and _type(rhs) == T.number:
+            if (
+                lhs is T.integer
+                and rhs is T.integer
+                and isinstance(node.op, (ast.Add, ast.Sub, ast.Mult))
+            ):
+                return T.integer
+            return T.number
+        return T.any
+
+    def expr_UnaryOp(self, node: ast.UnaryOp) -> Abstract:
+        operand = self.expr(node.operand)
+        if isinstance(node.op, ast.USub) and _type(operand) == T.number:
+            return operand
+        return T.any
+
+
+def infer_types(module: ast.Module) -> dict[ast.AST, ValueType]:
+    """
+    Returns the types worked out for the subscripts and assignment targets
+    in a module. Expressions of unknown type are left out.
+    """
+    inference = TypeInference()
+    inference.visit(module)
+    return {node: type for node, type in inference.types.items() if type != T.any}
@@ -0,0 +1,86 @@
+from contextvars import ContextVar
+from typing import Any, NamedTuple, Self
+
+from workflowpy.models import shortcuts
+from workflowpy.uuids import new_uuid
+from workflowpy.value_type import ValueType
+
+
+class SourceLocation(NamedTuple):
+    lineno: int
+    col_offset: int
+
+
+# the location of the code being compiled, given to every action created
+current_source: ContextVar[SourceLocation | None] = ContextVar(
+    'current_source', default=None
+)
+
+
+class Action:
+    """
+    The lightweight action the compiler works with.
+
+    It has the same interface as `workflowpy.models.shortcuts.Action`, but is
+    not validated; the synthesizer converts it to the public model once.
+    `source` is where in the compiled code the action came from.
+    """
+
+    __slots__ = (
+        'WFWorkflowActionIdentifier',
+        'WFWorkflowActionParameters',
+        'output_name',
+        'output_type',
+        'source',
+    )
+
+    def __init__(
+        self,
+        WFWorkflowActionIdentifier: str,
+        WFWorkflowActionParameters: dict[str, Any] | None = None,
+    ):
+        self.WFWorkflowActionIdentifier = WFWorkflowActionIdentifier
+        self.WFWorkflowActionParameters = (
+            WFWorkflowActionParameters if WFWorkflowActionParameters is not None else {}
+        )
+        self.output_name: str | None = None
+        self.output_type: ValueType | None = None
+        self.source = current_source.get()
+
+    def __repr__(self):
+        return f'<Action {self.WFWorkflowActionIdentifier}>'
+
+    def copy(self) -> 'Action':
+        action = Action(
+            self.WFWorkflowActionIdentifier, self.WFWorkflowActionParameters.copy()
+        )
+        action.output_name = self.output_name
+        action.output_type = self.output_type
+        action.source = self.source
+        return action
+
+    @property
+    def uuid(self) -> str | None:
+        return self.WFWorkflowActionParameters.get('UUID')
+
+    def with_output(self, name: str, type: ValueType) -> Self:
+        self.output_name = name
+        self.output_type = type
+        self.WFWorkflowActionParameters.setdefault('UUID', new_uuid())
+        return self
+
+    @property
+    def output(self):
+        # i hate circular imports
+        from workflowpy.value import MagicVariableValue
+
+        if self.output_name is not None:
+            uuid = self.uuid
+            assert uuid and self.output_type is not None
+            return MagicVariableValue(uuid, self.output_name, self.output_type)
+
+    def to_model(self) -> shortcuts.Action:
+        return shortcuts.Action.model_construct(
+            WFWorkflowActionIdentifier=self.WFWorkflowActionIdentifier,
+            WFWorkflowActionParameters=self.WFWorkflowActionParameters,
+        )
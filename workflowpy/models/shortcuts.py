@@ -1,8 +1,10 @@
-from typing import Any, Literal, Self
-import uuid
+from io import BytesIO
+from typing import IO, Any, Literal, Self
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 
+from workflowpy.serializer import PlistFormat, write_plist
+from workflowpy.uuids import new_uuid
 from workflowpy.value_type import ValueType
 
 
@@ -30,7 +32,7 @@ class Action(BaseModel):
 
     def with_output(self, name: str, type: ValueType) -> Self:
         self._output_definition = OutputDefinition(name=name, type=type)
-        self.WFWorkflowActionParameters.setdefault('UUID', str(uuid.uuid4()).upper())
+        self.WFWorkflowActionParameters.setdefault('UUID', new_uuid())
         return self
 
     @property
@@ -73,3 +75,17 @@ class Shortcut(BaseModel):
     WFWorkflowMinimumClientVersionString: str = "900"  # Constant
     WFWorkflowOutputContentItemClasses: list[ContentItemClass] = []
     WFWorkflowTypes: list[ShortcutType] = []
+
+    def to_plist_bytes(self, fmt: PlistFormat = 'binary') -> bytes:
+        """
+        Returns the shortcut as a property list, ready to be signed.
+        """
+        file = BytesIO()
+        write_plist(self, file, fmt)
+        return file.getvalue()
+
+    def write_to(self, file: IO[bytes], fmt: PlistFormat = 'binary'):
+        """
+        Writes the shortcut to a binary file as a property list.
+        """
+        write_plist(self, file, fmt)
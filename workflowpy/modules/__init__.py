@@ -2,21 +2,56 @@ from workflowpy import value_type as T
 from workflowpy.definitions.action import ActionHelper as H
 from workflowpy.definitions.action import action
 from workflowpy.modules import _workflowpy
-from workflowpy.value import MagicVariableValue, Value
+from workflowpy.value import ConstantValue, LazyModule, MagicVariableValue, Value
 from workflowpy.value import ShortcutValue as V
 from workflowpy.value import TokenStringValue
 
-__all__ = ['register']
+__all__ = ['ENTRY_POINT_GROUP', 'load_entry_points', 'register']
 
+# installed packages can add modules with entry points in this group, named
+# after the module path and pointing to the module dict
+ENTRY_POINT_GROUP = 'workflowpy.modules'
 
-def register(module_path: str, module: dict[str, Value]):
+
+def register(module_path: str, module: dict[str, Value] | str):
+    """
+    Registers a module under a dotted path. If `module` is a string like
+    `package.actions:module`, the Python module is only imported once the
+    module is used.
+    """
     mod = modules
     *parts, last_part = module_path.split('.')
     for part in parts:
-        mod = mod.setdefault(part, {})
+        child = mod.setdefault(part, {})
+        mod = child.load() if isinstance(child, LazyModule) else child
     if last_part in mod:
         raise ValueError(f'Module {module_path} is already registered')
-    mod[last_part] = module
+    mod[last_part] = LazyModule(module) if isinstance(module, str) else module
+
+
+_entry_points_loaded = False
+
+
+def load_entry_points() -> bool:
+    """
+    Registers the modules of installed packages, the first time it is called.
+    Returns whether any module was registered.
+    """
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return False
+    _entry_points_loaded = True
+    import importlib.metadata
+
+    registered = False
+    for entry_point in importlib.metadata.entry_points(group=ENTRY_POINT_GROUP):
+        try:
+            register(entry_point.name, entry_point.value)
+        except ValueError:
+            # modules registered by hand come first
+            continue
+        registered = True
+    return registered
 
 
 @action()
@@ -40,8 +75,24 @@ def _print(h: H, /, *args: V):
     h.action('is.workflow.actions.showresult', {'Text': h.token_string(*items)})
 
 
+def _round_number(h: H, value: V, mode: str):
+    return h.action(
+        'is.workflow.actions.round',
+        {
+            'WFInput': h.token_attachment(value),
+            'WFRoundMode': mode,
+            'WFRoundTo': 'Ones Place',
+        },
+        ('Rounded Number', T.integer),
+    )
+
+
 @action()
 def _int(h: H, /, value: V):
+    if isinstance(value, ConstantValue) and isinstance(value.value, (int, float)):
+        return ConstantValue(int(value.value))
+    if value.type is T.integer:
+        return value
     if isinstance(value, MagicVariableValue):
         input_action = h.find_action(value.uuid)
         if (
@@ -51,39 +102,52 @@ def _int(h: H, /, value: V):
             params = input_action.WFWorkflowActionParameters
             params['WFInputType'] = 'Number'
             params['WFAskActionAllowsDecimalNumbers'] = False
-            input_action.with_output('Ask for Input', T.number)
+            input_action.with_output('Ask for Input', T.integer)
             return input_action.output
-    output = h.action(
-        'is.workflow.actions.number',
-        {'WFNumberActionNumber': h.token_attachment(value)},
-        ('Number', T.number),
-    )
-
-    output = h.action(
-        'is.workflow.actions.text.split',
+    if value.type == T.text:
+        # int() only takes text holding a whole number, which a Number action
+        # reads as it is
+        return h.action(
+            'is.workflow.actions.number',
+            {'WFNumberActionNumber': h.token_attachment(value, allow_literal=True)},
+            ('Number', T.integer),
+        )
+    if value.type != T.number:
+        # the condition below only compares numbers
+        value = value.aggrandized(
+            'WFCoercionVariableAggrandizement',
+            {'CoercionItemClass': T.number.content_item_class},
+        )
+    # int() rounds toward zero, but Round Number only rounds down or up, so
+    # the mode depends on the sign; the output of the If is the rounded value
+    group_uuid = h.new_uuid()
+    h.action(
+        'is.workflow.actions.conditional',
         {
-            'WFTextCustomSeparator': '.',
-            'WFTextSeparator': 'Custom',
-            'text': h.token_attachment(output),
+            'GroupingIdentifier': group_uuid,
+            'WFCondition': 0,
+            'WFControlFlowMode': 0,
+            'WFInput': {'Type': 'Variable', 'Variable': h.token_attachment(value)},
+            'WFNumberValue': 0,
         },
-        ('Split Text', T.text),
     )
-
-    output = h.action(
-        'is.workflow.actions.getitemfromlist',
-        {'WFInput': h.token_attachment(output)},
-        ('Item from List', T.text),
+    _round_number(h, value, 'Always Round Up')
+    h.action(
+        'is.workflow.actions.conditional',
+        {'GroupingIdentifier': group_uuid, 'WFControlFlowMode': 1},
     )
-
+    _round_number(h, value, 'Always Round Down')
     return h.action(
-        'is.workflow.actions.number',
-        {'WFNumberActionNumber': h.token_attachment(output)},
-        ('Number', T.number),
+        'is.workflow.actions.conditional',
+        {'GroupingIdentifier': group_uuid, 'WFControlFlowMode': 2},
+        ('If Result', T.integer),
     )
 
 
 @action()
 def _float(h: H, /, value: V):
+    if value.type == T.number:
+        return value
     if isinstance(value, MagicVariableValue):
         input_action = h.find_action(value.uuid)
         if (
@@ -96,7 +160,7 @@ def _float(h: H, /, value: V):
             return input_action.output
     return h.action(
         'is.workflow.actions.number',
-        {'WFNumberActionNumber': h.token_attachment(value)},
+        {'WFNumberActionNumber': h.token_attachment(value, allow_literal=True)},
         ('Number', T.number),
     )
 
@@ -1,3 +1,3 @@
-from . import magic
+from workflowpy.value import LazyModule
 
-module = {'magic': magic.module}
+module = {'magic': LazyModule('workflowpy.modules._workflowpy.magic')}
@@ -8,6 +8,7 @@ from workflowpy.definitions.action import action
 from workflowpy.value import (
     DictionaryFieldValue,
     ItemValue,
+    LazyModule,
     PythonTypeValue,
     ShortcutInputValue,
     ShortcutValue,
@@ -15,12 +16,10 @@ from workflowpy.value import (
 )
 from workflowpy.value_type import ValueType
 
-from . import custom, types
-
 type V = ShortcutValue
 
 
-@action()
+@action(reads_input=True)
 def shortcut_input(h: H):
     return ShortcutInputValue()
 
@@ -82,10 +81,14 @@ def fetch(
                     should_add_header = False
                     break
         if should_add_header:
-            if headers is None:
-                headers = ast.Dict()
-            headers.keys.append(ast.Constant(value='Content-Type'))
-            headers.values.append(ast.Constant('application/json'))
+            # the node is compiled again wherever its function is inlined,
+            # so it is not changed in place
+            keys = headers.keys if headers is not None else []
+            values = headers.values if headers is not None else []
+            headers = ast.Dict(
+                keys=[*keys, ast.Constant(value='Content-Type')],
+                values=[*values, ast.Constant('application/json')],
+            )
     if headers is not None:
         header_items = []
         for key, value in zip(headers.keys, headers.values):
@@ -109,8 +112,8 @@ def fetch(
 App = PythonTypeValue(ValueType('App', 'WFAppContentItem', {'Is Running': T.boolean}))
 
 module = {
-    'types': types.module,
-    'custom': custom.module,
+    'types': LazyModule('workflowpy.modules._workflowpy.magic.types'),
+    'custom': LazyModule('workflowpy.modules._workflowpy.magic.custom'),
     'shortcut_input': shortcut_input,
     'fetch': fetch,
     'App': App,
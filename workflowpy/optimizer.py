@@ -0,0 +1,356 @@
+import json
+from typing import Any, Iterator
+
+from workflowpy.block import Block
+from workflowpy.models.internal import Action
+
+__all__ = [
+    'PURE_ACTIONS',
+    'collected_actions',
+    'eliminate_common_subexpressions',
+    'eliminate_dead_actions',
+    'hoist_loop_invariants',
+    'iter_references',
+    'replace_references',
+]
+
+# actions that only compute their output from their parameters, so they can
+# be shared or removed without changing what the shortcut does
+PURE_ACTIONS = frozenset(
+    {
+        'is.workflow.actions.calculateexpression',
+        'is.workflow.actions.count',
+        'is.workflow.actions.detect.dictionary',
+        'is.workflow.actions.detect.number',
+        'is.workflow.actions.detect.text',
+        'is.workflow.actions.dictionary',
+        'is.workflow.actions.getitemfromlist',
+        'is.workflow.actions.gettext',
+        'is.workflow.actions.gettypeaction',
+        'is.workflow.actions.getvalueforkey',
+        'is.workflow.actions.getvariable',
+        'is.workflow.actions.list',
+        'is.workflow.actions.math',
+        'is.workflow.actions.number',
+        'is.workflow.actions.round',
+        'is.workflow.actions.text.combine',
+        'is.workflow.actions.text.split',
+    }
+)
+
+# pure actions that cannot fail whatever their input, so they can run before
+# a loop that might not run at all; calculations fail on text, getting a
+# value on anything but a dictionary, and so on
+HOISTABLE_ACTIONS = frozenset(
+    {
+        'is.workflow.actions.count',
+        'is.workflow.actions.detect.text',
+        'is.workflow.actions.dictionary',
+        'is.workflow.actions.gettext',
+        'is.workflow.actions.getvariable',
+        'is.workflow.actions.list',
+        'is.workflow.actions.text.combine',
+        'is.workflow.actions.text.split',
+    }
+)
+
+REPEAT_ACTIONS = frozenset(
+    {'is.workflow.actions.repeat.count', 'is.workflow.actions.repeat.each'}
+)
+
+VARIABLE_WRITE_ACTIONS = frozenset(
+    {'is.workflow.actions.setvariable', 'is.workflow.actions.appendvariable'}
+)
+
+
+def iter_references(value: Any) -> Iterator[dict[str, Any]]:
+    """
+    Yields every variable reference (`ActionOutput`, `Variable`, ...) found in
+    a parameter value.
+    """
+    if isinstance(value, dict):
+        if 'OutputUUID' in value or 'VariableName' in value:
+            yield value
+        for item in value.values():
+            yield from iter_references(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from iter_references(item)
+
+
+def replace_references(value: Any, mapping: dict[str, Action]):
+    """
+    Points references to the outputs in `mapping` to the outputs of other
+    actions, in place.
+    """
+    for ref in iter_references(value):
+        uuid = ref.get('OutputUUID')
+        if uuid in mapping:
+            action = mapping[uuid]
+            ref['OutputUUID'] = action.uuid
+            if action.output_name is not None:
+                ref['OutputName'] = action.output_name
+
+
+def _control_mode(action: Action) -> int | None:
+    params = action.WFWorkflowActionParameters
+    if 'GroupingIdentifier' not in params:
+        return None
+    return params.get('WFControlFlowMode')
+
+
+def collected_actions(actions: list[Action]) -> set[int]:
+    """
+    Returns the ids of the actions whose outputs become the output of a
+    block, like the Repeat Results of a loop or the If Result of an If, for
+    the blocks whose outputs have a UUID.
+
+    Nothing refers to these outputs, but they are used all the same: a block
+    collects the output of the last action of each of its branches, and if
+    that is the end of another block, the outputs that block collects.
+    """
+    groups: dict[str, list[int]] = {}
+    stack: list[int] = []
+    for i, action in enumerate(actions):
+        params = action.WFWorkflowActionParameters
+        if 'GroupingIdentifier' not in params:
+            continue
+        group = groups.setdefault(params['GroupingIdentifier'], [])
+        group.append(i)
+        if params.get('WFControlFlowMode') == 2 and action.uuid is not None:
+            stack.extend(group[1:])
+    collected: set[int] = set()
+    while stack:
+        # the output of the action before a branch ends is collected
+        action = actions[stack.pop() - 1]
+        mode = _control_mode(action)
+        if mode is None:
+            collected.add(id(action))
+        elif mode == 2:
+            group = groups[action.WFWorkflowActionParameters['GroupingIdentifier']]
+            stack.extend(group[1:])
+    return collected
+
+
+def _action_key(action: Action) -> str:
+    params = action.WFWorkflowActionParameters
+    params = {k: v for k, v in params.items() if k != 'UUID'}
+    return action.WFWorkflowActionIdentifier + json.dumps(
+        params, sort_keys=True, default=str
+    )
+
+
+class _Block:
+    __slots__ = ('is_loop', 'entries')
+
+    def __init__(self, is_loop: bool):
+        self.is_loop = is_loop
+        # key -> (action, names of variables read)
+        self.entries: dict[str, tuple[Action, frozenset[str]]] = {}
+
+
+def eliminate_common_subexpressions(actions: list[Action]) -> list[Action]:
+    """
+    Removes pure actions that repeat an earlier action with the same
+    parameters, pointing their uses at the earlier action's output.
+
+    The earlier action must run whenever the later one does, so results are
+    only shared with nested blocks, never between branches or out of a loop.
+    Actions reading named variables are not shared into a loop body, and are
+    forgotten once the variable is set again. Actions whose outputs a block
+    collects are kept, as the block would have no output without them.
+    """
+    collected = collected_actions(actions)
+    result: list[Action] = []
+    mapping: dict[str, Action] = {}
+    blocks = [_Block(False)]
+    for action in actions:
+        params = action.WFWorkflowActionParameters
+        if mapping:
+            replace_references(params, mapping)
+        identifier = action.WFWorkflowActionIdentifier
+        mode = _control_mode(action)
+        if mode == 0:
+            blocks.append(_Block(identifier in REPEAT_ACTIONS))
+        elif mode == 1:
+            blocks[-1] = _Block(blocks[-1].is_loop)
+        elif mode == 2:
+            blocks.pop()
+        elif identifier in VARIABLE_WRITE_ACTIONS:
+            name = params.get('WFVariableName')
+            for block in blocks:
+                block.entries = {
+                    k: v for k, v in block.entries.items() if name not in v[1]
+                }
+        elif identifier in PURE_ACTIONS and action.uuid is not None:
+            key = _action_key(action)
+            variables = frozenset(
+                ref['VariableName']
+                for ref in iter_references(params)
+                if 'VariableName' in ref
+            )
+            found = None
+            for block in reversed(blocks):
+                entry = block.entries.get(key)
+                if entry is not None:
+                    found = entry[0]
+                    break
+                if block.is_loop and variables:
+                    # named variables may change between iterations
+                    break
+            if found is not None and id(action) not in collected:
+                mapping[action.uuid] = found
+                continue
+            blocks[-1].entries[key] = (action, variables)
+        result.append(action)
+    return result
+
+
+def eliminate_dead_actions(actions: list[Action]) -> list[Action]:
+    """
+    Removes pure actions whose outputs are never used, and not collected by
+    a block either.
+
+    Outputs are only read after the action that produces them, so a single
+    backwards walk also removes actions that only fed other dead actions.
+    """
+    uses: dict[str, int] = {}
+    references: list[list[str]] = []
+    for action in actions:
+        refs = [
+            ref['OutputUUID']
+            for ref in iter_references(action.WFWorkflowActionParameters)
+            if 'OutputUUID' in ref
+        ]
+        references.append(refs)
+        for uuid in refs:
+            uses[uuid] = uses.get(uuid, 0) + 1
+    collected = collected_actions(actions)
+
+    live = [True] * len(actions)
+    for i in range(len(actions) - 1, -1, -1):
+        action = actions[i]
+        if (
+            action.WFWorkflowActionIdentifier not in PURE_ACTIONS
+            or id(action) in collected
+        ):
+            continue
+        uuid = action.uuid
+        if uuid is not None and uses.get(uuid, 0):
+            continue
+        live[i] = False
+        for ref in references[i]:
+            uses[ref] -= 1
+    return [action for action, keep in zip(actions, live) if keep]
+
+
+def _loop_depth(name: str) -> int | None:
+    # the variables of nested loops are called `Repeat Item 2` and so on
+    for prefix in ('Repeat Item', 'Repeat Index'):
+        if name == prefix:
+            return 1
+        rest = name.removeprefix(prefix + ' ')
+        if rest != name and rest.isdigit():
+            return int(rest)
+    return None
+
+
+def _is_number(value: Any) -> bool:
+    if not isinstance(value, str):
+        return False
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _effects(items: list[Action | Block]) -> tuple[set[str], set[str]]:
+    """
+    Returns the names of the variables written and the UUIDs of the outputs
+    made by some actions and the blocks among them. Each block is only gone
+    through once, and keeps what was found in it.
+    """
+    written: set[str] = set()
+    outputs: set[str] = set()
+    for item in items:
+        if isinstance(item, Block):
+            if item.effects is None:
+                item.effects = _effects(item.items)
+            written |= item.effects[0]
+            outputs |= item.effects[1]
+            continue
+        if item.WFWorkflowActionIdentifier in VARIABLE_WRITE_ACTIONS:
+            name = item.WFWorkflowActionParameters.get('WFVariableName')
+            if isinstance(name, str):
+                written.add(name)
+        if item.uuid is not None:
+            outputs.add(item.uuid)
+    return written, outputs
+
+
+def hoist_loop_invariants(
+    body: Block, depth: int, collects: bool = False
+) -> list[Action]:
+    """
+    Removes the pure actions of a loop body that compute the same output in
+    every iteration, and returns them to be run before the loop instead.
+    Only actions that cannot fail are moved, as the loop might not run.
+
+    `depth` is how many loops the loop is nested in, counting itself. Only
+    actions outside of the blocks in the body are moved, as those run in
+    every iteration; they must not read the loop's `Repeat Item` or `Repeat
+    Index`, variables set in the body, or outputs of actions left in it.
+    If the loop `collects` its Repeat Results, the last action of the body
+    gives the result of each iteration, so it stays.
+    """
+    written, outputs = _effects(body.items)
+
+    def invariant(action: Action) -> bool:
+        params = action.WFWorkflowActionParameters
+        identifier = action.WFWorkflowActionIdentifier
+        if identifier == 'is.workflow.actions.number':
+            # a typed-in number, like the constants of the source
+            return _is_number(params.get('WFNumberActionNumber'))
+        if identifier not in HOISTABLE_ACTIONS:
+            return False
+        for ref in iter_references(params):
+            if ref.get('OutputUUID') in outputs:
+                return False
+            name = ref.get('VariableName')
+            if name is not None:
+                if name in written:
+                    return False
+                loop = _loop_depth(name)
+                if loop is not None and loop >= depth:
+                    return False
+        return True
+
+    hoisted: list[Action] = []
+    kept: list[Action | Block] = []
+    last = body.items[-1] if collects and body.items else None
+    level = 0
+    for item in body.items:
+        if isinstance(item, Action):
+            params = item.WFWorkflowActionParameters
+            if (
+                level == 0
+                and item is not last
+                and item.uuid is not None
+                and invariant(item)
+            ):
+                hoisted.append(item)
+                outputs.discard(item.uuid)
+                continue
+            if 'GroupingIdentifier' in params:
+                mode = params.get('WFControlFlowMode')
+                if mode == 0:
+                    level += 1
+                elif mode == 2:
+                    level -= 1
+        kept.append(item)
+    if hoisted:
+        body.items = kept
+    # the hoisted actions are not in the body anymore
+    body.effects = (written, outputs)
+    return hoisted
@@ -0,0 +1,241 @@
+from typing import Any, NamedTuple, cast
+
+from workflowpy import value_type as T
+from workflowpy.models.internal import Action
+from workflowpy.optimizer import (
+    collected_actions,
+    iter_references,
+    replace_references,
+)
+from workflowpy.value_type import ValueType
+
+__all__ = [
+    'PeepholeContext',
+    'PeepholeRule',
+    'Rewrite',
+    'optimize_peephole',
+    'peephole_rules',
+    'register_peephole_rule',
+]
+
+
+class Rewrite(NamedTuple):
+    """
+    The result of a peephole rule: the actions that replace the matched
+    window, and the outputs of removed actions that should be read from
+    another action instead.
+    """
+
+    actions: list[Action]
+    aliases: dict[str, Action] = {}
+
+
+class PeepholeContext:
+    """
+    What a peephole rule may know about the actions around its window.
+    """
+
+    def __init__(self):
+        self._producers: dict[str, Action] = {}
+        self._uses: dict[str, int] = {}
+
+    def producer(self, uuid: str) -> Action | None:
+        """
+        Returns the action, already emitted, whose output has this UUID.
+        """
+        return self._producers.get(uuid)
+
+    def uses(self, uuid: str) -> int:
+        """
+        Returns how many references to the output with this UUID exist.
+        """
+        return self._uses.get(uuid, 0)
+
+    def _count(self, actions: list[Action], delta: int):
+        for action in actions:
+            for ref in iter_references(action.WFWorkflowActionParameters):
+                uuid = ref.get('OutputUUID')
+                if uuid is not None:
+                    self._uses[uuid] = self._uses.get(uuid, 0) + delta
+
+
+class PeepholeRule:
+    """
+    Base class for rules that rewrite a short window of consecutive actions.
+
+    `size` is the number of actions in the window. `rewrite` returns a
+    `Rewrite` for the window, or None if the rule does not apply. Rules must
+    keep every output that is still used: either keep the action that
+    produces it, or alias it to another action's output.
+    """
+
+    size: int = 1
+
+    def rewrite(self, window: list[Action], context: PeepholeContext) -> Rewrite | None:
+        raise NotImplementedError
+
+
+peephole_rules: list[PeepholeRule] = []
+
+
+def register_peephole_rule(rule: PeepholeRule):
+    peephole_rules.append(rule)
+
+
+def optimize_peephole(
+    actions: list[Action], rules: list[PeepholeRule] | None = None
+) -> list[Action]:
+    """
+    Runs peephole rules over a list of actions.
+
+    Each action is matched against the rules as it is appended, with the
+    window ending at that action, so a rewrite can enable further rewrites
+    of the actions before it. Windows holding an action whose output a block
+    collects are left alone.
+    """
+    if rules is None:
+        rules = peephole_rules
+    collected = collected_actions(actions)
+    context = PeepholeContext()
+    context._count(actions, 1)
+    mapping: dict[str, Action] = {}
+    result: list[Action] = []
+    for action in actions:
+        if mapping:
+            replace_references(action.WFWorkflowActionParameters, mapping)
+        result.append(action)
+        if action.uuid is not None:
+            context._producers[action.uuid] = action
+        changed = True
+        while changed:
+            changed = False
+            for rule in rules:
+                if len(result) < rule.size:
+                    continue
+                window = result[-rule.size :]
+                if any(id(x) in collected for x in window):
+                    continue
+                rewrite = rule.rewrite(window, context)
+                if rewrite is None:
+                    continue
+                context._count(window, -1)
+                context._count(rewrite.actions, 1)
+                for old, new in rewrite.aliases.items():
+                    new_uuid = cast(str, new.uuid)
+                    context._uses[new_uuid] = context.uses(new_uuid) + context.uses(old)
+                    mapping[old] = new
+                    for target, source in mapping.items():
+                        if source.uuid == old:
+                            mapping[target] = new
+                for new_action in rewrite.actions:
+                    if new_action.uuid is not None:
+                        context._producers[new_action.uuid] = new_action
+                result[-rule.size :] = rewrite.actions
+                changed = bool(rewrite.actions)
+                break
+    return result
+
+
+def _single_input(value: Any) -> dict[str, Any] | None:
+    """
+    Returns the magic variable in a parameter if it is nothing but one
+    unaggrandized action output.
+    """
+    if not isinstance(value, dict):
+        return None
+    inner = value.get('Value')
+    if value.get('WFSerializationType') == 'WFTextTokenString':
+        if not isinstance(inner, dict) or inner.get('string') != '\ufffc':
+            return None
+        attachments = inner.get('attachmentsByRange', {})
+        if len(attachments) != 1:
+            return None
+        (inner,) = attachments.values()
+    elif value.get('WFSerializationType') != 'WFTextTokenAttachment':
+        return None
+    if (
+        not isinstance(inner, dict)
+        or inner.get('Type') != 'ActionOutput'
+        or inner.get('Aggrandizements')
+    ):
+        return None
+    return inner
+
+
+class RedundantCoercionRule(PeepholeRule):
+    """
+    Removes an action that converts a value to the type it already has, like
+    a Number action given the result of a calculation.
+    """
+
+    coercions: dict[str, tuple[str, ValueType]] = {
+        'is.workflow.actions.number': ('WFNumberActionNumber', T.number),
+        'is.workflow.actions.detect.number': ('WFInput', T.number),
+        'is.workflow.actions.gettext': ('WFTextActionText', T.text),
+        'is.workflow.actions.detect.text': ('WFInput', T.text),
+        'is.workflow.actions.detect.dictionary': ('WFInput', T.dictionary),
+    }
+
+    def rewrite(self, window: list[Action], context: PeepholeContext):
+        (action,) = window
+        coercion = self.coercions.get(action.WFWorkflowActionIdentifier)
+        if coercion is None or action.uuid is None:
+            return None
+        key, type = coercion
+        params = action.WFWorkflowActionParameters
+        if set(params) - {key, 'UUID'}:
+            return None
+        ref = _single_input(params.get(key))
+        if ref is None:
+            return None
+        producer = context.producer(ref['OutputUUID'])
+        if producer is None or producer.output_type is None:
+            return None
+        if producer.output_type != type:
+            return None
+        return Rewrite([], {action.uuid: producer})
+
+
+class NumberInputRule(PeepholeRule):
+    """
+    Feeds a value straight into an action that already converts its input to
+    a number, instead of through a Number action used nowhere else.
+    """
+
+    size = 2
+
+    number_inputs: dict[str, tuple[str, ...]] = {
+        'is.workflow.actions.math': ('WFInput', 'WFMathOperand'),
+        'is.workflow.actions.number': ('WFNumberActionNumber',),
+        'is.workflow.actions.round': ('WFInput',),
+    }
+
+    def rewrite(self, window: list[Action], context: PeepholeContext):
+        number, consumer = window
+        if (
+            number.WFWorkflowActionIdentifier != 'is.workflow.actions.number'
+            or number.uuid is None
+            or context.uses(number.uuid) != 1
+        ):
+            return None
+        keys = self.number_inputs.get(consumer.WFWorkflowActionIdentifier, ())
+        value = number.WFWorkflowActionParameters.get('WFNumberActionNumber')
+        # the inputs of the consumers only take a token attachment, not text
+        if (
+            not isinstance(value, dict)
+            or value.get('WFSerializationType') != 'WFTextTokenAttachment'
+            or len(number.WFWorkflowActionParameters) != 2
+        ):
+            return None
+        params = consumer.WFWorkflowActionParameters
+        for key in keys:
+            ref = _single_input(params.get(key))
+            if ref is not None and ref['OutputUUID'] == number.uuid:
+                replacement = consumer.copy()
+                replacement.WFWorkflowActionParameters[key] = value
+                return Rewrite([replacement])
+        return None
+
+
+register_peephole_rule(RedundantCoercionRule())
+register_peephole_rule(NumberInputRule())
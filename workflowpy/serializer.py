@@ -0,0 +1,41 @@
+import plistlib
+from typing import IO, Any, Literal
+
+from pydantic import BaseModel
+
+__all__ = ['PlistFormat', 'plist_data', 'write_plist']
+
+type PlistFormat = Literal['binary', 'xml']
+
+_FORMATS = {'binary': plistlib.FMT_BINARY, 'xml': plistlib.FMT_XML}
+
+
+def plist_data(value: Any) -> Any:
+    """
+    Returns a value that plistlib can write, converting models to dicts.
+
+    Unlike `model_dump`, dicts and other plain values are used as they are,
+    so action parameters are never copied. Fields that are None are left out,
+    since property lists have no null value.
+    """
+    if isinstance(value, BaseModel):
+        data = {}
+        for name in type(value).model_fields:
+            field = getattr(value, name)
+            if field is not None:
+                data[name] = plist_data(field)
+        return data
+    if isinstance(value, list) and value and isinstance(value[0], BaseModel):
+        return [plist_data(item) for item in value]
+    return value
+
+
+def write_plist(value: BaseModel, file: IO[bytes], fmt: PlistFormat = 'binary'):
+    """
+    Writes a model to a file as a property list.
+    """
+    if fmt not in _FORMATS:
+        raise ValueError(f'Unknown property list format: {fmt!r}')
+    # the XML writer writes each element as it goes, so the actions are
+    # never joined into one string
+    plistlib.dump(plist_data(value), file, fmt=_FORMATS[fmt], sort_keys=False)
@@ -0,0 +1,73 @@
+from collections import Counter
+
+from workflowpy.models.internal import Action, SourceLocation
+from workflowpy.optimizer import REPEAT_ACTIONS
+
+__all__ = ['SourceLocation', 'SourceMap']
+
+
+class SourceMap:
+    """
+    Where each action of a compiled shortcut came from.
+
+    `locations[i]` is the location in the source of the code that emitted
+    the i-th action, and `depths[i]` is the number of loops the action is
+    nested in. Both are kept apart from the shortcut itself.
+    """
+
+    def __init__(self, actions: list[Action]):
+        self.locations: list[SourceLocation | None] = []
+        self.depths: list[int] = []
+        depth = 0
+        for action in actions:
+            params = action.WFWorkflowActionParameters
+            is_loop = action.WFWorkflowActionIdentifier in REPEAT_ACTIONS
+            if is_loop and params.get('WFControlFlowMode') == 2:
+                depth -= 1
+            self.locations.append(action.source)
+            self.depths.append(depth)
+            if is_loop and params.get('WFControlFlowMode') == 0:
+                depth += 1
+
+    def by_line(self) -> Counter[int | None]:
+        """
+        Returns the number of actions emitted for each line of the source.
+        """
+        return Counter(
+            location.lineno if location is not None else None
+            for location in self.locations
+        )
+
+    def by_depth(self) -> Counter[int]:
+        """
+        Returns the number of actions at each loop nesting depth.
+        """
+        return Counter(self.depths)
+
+    def report(self, source: str | None = None) -> str:
+        """
+        Returns a table of the actions emitted per line, followed by a table
+        of the actions per loop nesting depth. If `source` is given, each
+        line is shown next to its count.
+        """
+        lines = source.splitlines() if source is not None else []
+        by_line = self.by_line()
+        depth_of_line: dict[int | None, int] = {}
+        for location, depth in zip(self.locations, self.depths):
+            lineno = location.lineno if location is not None else None
+            depth_of_line[lineno] = max(depth_of_line.get(lineno, 0), depth)
+
+        result = ['  line  actions  depth  source']
+        for lineno in sorted(by_line, key=lambda x: -1 if x is None else x):
+            text = ''
+            if lineno is not None and 0 < lineno <= len(lines):
+                text = lines[lineno - 1].strip()
+            result.append(
+                f'{lineno if lineno is not None else "-":>6}  {by_line[lineno]:>7}  '
+                f'{depth_of_line[lineno]:>5}  {text}'.rstrip()
+            )
+        result.append('')
+        result.append(' depth  actions')
+        for depth, count in sorted(self.by_depth().items()):
+            result.append(f'{depth:>6}  {count:>7}')
+        return '\n'.join(result)
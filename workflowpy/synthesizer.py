@@ -1,18 +1,104 @@
 from typing import Any
 
-from workflowpy.models.shortcuts import Action, Shortcut, ShortcutType
+from workflowpy import value_type as T
+from workflowpy.models.internal import Action
+from workflowpy.models.shortcuts import Shortcut, ShortcutType
+from workflowpy.optimizer import (
+    eliminate_common_subexpressions,
+    eliminate_dead_actions,
+)
+from workflowpy.peephole import optimize_peephole
+from workflowpy.sourcemap import SourceMap
+from workflowpy.uuids import new_uuid
+from workflowpy.value import ShortcutInputValue, token_attachment
+
+# the key of the shortcut input that names the function to run
+FUNCTION_KEY = '__function__'
 
 
 class Synthesizer:
     """
     This class is responsible for synthesizing a Shortcut object.
+
+    The actions in `functions` are subroutines that run when the shortcut is
+    given a dictionary with the subroutine's name under `FUNCTION_KEY`.
+    `input_classes` are the content item classes the shortcut accepts as
+    input, or empty to accept anything.
     """
 
-    def __init__(self):
+    def __init__(self, optimize: bool = True):
         self.actions: list[Action] = []
         self.functions: dict[str, list[Action]] = {}
+        self.input_classes: list[str] = []
+        self.optimize = optimize
+        self.source_map: SourceMap | None = None
 
-    def synthesize(self) -> Shortcut:
+    def _dispatch(self) -> list[Action]:
+        actions: list[Action] = []
+        name = Action(
+            WFWorkflowActionIdentifier='is.workflow.actions.getvalueforkey',
+            WFWorkflowActionParameters={
+                'WFDictionaryKey': FUNCTION_KEY,
+                'WFInput': token_attachment(actions, ShortcutInputValue()),
+            },
+        ).with_output('Dictionary Value', T.text)
+        actions.append(name)
+        assert name.output
+        for key, body in self.functions.items():
+            group_uuid = new_uuid()
+            actions.append(
+                Action(
+                    WFWorkflowActionIdentifier='is.workflow.actions.conditional',
+                    WFWorkflowActionParameters={
+                        'GroupingIdentifier': group_uuid,
+                        'WFCondition': 4,
+                        'WFConditionalActionString': key,
+                        'WFControlFlowMode': 0,
+                        'WFInput': {
+                            'Type': 'Variable',
+                            'Variable': token_attachment(actions, name.output),
+                        },
+                    },
+                )
+            )
+            actions.extend(body)
+            actions.append(
+                Action(
+                    WFWorkflowActionIdentifier='is.workflow.actions.conditional',
+                    WFWorkflowActionParameters={
+                        'GroupingIdentifier': group_uuid,
+                        'WFControlFlowMode': 2,
+                    },
+                )
+            )
+        return actions
+
+    def optimized_actions(self) -> list[Action]:
+        actions = self.actions
         if self.functions:
-            raise NotImplementedError("Functions are not implemented yet!")
-        return Shortcut(WFWorkflowActions=self.actions)
+            actions = self._dispatch() + actions
+        if self.optimize:
+            actions = optimize_peephole(actions)
+            actions = eliminate_common_subexpressions(actions)
+            actions = eliminate_dead_actions(actions)
+        return actions
+
+    def synthesize(self) -> Shortcut:
+        actions = self.optimized_actions()
+        self.source_map = SourceMap(actions)
+        fields: dict[str, Any] = {}
+        classes = list(self.input_classes)
+        if (
+            self.functions
+            and classes
+            and T.dictionary.content_item_class not in classes
+        ):
+            # the subroutines are called with a dictionary as input
+            classes.append(T.dictionary.content_item_class)
+        if classes:
+            fields['WFWorkflowInputContentItemClasses'] = classes
+        # the internal actions were built by the compiler, so there is nothing
+        # left to validate; construct the public models directly
+        return Shortcut.model_construct(
+            WFWorkflowActions=[action.to_model() for action in actions], **fields
+        )
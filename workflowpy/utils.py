@@ -1,12 +1,12 @@
 import os
-import plistlib
 import subprocess
 import sys
 import tempfile
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from workflowpy.models.shortcuts import Action, Shortcut
+    from workflowpy.models.internal import Action
+    from workflowpy.models.shortcuts import Shortcut
 
 
 def find_action_with_uuid(actions: 'list[Action]', uuid: str):
@@ -24,14 +24,12 @@ def sign_shortcut(shortcut: 'Shortcut') -> bytes:
     if sys.platform != 'darwin':
         raise OSError('Shortcuts can only be signed on macOS devices')
 
-    data = shortcut.model_dump(mode='json')
-
     with tempfile.TemporaryDirectory() as tmpdir:
         raw_filename = os.path.join(tmpdir, 'raw.shortcut')
         signed_filename = os.path.join(tmpdir, 'signed.shortcut')
 
         with open(raw_filename, 'wb') as f:
-            plistlib.dump(data, f)
+            shortcut.write_to(f)
 
         result = subprocess.run(
             [
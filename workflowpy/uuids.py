@@ -0,0 +1,44 @@
+import hashlib
+import uuid
+from contextvars import ContextVar
+
+__all__ = ['UUIDAllocator', 'current_uuids', 'new_uuid']
+
+
+class UUIDAllocator:
+    """
+    Hands out UUIDs made from a hash of a seed and a counter, so compiling
+    the same source twice gives the same UUIDs.
+    """
+
+    def __init__(self, seed: str | bytes):
+        if isinstance(seed, str):
+            seed = seed.encode()
+        self._hash = hashlib.blake2b(seed, digest_size=16)
+        self._counter = 0
+
+    def new(self) -> str:
+        self._counter += 1
+        digest = self._hash.copy()
+        digest.update(self._counter.to_bytes(8, 'little'))
+        x = digest.hexdigest().upper()
+        # mark it as a version 4 UUID, like the random ones
+        variant = '89AB'[int(x[16], 16) & 3]
+        return f'{x[:8]}-{x[8:12]}-4{x[13:16]}-{variant}{x[17:20]}-{x[20:]}'
+
+
+# the allocator of the compilation in progress
+current_uuids: ContextVar[UUIDAllocator | None] = ContextVar(
+    'current_uuids', default=None
+)
+
+
+def new_uuid() -> str:
+    """
+    Returns a new UUID from the current allocator, or a random UUID outside
+    of a compilation.
+    """
+    allocator = current_uuids.get()
+    if allocator is None:
+        return str(uuid.uuid4()).upper()
+    return allocator.new()
@@ -1,10 +1,12 @@
 import ast
 import copy
+import importlib
 from typing import Any, Callable, Literal
 
 from pydantic import BaseModel, ConfigDict
 
-from workflowpy.models.shortcuts import Action
+from workflowpy.block import ActionList
+from workflowpy.models.internal import Action
 from workflowpy.value_type import ValueType
 from workflowpy import value_type as T
 
@@ -15,7 +17,7 @@ class Value:
     They represent any value (duh) that a variable can hold.
     """
 
-    def synthesize(self, actions: list[Action]) -> dict[str, Any]:
+    def synthesize(self, actions: ActionList) -> dict[str, Any]:
         raise TypeError(f"Value of type {self.__class__.__name__} is not synthesizable")
 
     def getattr(self, key: str) -> 'Value':
@@ -37,6 +39,27 @@ class PythonValue(Value):
     pass
 
 
+class LazyModule:
+    """
+    A module that is imported the first time it is used.
+
+    `target` is the path of the Python module defining the module dict, with
+    `:name` at the end if the dict is not called `module`.
+    """
+
+    def __init__(self, target: str):
+        self.target = target
+        self._module: dict[str, Any] | None = None
+
+    def load(self) -> dict[str, Any]:
+        loaded = self._module
+        if loaded is None:
+            import_path, _, attr = self.target.partition(':')
+            module = importlib.import_module(import_path)
+            loaded = self._module = getattr(module, attr or 'module')
+        return loaded
+
+
 class PythonModuleValue(PythonValue):
     def __init__(self, /, **children: Any):
         super().__init__()
@@ -46,26 +69,54 @@ class PythonModuleValue(PythonValue):
         value = self.children[key]
         if isinstance(value, Value):
             return value
+        if isinstance(value, LazyModule):
+            value = value.load()
         if isinstance(value, dict):
             return PythonModuleValue(**value)
         raise TypeError(f'Unknown type in module path: {value.__class__.__name__}')
 
 
 class PythonFunctionValue(PythonValue):
+    """
+    A function provided by a module, called with an `ActionHelper`.
+
+    `reads_input` marks functions that read the shortcut input, which a
+    subroutine cannot do, as its input is the arguments of the call.
+    """
+
     def __init__(
         self,
         /,
         func: Callable[..., Value | None],
         raw_params: list[str | int] | None = None,
+        reads_input: bool = False,
     ):
         super().__init__()
         self.func = func
         self.raw_params = raw_params or []
+        self.reads_input = reads_input
 
     def __call__(self, *args: Any, **kwargs: Any) -> Any:
         return self.func(*args, **kwargs)
 
 
+class FunctionValue(PythonValue):
+    """
+    A function defined with `def`.
+
+    Its body is compiled again wherever it is called, unless it was compiled
+    once as a subroutine; then `key` names the subroutine, and `return_type`
+    is the type of what it returns, if it returns anything.
+    """
+
+    def __init__(self, node: ast.FunctionDef, defaults: list[Value]):
+        super().__init__()
+        self.node = node
+        self.defaults = defaults
+        self.key: str | None = None
+        self.return_type: ValueType | None = None
+
+
 class PythonTypeValue(PythonValue):
     def __init__(self, type: ValueType) -> None:
         super().__init__()
@@ -102,7 +153,7 @@ class ConstantValue(ShortcutValue):
         super().__init__()
         self.value = value
 
-    def synthesize(self, actions: list[Action]) -> dict[str, Any]:
+    def synthesize(self, actions: ActionList) -> dict[str, Any]:
         if isinstance(self.value, str):
             action = Action(
                 WFWorkflowActionIdentifier='is.workflow.actions.gettext',
@@ -125,10 +176,21 @@ class ConstantValue(ShortcutValue):
     def type(self):
         if isinstance(self.value, str):
             return T.text
-        if isinstance(self.value, (int, float)):
+        if isinstance(self.value, int):
+            return T.integer
+        if isinstance(self.value, float):
             return T.number
         assert False
 
+    @property
+    def is_literal(self) -> bool:
+        # aggrandizements can only be applied to a variable
+        return not self.aggrandizements
+
+    @property
+    def literal(self) -> str:
+        return str(self.value)
+
 
 class MagicVariableValue(ShortcutValue):
     def __init__(self, uuid: str, name: str, type: ValueType) -> None:
@@ -137,7 +199,7 @@ class MagicVariableValue(ShortcutValue):
         self.name = name
         self._type = type
 
-    def synthesize(self, actions: list[Action]) -> Any:
+    def synthesize(self, actions: ActionList) -> Any:
         return {
             'OutputName': self.name,
             'OutputUUID': self.uuid,
@@ -155,7 +217,7 @@ class VariableValue(ShortcutValue):
         self.name = name
         self._type = type
 
-    def synthesize(self, actions: list[Action]) -> dict[str, Any]:
+    def synthesize(self, actions: ActionList) -> dict[str, Any]:
         return {'Type': 'Variable', 'VariableName': self.name} | self._aggrandize_props
 
     @property
@@ -172,7 +234,7 @@ class ShortcutInputValue(ShortcutValue):
     def type(self):
         return self._type
 
-    def synthesize(self, actions: list[Action]) -> dict[str, Any]:
+    def synthesize(self, actions: ActionList) -> dict[str, Any]:
         return {'Type': 'ExtensionInput'} | self._aggrandize_props
 
 
@@ -182,15 +244,24 @@ class TokenStringValue(ShortcutValue):
         super().__init__()
         self.parts = parts
 
-    def synthesize(self, actions: list[Action]) -> dict[str, Any]:
-        if len(self.parts) == 1:
-            if isinstance(self.parts[0], TokenStringValue):
-                return self.parts[0].synthesize(actions)
-            if isinstance(self.parts[0], str):
-                return self.parts[0]  # type: ignore  # FIXME maybe...?
+    def _flatten(self, parts: list[str | ShortcutValue]):
+        for part in self.parts:
+            if isinstance(part, TokenStringValue) and not part.aggrandizements:
+                part._flatten(parts)
+            elif isinstance(part, ConstantValue) and part.is_literal:
+                # literals are written straight into the string
+                parts.append(part.literal)
+            else:
+                parts.append(part)
+
+    def synthesize(self, actions: ActionList) -> dict[str, Any]:
+        parts: list[str | ShortcutValue] = []
+        self._flatten(parts)
+        if all(isinstance(part, str) for part in parts):
+            return ''.join(parts)  # type: ignore  # FIXME maybe...?
         attachments = {}
         text = ''
-        for part in self.parts:
+        for part in parts:
             if isinstance(part, str):
                 text += part
             else:
@@ -205,11 +276,22 @@ class TokenStringValue(ShortcutValue):
 
 # also pseudo
 class TokenAttachmentValue(ShortcutValue):
-    def __init__(self, value: ShortcutValue):
+    """
+    A token attachment of a value.
+
+    If `allow_literal` is set, the parameter also accepts a typed-in value,
+    and literal constants are written directly instead of through an action.
+    """
+
+    def __init__(self, value: ShortcutValue, allow_literal: bool = False):
         super().__init__()
         self.value = value
+        self.allow_literal = allow_literal
 
-    def synthesize(self, actions: list[Action]) -> dict[str, Any]:
+    def synthesize(self, actions: ActionList) -> Any:
+        value = self.value
+        if self.allow_literal and isinstance(value, ConstantValue) and value.is_literal:
+            return value.literal
         return {
             'Value': self.value.synthesize(actions),
             'WFSerializationType': 'WFTextTokenAttachment',
@@ -226,7 +308,7 @@ class ItemValue(ShortcutValue):
         self.value = value
         self.key = key
 
-    def synthesize(self, actions: list[Action]) -> dict[str, Any]:
+    def synthesize(self, actions: ActionList) -> dict[str, Any]:
         return {
             'WFItemType': self.item_type,
             'WFValue': self.value.synthesize(actions),
@@ -239,7 +321,7 @@ class DictionaryFieldValue(ShortcutValue):
         super().__init__()
         self.items = items
 
-    def synthesize(self, actions: list[Action]) -> dict[str, Any]:
+    def synthesize(self, actions: ActionList) -> dict[str, Any]:
         return {
             'Value': {
                 'WFDictionaryFieldValueItems': [
@@ -253,13 +335,15 @@ class DictionaryFieldValue(ShortcutValue):
 # helper functions
 
 
-def token_string(actions: list[Action], *parts: str | ShortcutValue):
+def token_string(actions: ActionList, *parts: str | ShortcutValue):
     return TokenStringValue(*parts).synthesize(actions)
 
 
-def token_attachment(actions: list[Action], value: ShortcutValue):
-    return TokenAttachmentValue(value).synthesize(actions)
+def token_attachment(
+    actions: ActionList, value: ShortcutValue, allow_literal: bool = False
+):
+    return TokenAttachmentValue(value, allow_literal).synthesize(actions)
 
 
-def item_value(actions: list[Action], item_type: int, value: ShortcutValue):
+def item_value(actions: ActionList, item_type: int, value: ShortcutValue):
     return ItemValue(item_type=item_type, value=value).synthesize(actions)
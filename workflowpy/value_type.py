@@ -37,6 +37,8 @@ any = ValueType('', '', {})  # FIXME ???
 file = ValueType('File', 'WFGenericFileContentItem', {'File Size': _file_size})
 text = ValueType('Text', 'WFStringContentItem', {'File Size': _file_size}, str)
 number = ValueType('Number', 'WFNumberContentItem', {}, (float, int))
+# a number known to be whole; it is equal to `number`, so check for it with `is`
+integer = ValueType('Number', 'WFNumberContentItem', {}, int)
 boolean = ValueType('Boolean', 'WFBooleanContentItem', {}, bool)
 dictionary = ValueType(
     'Dictionary', 'WFDictionaryContentItem', {'Keys': text, 'Values': any}, dict